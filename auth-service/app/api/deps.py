@@ -8,6 +8,7 @@ from uuid import UUID
 from app.core.config import settings
 from app.core.security import verify_refresh_token, verify_token
 from app.models.auth_user import AuthUser
+from app.schemas.auth_user import TokenPrincipal
 from app.crud.auth_user import crud_auth_user
 from app.db.session import get_db
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -80,6 +81,93 @@ async def get_current_admin_user(
         )
     return current_user
 
+def _parse_uuid(value: Optional[str]) -> Optional[UUID]:
+    """クレームの文字列をUUIDに変換（不正な値の場合はNone）"""
+    try:
+        return UUID(value) if value else None
+    except (ValueError, TypeError):
+        return None
+
+def _parse_bool(value) -> bool:
+    """クレームの真偽値を変換（"True"/"False"の文字列形式にも対応）"""
+    if isinstance(value, bool):
+        return value
+    return str(value).lower() == "true"
+
+async def get_current_principal(
+        token: str = Depends(oauth2_scheme),
+        db: AsyncSession = Depends(get_db)
+        ) -> TokenPrincipal | AuthUser:
+    """
+    アクセストークンから認証主体を取得する依存関数
+    
+    STATELESS_AUTH_ENABLEDが有効な場合は検証済みトークンのクレームから
+    TokenPrincipalを組み立て、DBを参照しない。無効な場合はget_current_userと同じく
+    DBからユーザーを取得する。ORMオブジェクトが必要なエンドポイントではget_current_userを使用すること。
+    
+    ステートレスモードではis_admin・is_activeはトークン発行時点の値となる。
+    
+    Args:
+        token: JWTアクセストークン
+        db: データベースセッション（プライマリ。レプリカの遅延で無効化・削除直後のユーザーを
+            認証しないようレプリカは使わない。ステートレスモードでは接続しない）
+        
+    Returns:
+        TokenPrincipal | AuthUser: 認証された主体
+        
+    Raises:
+        HTTPException: トークンが無効な場合
+    """
+    if not settings.STATELESS_AUTH_ENABLED:
+        return await get_current_user(token, db)
+    
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="認証情報が無効です",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    
+    try:
+        payload = await verify_token(token)
+    except (JWTError, ValidationError):
+        raise credentials_exception
+    
+    if payload is None:
+        raise credentials_exception
+    
+    sub = _parse_uuid(payload.get("sub"))
+    if sub is None:
+        raise credentials_exception
+    
+    return TokenPrincipal(
+        id=sub,
+        user_id=_parse_uuid(payload.get("user_id")),
+        username=payload.get("username"),
+        is_admin=_parse_bool(payload.get("is_admin", False)),
+    )
+
+async def get_current_admin_principal(
+        current_principal: TokenPrincipal | AuthUser = Depends(get_current_principal)
+        ) -> TokenPrincipal | AuthUser:
+    """
+    現在の認証主体が管理者であることを確認する依存関数
+    
+    Args:
+        current_principal: 認証された主体
+        
+    Returns:
+        TokenPrincipal | AuthUser: 管理者権限を持つ認証主体
+        
+    Raises:
+        HTTPException: 管理者でない場合
+    """
+    if not current_principal.is_admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="この操作には管理者権限が必要です",
+        )
+    return current_principal
+
 async def validate_refresh_token(refresh_token: str) -> Optional[str]:
     """
     リフレッシュトークンを検証する関数
@@ -5,21 +5,28 @@ from uuid import UUID
 from jose import JWTError, jwt
 from pydantic import ValidationError
 
-from fastapi import APIRouter, Body, Depends, Header, HTTPException, status, Request, Response
+from fastapi import APIRouter, Body, Depends, Header, HTTPException, Query, status, Request, Response
+from fastapi.responses import StreamingResponse
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError
 
 from app.clients.user_service import get_user_info_from_user_service
 from app.crud.auth_user import crud_auth_user
-from app.db.session import get_db
+from app.crud.outbox import crud_outbox
+from app.crud.pagination import InvalidCursorError, decode_cursor, encode_cursor
+from app.core.bulk import CONTENT_TYPES, BulkFormatError, detect_format, iter_batches, iter_records
+from app.db.bulk import stream_copy_csv
+from app.db.session import ReadOnlySessionLocal, get_db, get_read_db, replica_router
 from app.messaging.rabbitmq import (
     publish_user_created,
     publish_user_updated,
     publish_user_deleted,
     publish_password_changed,
-    publish_user_status_changed
+    publish_user_status_changed,
+    UserEventTypes
 )
+from app.messaging.outbox import outbox_relay
 from app.schemas.auth_user import (
     PasswordUpdate,
     AdminPasswordUpdate,
@@ -31,7 +38,10 @@ from app.schemas.auth_user import (
     RefreshToken,
     RefreshTokenRequest,
     LogoutRequest, TokenVerifyRequest,
-    TokenVerifyResponse
+    TokenVerifyResponse,
+    TokenBatchVerifyRequest,
+    TokenBatchVerifyResponse,
+    TokenPrincipal
     )
 from app.core.security import (
     verify_password, 
@@ -40,10 +50,16 @@ from app.core.security import (
     verify_refresh_token,
     revoke_refresh_token,
     verify_token,
+    verify_tokens,
     blacklist_token
 )
 from app.core.config import settings
-from app.api.deps import validate_refresh_token, get_current_user, get_current_admin_user
+from app.core.keys import key_manager
+from app.api.deps import (
+    validate_refresh_token,
+    get_current_user,
+    get_current_admin_principal
+)
 from app.core.logging import get_request_logger, app_logger
 from app.models.auth_user import AuthUser
 
@@ -82,21 +98,15 @@ async def register_user(
             detail="ユーザーの登録に失敗しました。"
         )
     
-    # ユーザー作成イベントの発行
-    '''
-    try:
-        user_data = {
-            "id": new_user.id,
-            "username": new_user.username,
-            "is_admin": new_user.is_admin,
-            "is_active": new_user.is_active
-        }
-        await publish_user_created(user_data)
-        logger.info(f"ユーザー作成イベント発行: ID={new_user.id}")
-    except Exception as e:
-        # イベント発行の失敗はログに記録するだけで、APIレスポンスには影響させない
-        logger.error(f"ユーザー作成イベント発行失敗: {str(e)}", exc_info=True)
-    '''
+    # ユーザー作成イベントをアウトボックスに登録（ユーザー作成と同じトランザクションでコミット）
+    await crud_outbox.enqueue(db, UserEventTypes.USER_CREATED, {
+        "id": new_user.id,
+        "username": new_user.username,
+        "is_admin": new_user.is_admin,
+        "is_active": new_user.is_active
+    })
+    await db.commit()
+    outbox_relay.notify()
     
     logger.info(f"ユーザー登録成功: ID={new_user.id}, ユーザー名={new_user.username}, 管理者={new_user.is_admin}")
     return new_user
@@ -124,7 +134,7 @@ async def login(
         )
     
     # パスワード検証
-    if not verify_password(form_data.password, db_user.hashed_password):
+    if not await verify_password(form_data.password, db_user.hashed_password):
         logger.warning(f"ログイン失敗: ユーザー '{form_data.username}' のパスワードが不正です")
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -133,12 +143,12 @@ async def login(
         )
     
     # アクセストークン生成
-    user_info = get_user_info_from_user_service(db_user.user_id)
+    user_info = await get_user_info_from_user_service(db_user.user_id)
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = await create_access_token(
         data={"sub": str(db_user.id),
               "user_id": str(db_user.user_id),
-              "is_admin": str(user_info.is_admin),
+              "is_admin": str(user_info["is_admin"]),
               "username": db_user.username},
         expires_delta=access_token_expires
     )
@@ -154,17 +164,186 @@ async def login(
         "token_type": "bearer"
     }
 
+async def _stream_users_ndjson():
+    """全ユーザーを1行1件のJSONとして順に出力"""
+    async with replica_router.read_engine() as engine, ReadOnlySessionLocal(bind=engine) as db:
+        async for db_user in crud_auth_user.stream_all_users(db):
+            yield UserResponse.model_validate(db_user).model_dump_json() + "\n"
+
 @router.get("/users", response_model=List[UserResponse])
 async def get_all_users(
     request: Request,
-    current_user: AuthUser = Depends(get_current_admin_user),
-    db: AsyncSession = Depends(get_db)
+    response: Response,
+    cursor: Optional[str] = Query(None, description="前ページのレスポンスヘッダーX-Next-Cursorの値"),
+    limit: int = Query(settings.USERS_PAGE_SIZE, ge=1, le=settings.USERS_PAGE_SIZE_MAX),
+    stream: bool = Query(False, description="trueの場合は全ユーザーをNDJSONでストリーミングする"),
+    current_user: TokenPrincipal | AuthUser = Depends(get_current_admin_principal),
+    db: AsyncSession = Depends(get_read_db)
     ) -> Any:
     """
     全ユーザーを取得するエンドポイント（管理者のみ）
+    - (created_at, id)順のキーセットページネーション。次ページのカーソルはX-Next-Cursorヘッダーで返す
+    - stream=trueの場合は全ユーザーをNDJSONでストリーミングする
     """
     logger = get_request_logger(request)
     logger.info(f"全ユーザー取得リクエスト: 要求元={current_user.username}")
     
-    users = await crud_auth_user.get_all_users(db)
-    return users
\ No newline at end of file
+    # NDJSONストリーミング（DBセッションはレスポンス送信中も保持するためジェネレーター内で作成）
+    if stream:
+        return StreamingResponse(_stream_users_ndjson(), media_type="application/x-ndjson")
+    
+    after = None
+    if cursor:
+        try:
+            after = decode_cursor(cursor)
+        except InvalidCursorError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="不正なカーソルです"
+            )
+    
+    users, last = await crud_auth_user.get_users_page(db, limit=limit, after=after)
+    
+    # 次ページがある場合はカーソルをヘッダーで返す
+    if last is not None:
+        response.headers["X-Next-Cursor"] = encode_cursor(*last)
+    
+    return users
+
+@router.post("/users/import")
+async def import_users(
+    request: Request,
+    format: Optional[str] = Query(None, description="csvまたはndjson（省略時はContent-Typeから判定）"),
+    current_user: TokenPrincipal | AuthUser = Depends(get_current_admin_principal),
+    db: AsyncSession = Depends(get_db)
+    ) -> Any:
+    """
+    ユーザーを一括でインポートするエンドポイント（管理者のみ）
+    - リクエストボディにCSV（ヘッダー行あり）またはNDJSONを指定する
+    - 列: username, password または hashed_password, is_admin, is_active, user_id
+    - 大量のユーザーを移行する場合はhashed_passwordを指定するとハッシュ計算を省略できる
+    - 既に存在するユーザー名・user_idの行はスキップする
+    """
+    logger = get_request_logger(request)
+    
+    try:
+        data_format = detect_format(request.headers.get("content-type"), format)
+        logger.info(f"ユーザー一括インポートリクエスト: 形式={data_format}, 要求元={current_user.username}")
+        
+        records = iter_records(request.stream(), data_format)
+        result = await crud_auth_user.bulk_import(db, iter_batches(records, settings.BULK_IMPORT_BATCH_SIZE))
+        await db.commit()
+        outbox_relay.notify()
+    except BulkFormatError as e:
+        await db.rollback()
+        logger.warning(f"ユーザー一括インポート失敗: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except UnicodeDecodeError:
+        await db.rollback()
+        logger.warning("ユーザー一括インポート失敗: UTF-8として読み込めません")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="UTF-8でエンコードされたデータを指定してください"
+        )
+    
+    logger.info(f"ユーザー一括インポート成功: {result}")
+    return result
+
+@router.get("/users/export")
+async def export_users(
+    request: Request,
+    format: str = Query("csv", description="csvまたはndjson"),
+    include_password_hash: bool = Query(False, description="trueの場合はパスワードハッシュを含める（csvのみ）"),
+    current_user: TokenPrincipal | AuthUser = Depends(get_current_admin_principal)
+    ) -> Any:
+    """
+    全ユーザーをストリーミングでエクスポートするエンドポイント（管理者のみ）
+    - csvはCOPY TO STDOUTの結果をそのまま返す
+    """
+    logger = get_request_logger(request)
+    logger.info(f"ユーザー一括エクスポートリクエスト: 形式={format}, 要求元={current_user.username}")
+    
+    if format == "ndjson":
+        return StreamingResponse(_stream_users_ndjson(), media_type=CONTENT_TYPES["ndjson"])
+    if format != "csv":
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"未対応の形式です: {format}"
+        )
+    
+    return StreamingResponse(
+        stream_copy_csv(crud_auth_user.export_query(include_password_hash)),
+        media_type=CONTENT_TYPES["csv"],
+        headers={"Content-Disposition": 'attachment; filename="auth_users.csv"'}
+    )
+
+@router.post("/keys/reload")
+async def reload_keys(
+    request: Request,
+    current_user: TokenPrincipal | AuthUser = Depends(get_current_admin_principal)
+    ) -> Any:
+    """
+    JWT署名鍵を再読み込みするエンドポイント（管理者のみ）
+    - リクエストを処理したワーカープロセスの鍵のみが再読み込みされる
+    - 全ワーカーに反映する場合は各プロセスにSIGHUPを送信する
+    """
+    logger = get_request_logger(request)
+    logger.info(f"署名鍵再読み込みリクエスト: 要求元={current_user.username}")
+    
+    if not key_manager.reload():
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="署名鍵の再読み込みに失敗しました"
+        )
+    
+    logger.info("署名鍵再読み込み成功")
+    return {"message": "署名鍵を再読み込みしました"}
+
+def _to_verify_response(payload: Optional[Dict[str, Any]]) -> TokenVerifyResponse:
+    """検証結果のペイロードをレスポンスに変換"""
+    if payload is None:
+        return TokenVerifyResponse(valid=False, error="トークンが無効か失効しています")
+    
+    is_admin = str(payload.get("is_admin", "False")).lower() == "true"
+    return TokenVerifyResponse(
+        valid=True,
+        user_id=payload.get("user_id"),
+        username=payload.get("username"),
+        roles=["admin"] if is_admin else ["user"]
+    )
+
+@router.post("/verify", response_model=TokenVerifyResponse)
+async def verify(
+    request: Request,
+    verify_request: TokenVerifyRequest
+    ) -> Any:
+    """
+    アクセストークンを検証するエンドポイント
+    """
+    payload = await verify_token(verify_request.token)
+    return _to_verify_response(payload)
+
+@router.post("/verify/batch", response_model=TokenBatchVerifyResponse)
+async def verify_batch(
+    request: Request,
+    verify_request: TokenBatchVerifyRequest
+    ) -> Any:
+    """
+    複数のアクセストークンをまとめて検証するエンドポイント
+    - 結果はリクエストと同じ順序で返す
+    - 署名検証はまとめて行い、ブラックリストの確認は1回のRedis問い合わせで行う
+    """
+    logger = get_request_logger(request)
+    
+    if len(verify_request.tokens) > settings.TOKEN_VERIFY_BATCH_MAX_SIZE:
+        logger.warning(f"一括トークン検証の件数超過: {len(verify_request.tokens)}件")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"一度に検証できるトークンは{settings.TOKEN_VERIFY_BATCH_MAX_SIZE}件までです"
+        )
+    
+    payloads = await verify_tokens(verify_request.tokens)
+    return {"results": [_to_verify_response(payload) for payload in payloads]}
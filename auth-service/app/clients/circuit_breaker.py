@@ -0,0 +1,71 @@
+import time
+from typing import Any, Dict
+
+
+class CircuitBreaker:
+    """
+    連続した失敗を検知して呼び出し先への接続を一時的に遮断するサーキットブレーカー
+
+    - closed: 通常状態。連続失敗がしきい値に達するとopenに遷移
+    - open: 呼び出しを即座に拒否。reset_timeout経過後にhalf_openに遷移
+    - half_open: 試行リクエストを1件だけ許可し、成功すればclosed、失敗すればopenに戻る
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failure_count = 0
+        self.opened_at = 0.0
+        self.half_open_in_flight = False
+        self.half_open_at = 0.0
+        self.rejected = 0
+
+    def allow_request(self) -> bool:
+        """呼び出しを許可するかどうかを判定"""
+        if self.state == self.OPEN:
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                self.rejected += 1
+                return False
+            self.state = self.HALF_OPEN
+            self.half_open_in_flight = False
+
+        if self.state == self.HALF_OPEN:
+            # 復旧確認の試行リクエストは1件のみ許可する
+            # （試行がキャンセルされ結果が記録されない場合に備え、reset_timeout経過後は再試行を許可）
+            now = time.monotonic()
+            if self.half_open_in_flight and now - self.half_open_at < self.reset_timeout:
+                self.rejected += 1
+                return False
+            self.half_open_in_flight = True
+            self.half_open_at = now
+
+        return True
+
+    def record_success(self):
+        """呼び出し成功を記録"""
+        self.state = self.CLOSED
+        self.failure_count = 0
+        self.half_open_in_flight = False
+
+    def record_failure(self):
+        """呼び出し失敗を記録"""
+        self.failure_count += 1
+        self.half_open_in_flight = False
+        if self.state == self.HALF_OPEN or self.failure_count >= self.failure_threshold:
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+    def stats(self) -> Dict[str, Any]:
+        """サーキットブレーカーの状態を返す"""
+        return {
+            "name": self.name,
+            "state": self.state,
+            "failure_count": self.failure_count,
+            "rejected": self.rejected,
+        }
@@ -1,67 +1,234 @@
+import asyncio
+import random
+from typing import Any, Dict, Optional
+
 import httpx
 from fastapi import HTTPException, status
 from uuid import UUID
 
+from app.clients.circuit_breaker import CircuitBreaker
+from app.core.cache import TTLCache
 from app.core.config import settings
 from app.core.logging import app_logger
+from app.messaging.rabbitmq import UserEventTypes
+
+
+class UserServiceClient:
+    """User Serviceへの長寿命HTTPクライアントクラス"""
+
+    # プロファイルキャッシュを無効化するイベント
+    INVALIDATING_EVENTS = {
+        UserEventTypes.USER_UPDATED,
+        UserEventTypes.USER_DELETED,
+        UserEventTypes.USER_DEACTIVATED,
+    }
+
+    def __init__(self):
+        self.client: Optional[httpx.AsyncClient] = None
+        self.logger = app_logger
+        self.is_initialized = False
+        self.circuit_breaker = CircuitBreaker(
+            "user-service",
+            failure_threshold=settings.USER_SERVICE_CIRCUIT_FAILURE_THRESHOLD,
+            reset_timeout=settings.USER_SERVICE_CIRCUIT_RESET_TIMEOUT,
+        )
+        # トークン発行に必要なプロファイル情報のキャッシュ（キー: user_id）
+        self.profile_cache = TTLCache(
+            maxsize=settings.USER_PROFILE_CACHE_MAX_SIZE,
+            ttl=settings.USER_PROFILE_CACHE_TTL,
+        )
+
+    def _create_client(self) -> httpx.AsyncClient:
+        """コネクションプールとKeep-Aliveを有効にしたクライアントを作成"""
+        return httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=settings.USER_SERVICE_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.USER_SERVICE_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.USER_SERVICE_KEEPALIVE_EXPIRY,
+            ),
+            timeout=httpx.Timeout(
+                connect=settings.USER_SERVICE_CONNECT_TIMEOUT,
+                read=settings.USER_SERVICE_READ_TIMEOUT,
+                write=settings.USER_SERVICE_WRITE_TIMEOUT,
+                pool=settings.USER_SERVICE_POOL_TIMEOUT,
+            ),
+        )
+
+    async def initialize(self):
+        """HTTPクライアントの初期化"""
+        if self.is_initialized:
+            return
+
+        self.client = self._create_client()
+        self.is_initialized = True
+        self.logger.info("User Service用HTTPクライアントを作成しました")
+
+    async def close(self):
+        """HTTPクライアントのクローズ"""
+        if self.client is not None:
+            await self.client.aclose()
+        self.client = None
+        self.is_initialized = False
+        self.logger.info("User Service用HTTPクライアントがクローズされました")
+
+    def _backoff_delay(self, attempt: int) -> float:
+        """ジッター付き指数バックオフの待機時間（Full Jitter）"""
+        upper = min(
+            settings.USER_SERVICE_RETRY_BACKOFF_MAX,
+            settings.USER_SERVICE_RETRY_BACKOFF_BASE * (2 ** attempt),
+        )
+        return random.uniform(0, upper)
+
+    async def get_user_info(self, user_id: UUID) -> Dict[str, Any]:
+        """
+        User Serviceからユーザー情報を取得する
+
+        Args:
+            user_id: ユーザーID
+
+        Returns:
+            dict: ユーザー情報を含む辞書（is_admin属性などを含む）
+
+        Raises:
+            HTTPException: リクエスト失敗時、またはサーキットがオープンの場合
+        """
+        # キャッシュ済みのプロファイルがあればUser Serviceへの問い合わせを省略する
+        cached = self.profile_cache.get(str(user_id))
+        if cached is not None:
+            return cached
+
+        if not self.is_initialized:
+            await self.initialize()
+
+        # サーキットがオープンの場合は待たずに失敗させる
+        if not self.circuit_breaker.allow_request():
+            self.logger.warning("User Serviceへのサーキットがオープンのためリクエストを拒否しました")
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="ユーザー情報サービスに接続できません。しばらく経ってからお試しください。"
+            )
+
+        # User ServiceのURLを設定
+        user_service_url = settings.USER_SERVICE_URL  # 設定から取得
+        endpoint = f"{user_service_url}/api/v1/profile/{user_id}"
+
+        last_error: Optional[Exception] = None
+        for attempt in range(settings.USER_SERVICE_MAX_RETRIES + 1):
+            if attempt > 0:
+                await asyncio.sleep(self._backoff_delay(attempt - 1))
+
+            try:
+                # User Serviceにリクエスト送信
+                response = await self.client.get(endpoint)
+            except httpx.RequestError as e:
+                # 接続エラー・タイムアウトは再試行対象
+                last_error = e
+                self.logger.warning(f"User Serviceへの接続エラー（試行{attempt + 1}回目）: {str(e)}")
+                continue
+
+            # 5xxは再試行対象
+            if response.status_code >= status.HTTP_500_INTERNAL_SERVER_ERROR:
+                last_error = httpx.HTTPStatusError(
+                    f"User Serviceがエラーを返しました: {response.status_code}",
+                    request=response.request,
+                    response=response,
+                )
+                self.logger.warning(f"User Serviceからのレスポンスエラー（試行{attempt + 1}回目）: {response.status_code}")
+                continue
+
+            # ここまで到達した場合、User Service自体は応答している
+            self.circuit_breaker.record_success()
 
-async def get_user_info_from_user_service(user_id: UUID) -> dict:
-    """
-    User Serviceからユーザー情報を取得する関数
-    
-    Args:
-        user_id: ユーザーID
-        
-    Returns:
-        dict: ユーザー情報を含む辞書（is_admin属性などを含む）
-        
-    Raises:
-        HTTPException: リクエスト失敗時
-    """
-    # User ServiceのURLを設定
-    user_service_url = settings.USER_SERVICE_URL  # 設定から取得
-    endpoint = f"{user_service_url}/api/v1/profile/{user_id}"
-    
-    try:
-        async with httpx.AsyncClient() as client:
-            # User Serviceにリクエスト送信
-            response = await client.get(endpoint, timeout=10.0)
-            
             # エラーチェック
             if response.status_code == status.HTTP_404_NOT_FOUND:
-                app_logger.warning(f"ユーザーID '{user_id}' がUser Serviceに存在しません")
+                self.logger.warning(f"ユーザーID '{user_id}' がUser Serviceに存在しません")
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND,
                     detail="指定されたユーザーが見つかりません"
                 )
-            
-            # その他のHTTPエラー
-            response.raise_for_status()
-            
+
+            try:
+                # その他のHTTPエラー
+                response.raise_for_status()
+            except httpx.HTTPStatusError as e:
+                # HTTPエラー（404以外）
+                self.logger.error(f"User Serviceからのレスポンスエラー: {str(e)}", exc_info=True)
+                raise HTTPException(
+                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                    detail="ユーザー情報の取得中にエラーが発生しました"
+                )
+
             # JSONレスポンスを取得
             user_info = response.json()
-            
-            # 必要な情報を抽出して返却
-            return {
+
+            # 必要な情報を抽出してキャッシュに保存
+            profile = {
                 "id": user_info.get("id"),
                 "username": user_info.get("username"),
                 "fullname": user_info.get("fullname"),
                 "is_admin": user_info.get("is_admin", False),
                 "is_active": user_info.get("is_active", True)
             }
-            
-    except httpx.RequestError as e:
-        # 接続エラー
-        app_logger.error(f"User Serviceへの接続エラー: {str(e)}", exc_info=True)
-        raise HTTPException(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail="ユーザー情報サービスに接続できません。しばらく経ってからお試しください。"
-        )
-    
-    except httpx.HTTPStatusError as e:
-        # HTTPエラー（404以外）
-        app_logger.error(f"User Serviceからのレスポンスエラー: {str(e)}", exc_info=True)
+            self.profile_cache.set(str(user_id), profile)
+            return profile
+
+        # 全ての試行が失敗した場合
+        self.circuit_breaker.record_failure()
+        self.logger.error(f"User Serviceへのリクエストが失敗しました: {str(last_error)}")
+
+        if isinstance(last_error, httpx.RequestError):
+            # 接続エラー
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="ユーザー情報サービスに接続できません。しばらく経ってからお試しください。"
+            )
+
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="ユーザー情報の取得中にエラーが発生しました"
-        )
\ No newline at end of file
+        )
+
+    def invalidate_user(self, user_id: Any):
+        """指定ユーザーのキャッシュ済みプロファイルを破棄"""
+        if user_id is not None and self.profile_cache.delete(str(user_id)):
+            self.logger.debug(f"プロファイルキャッシュを破棄しました: user_id={user_id}")
+
+    async def handle_user_event(self, event_type: str, user_data: Dict[str, Any]):
+        """
+        ユーザーイベントを受けてプロファイルキャッシュを無効化する
+
+        イベントのidはauth-serviceのID、user_idはUser ServiceのIDであるため両方を破棄対象とする
+        """
+        if event_type not in self.INVALIDATING_EVENTS:
+            return
+
+        self.invalidate_user(user_data.get("user_id"))
+        self.invalidate_user(user_data.get("id"))
+
+    def stats(self) -> Dict[str, Any]:
+        """HTTPクライアントとサーキットブレーカーの状態を返す"""
+        return {
+            "initialized": self.is_initialized,
+            "circuit_breaker": self.circuit_breaker.stats(),
+            "profile_cache": self.profile_cache.stats(),
+        }
+
+
+# シングルトンインスタンス
+user_service_client = UserServiceClient()
+
+
+async def get_user_info_from_user_service(user_id: UUID) -> dict:
+    """
+    User Serviceからユーザー情報を取得する関数
+
+    Args:
+        user_id: ユーザーID
+
+    Returns:
+        dict: ユーザー情報を含む辞書（is_admin属性などを含む）
+
+    Raises:
+        HTTPException: リクエスト失敗時
+    """
+    return await user_service_client.get_user_info(user_id)
@@ -0,0 +1,240 @@
+import asyncio
+import hashlib
+import math
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from app.core.config import settings
+from app.core.logging import app_logger
+from app.db.redis import redis_client
+
+BLACKLIST_KEY_PREFIX = "blacklist_token:"
+
+
+class BloomFilter:
+    """固定サイズのビット配列によるブルームフィルター"""
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = max(capacity, 1)
+        # 想定要素数と誤検知率から最適なビット数とハッシュ関数の数を算出
+        self.size = max(int(math.ceil(-self.capacity * math.log(error_rate) / (math.log(2) ** 2))), 8)
+        self.hash_count = max(int(round(self.size / self.capacity * math.log(2))), 1)
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str):
+        # 128bitのダイジェストを2つのハッシュ値に分割し、ダブルハッシュでk個の位置を求める
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:], "big") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hash_count))
+
+    def add(self, item: str):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class RevocationFilter:
+    """
+    失効済みトークン（JTI）のローカルフィルター
+
+    - トークンのexpごとにバケットを分け、期限切れのバケットは丸ごと破棄する
+    - フィルターに含まれないJTIは失効していないことが確定するため、Redisへの問い合わせを省略できる
+    - Redis Pub/Subで他ワーカーの失効登録を受け取り、起動時・再接続時はRedisから再構築する
+    - 同期が取れていない間（is_ready=False）は常にRedisに問い合わせる
+    """
+
+    def __init__(self):
+        self.buckets: Dict[int, BloomFilter] = {}
+        self.logger = app_logger
+        self.is_ready = False
+        self._task: Optional[asyncio.Task] = None
+        # 失効通知を受けたときに呼び出すコールバック（引数: JTI）
+        self.revoke_listeners: List[Callable[[str], None]] = []
+        self.redis_checks = 0
+        self.skipped_checks = 0
+
+    def _bucket_key(self, exp: float) -> int:
+        return int(exp // settings.TOKEN_BLACKLIST_FILTER_BUCKET_SECONDS)
+
+    def _expire_buckets(self):
+        """全トークンが期限切れになったバケットを破棄"""
+        current = self._bucket_key(time.time())
+        for key in [key for key in self.buckets if key < current]:
+            del self.buckets[key]
+
+    def add(self, jti: str, exp: float):
+        """失効したJTIをフィルターに追加"""
+        if exp <= time.time():
+            return
+        self._expire_buckets()
+        key = self._bucket_key(exp)
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = BloomFilter(
+                settings.TOKEN_BLACKLIST_FILTER_CAPACITY,
+                settings.TOKEN_BLACKLIST_FILTER_ERROR_RATE,
+            )
+            self.buckets[key] = bucket
+        bucket.add(jti)
+
+    def might_be_revoked(self, jti: str, exp: Optional[float]) -> bool:
+        """
+        JTIが失効している可能性があるかを判定する
+
+        Returns:
+            bool: Falseの場合は失効していないことが確定。Trueの場合はRedisでの確認が必要
+        """
+        if not self.is_ready or exp is None:
+            self.redis_checks += 1
+            return True
+
+        bucket = self.buckets.get(self._bucket_key(exp))
+        if bucket is not None and jti in bucket:
+            self.redis_checks += 1
+            return True
+
+        self.skipped_checks += 1
+        return False
+
+    def add_revoke_listener(self, listener: Callable[[str], None]):
+        """失効通知を受けたときのコールバックを登録"""
+        self.revoke_listeners.append(listener)
+
+    def _notify_revoked(self, jti: str):
+        for listener in self.revoke_listeners:
+            try:
+                listener(jti)
+            except Exception as e:
+                self.logger.error(f"トークン失効コールバックのエラー: {str(e)}", exc_info=True)
+
+    async def publish(self, jti: str, exp: float):
+        """他のワーカーに失効を通知し、自プロセスのフィルターにも即時反映する"""
+        self.add(jti, exp)
+        self._notify_revoked(jti)
+        r = redis_client.get_client()
+        await r.publish(settings.TOKEN_BLACKLIST_CHANNEL, f"{jti}:{int(exp)}")
+
+    async def _rebuild(self):
+        """Redis上のブラックリストからフィルターを再構築"""
+        r = redis_client.get_client()
+        self.buckets = {}
+        now = time.time()
+        loaded = 0
+        batch = []
+
+        async def flush(keys):
+            pipe = r.pipeline(transaction=False)
+            for key in keys:
+                pipe.get(key)
+                pipe.pttl(key)
+            results = await pipe.execute()
+            for key, value, pttl in zip(keys, results[0::2], results[1::2]):
+                if not pttl or pttl <= 0:
+                    continue
+                if isinstance(key, bytes):
+                    key = key.decode()
+                jti = key[len(BLACKLIST_KEY_PREFIX):]
+                try:
+                    # 値にはトークンのexpを保存している
+                    exp = float(value)
+                except (TypeError, ValueError):
+                    exp = 0.0
+                if exp > now:
+                    self.add(jti, exp)
+                else:
+                    # 旧形式（値が"1"）の場合はTTLからexpを推定し、前後のバケットにも登録する
+                    approx_exp = now + pttl / 1000
+                    for approx in (approx_exp - 2, approx_exp, approx_exp + 2):
+                        self.add(jti, approx)
+
+        async for key in r.scan_iter(match=f"{BLACKLIST_KEY_PREFIX}*", count=1000):
+            batch.append(key)
+            if len(batch) >= 1000:
+                await flush(batch)
+                loaded += len(batch)
+                batch = []
+        if batch:
+            await flush(batch)
+            loaded += len(batch)
+
+        self.logger.info(f"トークン失効フィルターを再構築しました: {loaded}件")
+
+    async def _run(self):
+        """Pub/Subを購読し続ける（切断時は再購読してフィルターを再構築する）"""
+        retry_delay = 1.0
+        while True:
+            pubsub = None
+            try:
+                r = redis_client.get_client()
+                pubsub = r.pubsub()
+                # 購読を先に開始してから再構築し、再構築中の失効登録を取りこぼさないようにする
+                await pubsub.subscribe(settings.TOKEN_BLACKLIST_CHANNEL)
+                await self._rebuild()
+                self.is_ready = True
+                retry_delay = 1.0
+
+                while True:
+                    # ソケットタイムアウトより短い間隔でポーリングする
+                    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                    if message is None or message.get("type") != "message":
+                        continue
+                    data = message["data"]
+                    if isinstance(data, bytes):
+                        data = data.decode()
+                    jti, _, exp = data.rpartition(":")
+                    try:
+                        self.add(jti, float(exp))
+                    except ValueError:
+                        self.logger.warning(f"不正な失効通知を受信しました: {data}")
+                        continue
+                    self._notify_revoked(jti)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.logger.error(f"トークン失効フィルターの同期エラー: {str(e)}", exc_info=True)
+            finally:
+                self.is_ready = False
+                if pubsub is not None:
+                    try:
+                        await pubsub.aclose()
+                    except Exception:
+                        pass
+
+            await asyncio.sleep(retry_delay)
+            retry_delay = min(retry_delay * 2, 30.0)
+
+    async def start(self):
+        """バックグラウンドでの同期を開始"""
+        if self._task is None and settings.TOKEN_BLACKLIST_ENABLED and settings.TOKEN_BLACKLIST_FILTER_ENABLED:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """バックグラウンドでの同期を停止"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.is_ready = False
+
+    def stats(self) -> Dict[str, Any]:
+        """フィルターの状態を返す"""
+        return {
+            "ready": self.is_ready,
+            "buckets": len(self.buckets),
+            "entries": sum(bucket.count for bucket in self.buckets.values()),
+            "memory_bytes": sum(len(bucket.bits) for bucket in self.buckets.values()),
+            "redis_checks": self.redis_checks,
+            "skipped_checks": self.skipped_checks,
+        }
+
+
+# シングルトンインスタンス
+revocation_filter = RevocationFilter()
@@ -24,6 +24,18 @@ class Settings(BaseSettings):
     RABBITMQ_VHOST: str = "/"
     USER_SYNC_EXCHANGE: str = "user_events"
     USER_SYNC_ROUTING_KEY: str = "user.sync"
+    USER_PROFILE_ROUTING_KEY: str = "user.profile"  # User Serviceでのプロファイル変更イベント（auth-serviceのキャッシュ無効化用）
+    USER_SYNC_PARTITIONS: int = 1  # ユーザーIDで振り分けるパーティション数（1の場合は単一のキューを使う）
+    RABBITMQ_PUBLISH_CHANNELS: int = 4  # 発行用チャネル数
+    RABBITMQ_PUBLISH_MAX_IN_FLIGHT: int = 256  # 確認応答待ちのメッセージ数の上限
+    RABBITMQ_PUBLISH_TIMEOUT: float = 10.0  # 確認応答を待つ最大時間（秒）
+    
+    # トランザクショナルアウトボックスの設定
+    OUTBOX_RELAY_ENABLED: bool = True
+    OUTBOX_BATCH_SIZE: int = 100  # 1回に送信するイベント数
+    OUTBOX_POLL_INTERVAL: float = 1.0  # 未送信イベントを確認する間隔（秒）
+    OUTBOX_RETENTION_SECONDS: int = 86400  # 送信済みイベントを保持する期間（秒）
+    OUTBOX_CLEANUP_INTERVAL: float = 3600.0  # 送信済みイベントを削除する間隔（秒）
 
     # データベース設定
     POSTGRES_USER: str
@@ -31,25 +43,87 @@ class Settings(BaseSettings):
     POSTGRES_HOST: str
     POSTGRES_PORT: str
     POSTGRES_DB: str
+    DATABASE_READ_REPLICA_URLS: str = ""  # 読み取り専用セッションの接続先（カンマ区切り、未指定の場合はプライマリ）
+    DATABASE_READ_REPLICA_STRATEGY: Literal["round_robin", "least_load"] = "round_robin"  # レプリカの選択方法
+    DATABASE_READ_YOUR_WRITES_WINDOW: float = 5.0  # 書き込み後にプライマリから読み取る時間（秒）
+    DB_POOL_SIZE: int = 5  # ワーカープロセスごと・接続先ごとに保持する接続数
+    DB_MAX_OVERFLOW: int = 10  # プールサイズを超えて一時的に作成できる接続数
+    DB_POOL_TIMEOUT: float = 10.0  # 空き接続を待つ最大時間（秒）
+    DB_POOL_RECYCLE: int = 1800  # 接続を再作成するまでの時間（秒、-1で無効）
+    DB_POOL_PRE_PING: bool = True  # 取得時に接続の生存を確認する
+    DB_PREPARED_STATEMENT_CACHE_SIZE: int = 500  # 接続ごとにキャッシュするasyncpgのプリペアドステートメント数（0で無効）
+    DB_QUERY_CACHE_SIZE: int = 500  # SQLAlchemyのコンパイル済みSQLのキャッシュ数
     
     # Redis設定
     REDIS_HOST: str = "auth_redis"
     REDIS_PORT: int = 6379
+    REDIS_MAX_CONNECTIONS: int = 50  # プロセスあたりの最大接続数
+    REDIS_POOL_TIMEOUT: float = 5.0  # プール枯渇時に接続の返却を待つ秒数
+    REDIS_SOCKET_TIMEOUT: float = 2.0
+    REDIS_SOCKET_CONNECT_TIMEOUT: float = 2.0
+    REDIS_HEALTH_CHECK_INTERVAL: int = 30  # アイドル接続のヘルスチェック間隔（秒）
     
     # トークン設定
     ALGORITHM: str = "RS256"  # HS256からRS256に変更
     PRIVATE_KEY_PATH: str = "keys/private.pem"  # 秘密鍵のパス
     PUBLIC_KEY_PATH: str = "keys/public.pem"   # 公開鍵のパス
+    # 鍵のローテーション中に検証・JWKS公開を継続する公開鍵のパス（カンマ区切り）
+    ADDITIONAL_PUBLIC_KEY_PATHS: str = ""
+    JWKS_CACHE_MAX_AGE: int = 300  # JWKSレスポンスのCache-Control max-age（秒）
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     REFRESH_TOKEN_EXPIRE_DAYS: int = 7
     
+    # パスワードハッシュ設定（bcryptはイベントループ外のワーカープールで実行）
+    PASSWORD_HASH_EXECUTOR: Literal["thread", "process"] = "thread"
+    PASSWORD_HASH_WORKERS: int = 4  # 同時に実行するハッシュ計算の上限
+    PASSWORD_HASH_MAX_PENDING: int = 64  # 実行中＋待機中の上限（超過時は503を返す）
+    
     # トークンブラックリスト関連の設定
     TOKEN_BLACKLIST_ENABLED: bool = True
+    TOKEN_BLACKLIST_FILTER_ENABLED: bool = True  # 失効済みJTIのローカルブルームフィルター
+    TOKEN_BLACKLIST_FILTER_CAPACITY: int = 100000  # バケットあたりの想定要素数
+    TOKEN_BLACKLIST_FILTER_ERROR_RATE: float = 0.001
+    TOKEN_BLACKLIST_FILTER_BUCKET_SECONDS: int = 300  # expで区切るバケットの幅（秒）
+    TOKEN_BLACKLIST_CHANNEL: str = "token_blacklist"  # 失効通知用のPub/Subチャネル
+    
+    # 署名検証済みトークンのキャッシュ設定（エントリはトークンのexpで失効）
+    VERIFIED_TOKEN_CACHE_ENABLED: bool = True
+    VERIFIED_TOKEN_CACHE_MAX_SIZE: int = 10000
+    
+    # 一括トークン検証で受け付ける最大件数
+    TOKEN_VERIFY_BATCH_MAX_SIZE: int = 500
+    
+    # ステートレス認証（有効時はトークンのクレームから認証主体を組み立て、DBを参照しない）
+    STATELESS_AUTH_ENABLED: bool = False
+    
+    # ユーザー一覧のページネーション設定
+    USERS_PAGE_SIZE: int = 100  # 1ページあたりのデフォルト件数
+    USERS_PAGE_SIZE_MAX: int = 1000
+    USERS_STREAM_BATCH_SIZE: int = 500  # NDJSONストリーミング時にカーソルから一度に取得する件数
+    BULK_IMPORT_BATCH_SIZE: int = 5000  # 一括インポートでCOPYする1回あたりの件数
 
     # ユーザーサービスのURL
     USER_SERVICE_INTERNAL_PORT: int = 8082
     USER_SERVICE_URL: str = f"http://user-service:{USER_SERVICE_INTERNAL_PORT}/api/v1/users"
     
+    # ユーザーサービスへのHTTPクライアント設定
+    USER_SERVICE_MAX_CONNECTIONS: int = 100
+    USER_SERVICE_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    USER_SERVICE_KEEPALIVE_EXPIRY: float = 30.0
+    USER_SERVICE_CONNECT_TIMEOUT: float = 1.0
+    USER_SERVICE_READ_TIMEOUT: float = 2.0
+    USER_SERVICE_WRITE_TIMEOUT: float = 2.0
+    USER_SERVICE_POOL_TIMEOUT: float = 1.0  # プールから接続を取得するまでの待機時間
+    USER_SERVICE_MAX_RETRIES: int = 2
+    USER_SERVICE_RETRY_BACKOFF_BASE: float = 0.1  # 秒
+    USER_SERVICE_RETRY_BACKOFF_MAX: float = 1.0  # 秒
+    USER_SERVICE_CIRCUIT_FAILURE_THRESHOLD: int = 5  # 連続失敗回数
+    USER_SERVICE_CIRCUIT_RESET_TIMEOUT: float = 30.0  # オープン状態を維持する秒数
+    
+    # ユーザープロファイルキャッシュ設定（ユーザーイベントでも無効化される）
+    USER_PROFILE_CACHE_MAX_SIZE: int = 10000
+    USER_PROFILE_CACHE_TTL: float = 10.0  # 秒（イベントを取りこぼした場合の最大遅延）
+    
     @property
     def DATABASE_URL(self) -> str:
         return f"postgresql+asyncpg://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@{self.POSTGRES_HOST}:{self.POSTGRES_PORT}/{self.POSTGRES_DB}"
@@ -0,0 +1,146 @@
+import asyncio
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from passlib.context import CryptContext
+
+from app.core.config import settings
+from app.core.logging import app_logger
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+# ワーカー側で実行される関数（プロセスプールでpickleできるようモジュールレベルに定義）
+def hash_password_sync(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def verify_password_sync(plain_password: str, hashed_password: str) -> bool:
+    return pwd_context.verify(plain_password, hashed_password)
+
+
+class PasswordHasherBusyError(Exception):
+    """パスワードハッシュ処理の待ち行列が上限に達した場合の例外"""
+    pass
+
+
+class PasswordHasher:
+    """bcryptの計算をイベントループ外のワーカープールで実行するクラス"""
+
+    def __init__(self):
+        self.executor: Optional[Executor] = None
+        self.logger = app_logger
+        self.is_initialized = False
+        # 実行中＋待機中のタスク数（イベントループ上でのみ更新するためロック不要）
+        self.pending = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.total_seconds = 0.0
+        self.bulk_completed = 0
+
+    def initialize(self):
+        """設定に従ってスレッドプールまたはプロセスプールを作成"""
+        if self.is_initialized:
+            return
+
+        if settings.PASSWORD_HASH_EXECUTOR == "process":
+            self.executor = ProcessPoolExecutor(max_workers=settings.PASSWORD_HASH_WORKERS)
+        else:
+            self.executor = ThreadPoolExecutor(
+                max_workers=settings.PASSWORD_HASH_WORKERS,
+                thread_name_prefix="password-hasher",
+            )
+        self.is_initialized = True
+        self.logger.info(
+            f"パスワードハッシュ用ワーカープールを作成しました: "
+            f"executor={settings.PASSWORD_HASH_EXECUTOR}, workers={settings.PASSWORD_HASH_WORKERS}"
+        )
+
+    def close(self):
+        """ワーカープールのシャットダウン"""
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+        self.executor = None
+        self.is_initialized = False
+        self.logger.info("パスワードハッシュ用ワーカープールをシャットダウンしました")
+
+    async def _run(self, func: Callable[..., Any], *args: Any) -> Any:
+        """
+        ワーカープールで関数を実行する
+
+        Raises:
+            PasswordHasherBusyError: 待ち行列が上限に達している場合
+        """
+        if not self.is_initialized:
+            self.initialize()
+
+        # 待ち行列が溢れている場合は待たせずに即座に拒否する
+        if self.pending >= settings.PASSWORD_HASH_MAX_PENDING:
+            self.rejected += 1
+            raise PasswordHasherBusyError("パスワードハッシュ処理が混雑しています")
+
+        self.pending += 1
+        start_time = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(self.executor, func, *args)
+        except Exception:
+            # ワーカーの異常終了やbcryptの例外は完了件数・平均処理時間に含めない
+            self.failed += 1
+            raise
+        finally:
+            self.pending -= 1
+
+        self.completed += 1
+        self.total_seconds += time.perf_counter() - start_time
+        return result
+
+    async def hash(self, password: str) -> str:
+        """パスワードのハッシュ値を計算"""
+        return await self._run(hash_password_sync, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """パスワードとハッシュ値を照合"""
+        return await self._run(verify_password_sync, plain_password, hashed_password)
+
+    async def hash_many(self, passwords: List[str]) -> List[str]:
+        """
+        複数パスワードのハッシュ値をまとめて計算（一括インポート用）
+
+        待ち行列の上限は適用しない代わりに同時実行数をワーカー数までに抑え、
+        ログインなど対話的な処理がワーカー数分以上待たされないようにする
+        """
+        if not self.is_initialized:
+            self.initialize()
+
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(settings.PASSWORD_HASH_WORKERS)
+
+        async def run(password: str) -> str:
+            async with semaphore:
+                return await loop.run_in_executor(self.executor, hash_password_sync, password)
+
+        hashes = await asyncio.gather(*(run(password) for password in passwords))
+        self.bulk_completed += len(passwords)
+        return list(hashes)
+
+    def stats(self) -> Dict[str, Any]:
+        """ワーカープールの利用状況を返す"""
+        return {
+            "executor": settings.PASSWORD_HASH_EXECUTOR,
+            "workers": settings.PASSWORD_HASH_WORKERS,
+            "max_pending": settings.PASSWORD_HASH_MAX_PENDING,
+            "in_flight": min(self.pending, settings.PASSWORD_HASH_WORKERS),
+            "queued": max(self.pending - settings.PASSWORD_HASH_WORKERS, 0),
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "bulk_completed": self.bulk_completed,
+            "avg_seconds": self.total_seconds / self.completed if self.completed else 0.0,
+        }
+
+
+# シングルトンインスタンス
+password_hasher = PasswordHasher()
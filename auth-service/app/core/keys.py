@@ -0,0 +1,135 @@
+import base64
+import hashlib
+import json
+import threading
+from typing import Any, Dict, List, Optional
+
+from jose import jwk
+from jose.backends.base import Key
+
+from app.core.config import settings
+from app.core.logging import app_logger
+
+
+def _b64url(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def compute_kid(public_key: Key) -> str:
+    """公開鍵のJWKサムプリント（RFC 7638）を鍵IDとして算出"""
+    jwk_dict = public_key.to_dict()
+    # サムプリントは必須メンバーのみを辞書順に並べたJSONから求める
+    required = {name: jwk_dict[name] for name in ("e", "kty", "n") if name in jwk_dict}
+    canonical = json.dumps(required, separators=(",", ":"), sort_keys=True)
+    return _b64url(hashlib.sha256(canonical.encode()).digest())
+
+
+class KeyManager:
+    """
+    JWTの署名・検証に使用する鍵をメモリ上に保持するクラス
+
+    - 署名には現在の秘密鍵のみを使用し、トークンのヘッダーに鍵ID（kid）を含める
+    - 検証には現在の公開鍵に加え、ADDITIONAL_PUBLIC_KEY_PATHSの公開鍵も受け付ける
+      （鍵のローテーション中に旧鍵で署名されたトークンを検証するため）
+    """
+
+    def __init__(self):
+        self.private_key: Optional[Key] = None
+        self.public_key: Optional[Key] = None
+        self.kid: Optional[str] = None
+        # 検証を受け付ける公開鍵（キー: kid）
+        self.public_keys: Dict[str, Key] = {}
+        self.logger = app_logger
+        self.is_loaded = False
+        # 鍵を読み込むたびに増加する（鍵に依存するキャッシュの無効化に使用）
+        self.version = 0
+        self._lock = threading.Lock()
+
+    def _load_additional_public_keys(self) -> List[Key]:
+        """ローテーション中に併用する公開鍵を読み込む"""
+        keys = []
+        for path in settings.ADDITIONAL_PUBLIC_KEY_PATHS.split(","):
+            path = path.strip()
+            if not path:
+                continue
+            with open(path, "r") as f:
+                keys.append(jwk.construct(f.read(), settings.ALGORITHM))
+        return keys
+
+    def load(self):
+        """
+        PEMファイルを読み込み、署名・検証用の鍵オブジェクトに変換する
+
+        読み込みやパースに失敗した場合は例外を送出し、既存の鍵は保持したままにする。
+        """
+        private_key = jwk.construct(settings.PRIVATE_KEY, settings.ALGORITHM)
+        public_key = jwk.construct(settings.PUBLIC_KEY, settings.ALGORITHM)
+        kid = compute_kid(public_key)
+
+        public_keys = {kid: public_key}
+        for additional_key in self._load_additional_public_keys():
+            public_keys.setdefault(compute_kid(additional_key), additional_key)
+
+        # 全ての鍵のパースが成功してから差し替える
+        with self._lock:
+            self.private_key = private_key
+            self.public_key = public_key
+            self.kid = kid
+            self.public_keys = public_keys
+            self.is_loaded = True
+            self.version += 1
+
+        self.logger.info(f"JWT署名鍵を読み込みました: kid={kid}, 検証用公開鍵={len(public_keys)}件")
+
+    def reload(self) -> bool:
+        """
+        鍵を再読み込みする（シグナルハンドラーや管理者エンドポイントから呼び出す）
+
+        Returns:
+            bool: 再読み込みに成功した場合はTrue、失敗した場合はFalse
+        """
+        try:
+            self.load()
+            return True
+        except Exception as e:
+            self.logger.error(f"JWT署名鍵の再読み込みに失敗しました: {str(e)}", exc_info=True)
+            return False
+
+    def get_signing_key(self) -> Key:
+        """署名用の秘密鍵を取得"""
+        if not self.is_loaded:
+            self.load()
+        return self.private_key
+
+    def get_signing_kid(self) -> str:
+        """署名用の秘密鍵の鍵IDを取得"""
+        if not self.is_loaded:
+            self.load()
+        return self.kid
+
+    def get_verification_key(self, kid: Optional[str] = None) -> Key:
+        """
+        検証用の公開鍵を取得
+
+        kidが指定されていない場合（kid導入前のトークン）や未知の場合は現在の公開鍵を返す
+        """
+        if not self.is_loaded:
+            self.load()
+        if kid is not None:
+            return self.public_keys.get(kid, self.public_key)
+        return self.public_key
+
+    def get_jwks(self) -> Dict[str, Any]:
+        """検証を受け付ける公開鍵をJWKS形式で返す"""
+        if not self.is_loaded:
+            self.load()
+        keys = []
+        for kid, public_key in self.public_keys.items():
+            jwk_dict = public_key.to_dict()
+            jwk_dict.update({"kid": kid, "use": "sig", "alg": settings.ALGORITHM})
+            keys.append(jwk_dict)
+        return {"keys": keys}
+
+
+# シングルトンインスタンス
+key_manager = KeyManager()
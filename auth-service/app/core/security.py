@@ -1,20 +1,22 @@
-from passlib.context import CryptContext
+import asyncio
 from datetime import datetime, timedelta, UTC
 from jose import jwt, JWTError
 import secrets
-import redis.asyncio as redis
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from .config import settings
 import uuid
 from app.core.logging import app_logger
+from app.core.blacklist import BLACKLIST_KEY_PREFIX, revocation_filter
+from app.core.hashing import password_hasher
+from app.core.keys import key_manager
+from app.core.token_cache import verified_token_cache
+from app.db.redis import redis_client
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+async def get_password_hash(password: str) -> str:
+    return await password_hasher.hash(password)
 
-def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
-
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return await password_hasher.verify(plain_password, hashed_password)
 
 async def create_access_token(data: Dict[str, Any], expires_delta: Optional[timedelta] = None) -> str:
     """
@@ -38,15 +40,21 @@ async def create_access_token(data: Dict[str, Any], expires_delta: Optional[time
     
     to_encode.update({"exp": expire})
     
-    # 秘密鍵を使用してトークンを署名
+    # パース済みの秘密鍵を使用してトークンを署名（検証側が鍵を選べるようkidを付与）
     encoded_jwt = jwt.encode(
         to_encode, 
-        settings.PRIVATE_KEY, 
-        algorithm=settings.ALGORITHM
+        key_manager.get_signing_key(), 
+        algorithm=settings.ALGORITHM,
+        headers={"kid": key_manager.get_signing_kid()}
     )
     
     return encoded_jwt
 
+def _get_verification_key(token: str):
+    """トークンヘッダーのkidに対応する検証用の公開鍵を取得"""
+    kid = jwt.get_unverified_header(token).get("kid")
+    return key_manager.get_verification_key(kid)
+
 # ブラックリストに追加する関数
 async def blacklist_token(token: str) -> bool:
     """トークンをブラックリストに追加する"""
@@ -59,7 +67,7 @@ async def blacklist_token(token: str) -> bool:
         # そうしないと無限ループになるので、直接JWTデコードする
         try:
             payload = jwt.decode(token,
-                               settings.PUBLIC_KEY,
+                               _get_verification_key(token),
                                algorithms=[settings.ALGORITHM])
         except JWTError:
             return False
@@ -78,9 +86,15 @@ async def blacklist_token(token: str) -> bool:
         ttl = max(int(exp - now), 0)
         
         # Redisに保存
-        r = redis.from_url(settings.REDIS_URL)
-        await r.setex(f"blacklist_token:{jti}", ttl, "1")
-        await r.aclose()
+        r = redis_client.get_client()
+        await r.setex(f"{BLACKLIST_KEY_PREFIX}{jti}", ttl, str(int(exp)))
+        
+        # 各ワーカーのローカルフィルターに失効を通知
+        try:
+            await revocation_filter.publish(jti, exp)
+        except Exception as e:
+            # 通知に失敗しても購読側は再接続時にRedisから再構築するため、登録自体は成功とする
+            app_logger.warning(f"トークン失効の通知に失敗しました: {str(e)}")
         return True
     except Exception as e:
         app_logger.error(f"トークンのブラックリスト登録中にエラーが発生しました: {str(e)}", exc_info=True)
@@ -96,10 +110,13 @@ async def is_token_blacklisted(payload: Dict[str, Any]) -> bool:
     jti = payload.get("jti")
     if not jti:
         return False  # jtiがない場合は古いトークン形式なのでブラックリスト非対象
+    
+    # ローカルフィルターに含まれなければ失効していないことが確定するためRedisを参照しない
+    if not revocation_filter.might_be_revoked(jti, payload.get("exp")):
+        return False
         
-    r = redis.from_url(settings.REDIS_URL)
-    result = await r.get(f"blacklist_token:{jti}")
-    await r.aclose()
+    r = redis_client.get_client()
+    result = await r.get(f"{BLACKLIST_KEY_PREFIX}{jti}")
     
     return result is not None
 
@@ -113,10 +130,18 @@ async def verify_token(token: str) -> Optional[Dict[str, Any]]:
     Returns:
         Optional[Dict[str, Any]]: トークンが有効な場合はペイロード、無効な場合はNone
     """
+    # 検証済みトークンであれば署名検証を省略する
+    payload = verified_token_cache.get(token)
+    if payload is not None:
+        # キャッシュ後に失効している可能性があるためブラックリストチェックは毎回行う
+        if await is_token_blacklisted(payload):
+            return None
+        return payload
+    
     try:
-        # 公開鍵を使用してトークンを検証
+        # パース済みの公開鍵を使用してトークンを検証
         payload = jwt.decode(token,
-                             settings.PUBLIC_KEY,
+                             _get_verification_key(token),
                              algorithms=[settings.ALGORITHM]
                              )
         
@@ -124,10 +149,76 @@ async def verify_token(token: str) -> Optional[Dict[str, Any]]:
         if await is_token_blacklisted(payload):
             return None
         
+        # 失効していないトークンのみ署名検証の結果をキャッシュ
+        verified_token_cache.set(token, payload)
+        
         return payload
     except JWTError:
         return None
 
+async def are_tokens_blacklisted(payloads: List[Dict[str, Any]]) -> List[bool]:
+    """複数トークンのブラックリスト登録を1回のRedis MGETでまとめて確認"""
+    results = [False] * len(payloads)
+    if not settings.TOKEN_BLACKLIST_ENABLED:
+        return results
+    
+    # ローカルフィルターで失効の可能性があるものだけをRedisに問い合わせる
+    indexes = [
+        i for i, payload in enumerate(payloads)
+        if payload.get("jti") and revocation_filter.might_be_revoked(payload["jti"], payload.get("exp"))
+    ]
+    if not indexes:
+        return results
+    
+    r = redis_client.get_client()
+    values = await r.mget([f"{BLACKLIST_KEY_PREFIX}{payloads[i]['jti']}" for i in indexes])
+    for i, value in zip(indexes, values):
+        results[i] = value is not None
+    
+    return results
+
+def _decode_tokens(tokens: List[str]) -> List[Optional[Dict[str, Any]]]:
+    """複数トークンの署名をまとめて検証（不正なトークンはNone）"""
+    payloads = []
+    for token in tokens:
+        try:
+            payloads.append(jwt.decode(token, _get_verification_key(token), algorithms=[settings.ALGORITHM]))
+        except JWTError:
+            payloads.append(None)
+    return payloads
+
+async def verify_tokens(tokens: List[str]) -> List[Optional[Dict[str, Any]]]:
+    """
+    複数のJWTトークンをまとめて検証し、トークンごとのペイロードを返す関数
+    
+    - 検証済みキャッシュにないトークンの署名検証はワーカースレッドでまとめて行う
+    - ブラックリストの確認は1回のRedis MGETで行う
+    
+    Args:
+        tokens: 検証するJWTトークンのリスト
+        
+    Returns:
+        List[Optional[Dict[str, Any]]]: 入力と同じ順序のペイロード（無効なトークンはNone）
+    """
+    payloads: List[Optional[Dict[str, Any]]] = [verified_token_cache.get(token) for token in tokens]
+    
+    misses = [i for i, payload in enumerate(payloads) if payload is None]
+    if misses:
+        decoded = await asyncio.to_thread(_decode_tokens, [tokens[i] for i in misses])
+        for i, payload in zip(misses, decoded):
+            payloads[i] = payload
+    
+    valid = [i for i, payload in enumerate(payloads) if payload is not None]
+    revoked = await are_tokens_blacklisted([payloads[i] for i in valid])
+    for i, is_revoked in zip(valid, revoked):
+        if is_revoked:
+            payloads[i] = None
+        else:
+            # 失効していないトークンのみ署名検証の結果をキャッシュ
+            verified_token_cache.set(tokens[i], payloads[i])
+    
+    return payloads
+
 async def create_refresh_token(user_id: str) -> str:
     """
     リフレッシュトークンを作成し、Redisに保存する関数
@@ -141,17 +232,14 @@ async def create_refresh_token(user_id: str) -> str:
     # ランダムなトークンを生成
     token = secrets.token_urlsafe(32)
     
-    # Redisクライアントを初期化
-    r = redis.from_url(settings.REDIS_URL)
+    # 共有コネクションプールからRedisクライアントを取得
+    r = redis_client.get_client()
     
     # トークンをRedisに保存（キー: トークン, 値: ユーザーID）
     # 有効期限を設定
     expiry = settings.REFRESH_TOKEN_EXPIRE_DAYS * 24 * 60 * 60  # 日数を秒に変換
     await r.setex(f"refresh_token:{token}", expiry, user_id)
     
-    # 接続を閉じる
-    await r.aclose()
-    
     return token
 
 async def verify_refresh_token(token: str) -> Optional[str]:
@@ -164,15 +252,12 @@ async def verify_refresh_token(token: str) -> Optional[str]:
     Returns:
         Optional[str]: トークンが有効な場合はユーザーID、無効な場合はNone
     """
-    # Redisクライアントを初期化
-    r = redis.from_url(settings.REDIS_URL)
+    # 共有コネクションプールからRedisクライアントを取得
+    r = redis_client.get_client()
     
     # トークンをRedisから取得
     user_id = await r.get(f"refresh_token:{token}")
     
-    # 接続を閉じる
-    await r.aclose()
-    
     if user_id:
         return user_id.decode("utf-8")
     
@@ -188,13 +273,10 @@ async def revoke_refresh_token(token: str) -> bool:
     Returns:
         bool: 無効化に成功した場合はTrue、失敗した場合はFalse
     """
-    # Redisクライアントを初期化
-    r = redis.from_url(settings.REDIS_URL)
+    # 共有コネクションプールからRedisクライアントを取得
+    r = redis_client.get_client()
     
     # トークンをRedisから削除
     result = await r.delete(f"refresh_token:{token}")
     
-    # 接続を閉じる
-    await r.aclose()
-    
     return result > 0
\ No newline at end of file
@@ -0,0 +1,78 @@
+import hashlib
+import time
+from typing import Any, Dict, Optional
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.keys import key_manager
+
+
+class VerifiedTokenCache:
+    """
+    署名検証済みトークンのペイロードを保持するキャッシュ
+
+    - キーはトークンのSHA-256ダイジェスト（トークン本体は保持しない）
+    - エントリはトークンのexpで失効し、鍵の再読み込み後は再検証させる
+    - 失効（ブラックリスト登録）されたトークンはJTIから逆引きして破棄する
+    """
+
+    def __init__(self):
+        self.cache = TTLCache(
+            maxsize=settings.VERIFIED_TOKEN_CACHE_MAX_SIZE,
+            ttl=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+        )
+        # JTIからキャッシュキーへの逆引き（同じ容量・期限で管理）
+        self.jti_index = TTLCache(
+            maxsize=settings.VERIFIED_TOKEN_CACHE_MAX_SIZE,
+            ttl=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+        )
+
+    def _key(self, token: str):
+        # 鍵のバージョンを含め、鍵の再読み込み前に検証したエントリを参照しないようにする
+        return key_manager.version, hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> Optional[Dict[str, Any]]:
+        """検証済みのペイロードを取得（未検証・期限切れの場合はNone）"""
+        if not settings.VERIFIED_TOKEN_CACHE_ENABLED:
+            return None
+        return self.cache.get(self._key(token))
+
+    def set(self, token: str, payload: Dict[str, Any]):
+        """検証済みのペイロードを保存（有効期限はトークンのexpに合わせる）"""
+        if not settings.VERIFIED_TOKEN_CACHE_ENABLED:
+            return
+
+        exp = payload.get("exp")
+        if exp is None:
+            return
+
+        ttl = float(exp) - time.time()
+        if ttl <= 0:
+            return
+
+        key = self._key(token)
+        self.cache.set(key, payload, ttl)
+
+        jti = payload.get("jti")
+        if jti:
+            self.jti_index.set(jti, key, ttl)
+
+    def evict_jti(self, jti: str):
+        """失効したトークンのエントリを破棄"""
+        key = self.jti_index.get(jti)
+        if key is not None:
+            self.cache.delete(key)
+            self.jti_index.delete(jti)
+
+    def clear(self):
+        """全エントリを破棄"""
+        self.cache.clear()
+        self.jti_index.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """キャッシュの利用状況を返す"""
+        return self.cache.stats()
+
+
+# シングルトンインスタンス
+verified_token_cache = VerifiedTokenCache()
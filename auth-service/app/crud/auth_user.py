@@ -1,17 +1,24 @@
-from typing import Optional
+from datetime import datetime
+import uuid
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 from uuid import UUID
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import lambda_stmt, select, text, tuple_
 from sqlalchemy.exc import IntegrityError
 from app.models.auth_user import AuthUser
 from app.schemas.auth_user import UserCreate, AdminUserCreate, UserUpdate
 from app.core.security import get_password_hash
+from app.core.config import settings
+from app.core.bulk import BulkFormatError, parse_bool
+from app.core.hashing import password_hasher
+from app.db.bulk import copy_records
+from app.messaging.rabbitmq import UserEventTypes
 
 class CRUDAuthUser:
     async def create(self, db: AsyncSession, obj_in: UserCreate | AdminUserCreate) -> AuthUser:
         password = obj_in.password
-        hashed_password = get_password_hash(password)
+        hashed_password = await get_password_hash(password)
         
         # UserCreateの場合はis_adminがないのでFalseをデフォルト値として使用
         is_admin = getattr(obj_in, 'is_admin', False)
@@ -23,20 +30,57 @@ class CRUDAuthUser:
         )
         db.add(db_obj)
         # コミットは呼び出し元に任せる
-        await db.flush() # flush() でセッションに変更を反映
-        await db.refresh(db_obj)
+        # flush() でセッションに変更を反映（created_at等はINSERTのRETURNINGで取得される）
+        await db.flush()
         return db_obj
     
     async def get_all_users(self, db: AsyncSession) -> list[AuthUser]:
         result = await db.execute(select(AuthUser))
         return result.scalars().all()
 
+    async def get_users_page(
+        self,
+        db: AsyncSession,
+        limit: int,
+        after: Optional[Tuple[datetime, UUID]] = None
+    ) -> Tuple[List[AuthUser], Optional[Tuple[datetime, UUID]]]:
+        """
+        (created_at, id)のキーセットでユーザーを1ページ分取得
+        - afterには前ページ最後の(created_at, id)を指定する
+        - 次ページがある場合は最後の行の(created_at, id)を返す
+        """
+        query = select(AuthUser).order_by(AuthUser.created_at, AuthUser.id)
+        if after is not None:
+            query = query.filter(tuple_(AuthUser.created_at, AuthUser.id) > tuple_(*after))
+        
+        # 1件多く取得して次ページの有無を判定する
+        result = await db.execute(query.limit(limit + 1))
+        users = list(result.scalars().all())
+        if len(users) <= limit:
+            return users, None
+        
+        users = users[:limit]
+        return users, (users[-1].created_at, users[-1].id)
+
+    async def stream_all_users(self, db: AsyncSession) -> AsyncIterator[AuthUser]:
+        """サーバーサイドカーソルで全ユーザーを順に取得（メモリ使用量は一定）"""
+        query = (
+            select(AuthUser)
+            .order_by(AuthUser.created_at, AuthUser.id)
+            .execution_options(yield_per=settings.USERS_STREAM_BATCH_SIZE)
+        )
+        result = await db.stream_scalars(query)
+        async for db_user in result:
+            yield db_user
+
+    # 認証のたびに呼ばれる検索はlambda_stmtで組み立て、文の構築とキャッシュキーの計算を省く
+    # （ラムダ内で参照する変数はバインドパラメーターになる）
     async def get_by_id(self, db: AsyncSession, id: UUID) -> Optional[AuthUser]:
-        result = await db.execute(select(AuthUser).filter(AuthUser.id == id))
+        result = await db.execute(lambda_stmt(lambda: select(AuthUser).filter(AuthUser.id == id)))
         return result.scalar_one_or_none()
 
     async def get_by_username(self, db: AsyncSession, username: str) -> Optional[AuthUser]:
-        result = await db.execute(select(AuthUser).filter(AuthUser.username == username))
+        result = await db.execute(lambda_stmt(lambda: select(AuthUser).filter(AuthUser.username == username)))
         return result.scalar_one_or_none()
         
     async def get_by_user_id(self, db: AsyncSession, user_id: UUID) -> Optional[AuthUser]:
@@ -50,7 +94,7 @@ class CRUDAuthUser:
         Returns:
             Optional[AuthUser]: 見つかったユーザーまたはNone
         """
-        result = await db.execute(select(AuthUser).filter(AuthUser.user_id == user_id))
+        result = await db.execute(lambda_stmt(lambda: select(AuthUser).filter(AuthUser.user_id == user_id)))
         return result.scalar_one_or_none()
 
     async def update(self, db: AsyncSession, db_obj: AuthUser, obj_in: UserUpdate) -> AuthUser:
@@ -62,8 +106,8 @@ class CRUDAuthUser:
             if obj_in.is_admin is not None:
                 db_obj.is_admin = obj_in.is_admin
             # コミットは呼び出し元に任せる
-            await db.flush() # flush() でセッションに変更を反映
-            await db.refresh(db_obj)
+            # flush() でセッションに変更を反映（updated_atはUPDATEのRETURNINGで取得される）
+            await db.flush()
             return db_obj
         except IntegrityError:
             # ロールバックは呼び出し元に任せる
@@ -84,11 +128,10 @@ class CRUDAuthUser:
         """
         # try/except は不要になるか、より具体的な例外を捕捉するように変更可能
         # ここではシンプルに削除
-        db_obj.hashed_password = get_password_hash(new_password)
+        db_obj.hashed_password = await get_password_hash(new_password)
         # コミットは呼び出し元に任せる
-        # flush() でセッションに変更を反映させる（コミット前）
-        await db.flush() 
-        await db.refresh(db_obj)
+        # flush() でセッションに変更を反映させる（コミット前、updated_atはUPDATEのRETURNINGで取得される）
+        await db.flush()
         return db_obj
         # ロールバックも呼び出し元に任せる
 
@@ -102,4 +145,88 @@ class CRUDAuthUser:
         # コミットは呼び出し元に任せる
         await db.flush() # flush() でセッションに変更を反映
 
-crud_auth_user = CRUDAuthUser()
\ No newline at end of file
+    # 一括インポート用のステージングテーブル（トランザクション終了時に削除）
+    IMPORT_STAGING_TABLE = "auth_users_import"
+    IMPORT_COLUMNS = ("username", "hashed_password", "is_admin", "is_active", "user_id")
+
+    async def _prepare_import_rows(self, batch: List[Dict[str, Any]]) -> List[tuple]:
+        """
+        アップロードされたレコードをステージングテーブルの行に変換
+        - hashed_passwordが指定されたレコードはそのまま使用し、passwordのみのレコードはワーカープールでまとめてハッシュ化する
+        """
+        for record in batch:
+            if not record.get("username"):
+                raise BulkFormatError("usernameが指定されていないレコードがあります")
+            if not record.get("hashed_password") and not record.get("password"):
+                raise BulkFormatError(f"ユーザー '{record['username']}' にpasswordまたはhashed_passwordが指定されていません")
+
+        to_hash = [record for record in batch if not record.get("hashed_password")]
+        hashes = await password_hasher.hash_many([record["password"] for record in to_hash])
+        for record, hashed_password in zip(to_hash, hashes):
+            record["hashed_password"] = hashed_password
+
+        rows = []
+        for record in batch:
+            try:
+                user_id = uuid.UUID(str(record["user_id"])) if record.get("user_id") else None
+            except ValueError:
+                raise BulkFormatError(f"ユーザー '{record['username']}' のuser_idが不正です")
+            rows.append((
+                record["username"],
+                record["hashed_password"],
+                parse_bool(record.get("is_admin"), False),
+                parse_bool(record.get("is_active"), True),
+                user_id,
+            ))
+        return rows
+
+    async def bulk_import(self, db: AsyncSession, batches: AsyncIterator[List[Dict[str, Any]]]) -> Dict[str, int]:
+        """
+        ユーザーを一括でインポートする
+        - COPYでステージングテーブルに投入した後、1回のINSERT ... SELECTで本テーブルに反映する
+        - 既存ユーザーと重複するユーザー名・user_idの行はスキップする
+        - 作成したユーザーのuser.createdイベントをアウトボックスに登録する
+        - コミットは呼び出し元に任せる
+        """
+        await db.execute(text(
+            f"CREATE TEMP TABLE {self.IMPORT_STAGING_TABLE} ("
+            "username text NOT NULL, hashed_password text NOT NULL, "
+            "is_admin boolean NOT NULL, is_active boolean NOT NULL, user_id uuid"
+            ") ON COMMIT DROP"
+        ))
+
+        received = 0
+        async for batch in batches:
+            rows = await self._prepare_import_rows(batch)
+            await copy_records(db, self.IMPORT_STAGING_TABLE, self.IMPORT_COLUMNS, rows)
+            received += len(rows)
+
+        # 作成したユーザーのuser.createdイベントも同じ文でアウトボックスに登録する
+        result = await db.execute(text(
+            "WITH inserted AS ("
+            "INSERT INTO auth_users (id, username, hashed_password, is_admin, is_active, user_id, created_at, updated_at) "
+            "SELECT DISTINCT ON (username) gen_random_uuid(), username, hashed_password, is_admin, is_active, user_id, now(), now() "
+            f"FROM {self.IMPORT_STAGING_TABLE} ORDER BY username "
+            "ON CONFLICT DO NOTHING "
+            "RETURNING id, username, is_admin, is_active"
+            "), events AS ("
+            "INSERT INTO outbox_events (event_type, routing_key, payload, created_at, updated_at) "
+            "SELECT CAST(:event_type AS varchar), CAST(:routing_key AS varchar), jsonb_build_object("
+            "'event_type', CAST(:event_type AS text), "
+            "'user_data', jsonb_build_object('id', id::text, 'username', username, 'is_admin', is_admin, 'is_active', is_active)"
+            "), now(), now() FROM inserted ORDER BY username "
+            "RETURNING 1"
+            ") SELECT count(*) FROM events"
+        ), {"event_type": UserEventTypes.USER_CREATED, "routing_key": settings.USER_SYNC_ROUTING_KEY})
+        inserted = result.scalar_one()
+        return {"received": received, "inserted": inserted, "skipped": received - inserted}
+
+    def export_query(self, include_password_hash: bool = False) -> str:
+        """一括エクスポート用のCOPYクエリ（インポートと同じ列名で出力する）"""
+        columns = ["id", "username", "is_admin", "is_active", "user_id", "created_at"]
+        if include_password_hash:
+            columns.insert(2, "hashed_password")
+        return f"SELECT {', '.join(columns)} FROM auth_users ORDER BY created_at, id"
+
+
+crud_auth_user = CRUDAuthUser()
@@ -0,0 +1,31 @@
+import json
+from typing import Any, Dict
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.outbox_event import OutboxEvent
+
+
+class CRUDOutbox:
+    async def enqueue(self, db: AsyncSession, event_type: str, user_data: Dict[str, Any]) -> OutboxEvent:
+        """
+        ユーザーイベントを送信待ちとして登録する
+        - 呼び出し元のトランザクションと一緒にコミットされるため、変更とイベントのどちらか一方だけが残ることはない
+        - コミットは呼び出し元に任せる
+        """
+        message_body = {
+            "event_type": event_type,
+            # UUIDなどJSONで扱えない値は文字列にする
+            "user_data": json.loads(json.dumps(user_data, default=str)),
+        }
+        db_obj = OutboxEvent(
+            event_type=event_type,
+            routing_key=settings.USER_SYNC_ROUTING_KEY,
+            payload=message_body,
+        )
+        db.add(db_obj)
+        return db_obj
+
+
+crud_outbox = CRUDOutbox()
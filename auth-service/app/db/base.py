@@ -11,6 +11,10 @@ import uuid
 class Base:
     __name__: str
 
+    # サーバー側で生成する値（created_at, updated_at）をINSERT/UPDATEのRETURNINGで同時に取得し、
+    # flush後にrefresh()で再取得しなくても参照できるようにする
+    __mapper_args__ = {"eager_defaults": True}
+
     # 共通フィールド
     id: Mapped[UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
@@ -0,0 +1,89 @@
+from typing import Any, Dict, Optional
+
+import redis.asyncio as redis
+
+from app.core.config import settings
+from app.core.logging import app_logger
+
+
+class RedisClient:
+    """共有コネクションプールを保持するRedisクライアントクラス"""
+
+    def __init__(self):
+        self.pool: Optional[redis.BlockingConnectionPool] = None
+        self.client: Optional[redis.Redis] = None
+        self.logger = app_logger
+        self.is_initialized = False
+
+    def _create_pool(self) -> redis.BlockingConnectionPool:
+        """上限付きのコネクションプールを作成"""
+        return redis.BlockingConnectionPool.from_url(
+            settings.REDIS_URL,
+            max_connections=settings.REDIS_MAX_CONNECTIONS,
+            # プールが枯渇した場合に接続の返却を待つ最大秒数
+            timeout=settings.REDIS_POOL_TIMEOUT,
+            socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+            socket_connect_timeout=settings.REDIS_SOCKET_CONNECT_TIMEOUT,
+            health_check_interval=settings.REDIS_HEALTH_CHECK_INTERVAL,
+        )
+
+    async def initialize(self):
+        """コネクションプールを作成し、Redisへの疎通を確認"""
+        if self.is_initialized:
+            return
+
+        try:
+            self.pool = self._create_pool()
+            self.client = redis.Redis(connection_pool=self.pool)
+            self.is_initialized = True
+            await self.client.ping()
+            self.logger.info(
+                f"Redisコネクションプールを作成しました: max_connections={settings.REDIS_MAX_CONNECTIONS}"
+            )
+        except Exception as e:
+            self.logger.error(f"Redis接続エラー: {str(e)}", exc_info=True)
+            raise
+
+    async def close(self):
+        """コネクションプールのクローズ"""
+        if self.client is not None:
+            await self.client.aclose()
+        if self.pool is not None:
+            await self.pool.disconnect()
+        self.client = None
+        self.pool = None
+        self.is_initialized = False
+        self.logger.info("Redisコネクションプールがクローズされました")
+
+    def get_client(self) -> redis.Redis:
+        """
+        共有Redisクライアントを取得する
+
+        lifespan外（スクリプトなど）から呼ばれた場合はプールを遅延作成する。
+        プールの作成自体は接続を伴わないため同期的に行える。
+        """
+        if not self.is_initialized:
+            self.pool = self._create_pool()
+            self.client = redis.Redis(connection_pool=self.pool)
+            self.is_initialized = True
+        return self.client
+
+    def stats(self) -> Dict[str, Any]:
+        """コネクションプールの利用状況を返す"""
+        if self.pool is None:
+            return {"initialized": False}
+        return {
+            "initialized": True,
+            "max_connections": self.pool.max_connections,
+            "in_use": len(self.pool._in_use_connections),
+            "idle": len(self.pool._available_connections),
+        }
+
+
+# シングルトンインスタンス
+redis_client = RedisClient()
+
+
+# Redisクライアントを取得するための依存関係
+async def get_redis() -> redis.Redis:
+    return redis_client.get_client()
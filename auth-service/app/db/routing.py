@@ -0,0 +1,119 @@
+import hashlib
+import itertools
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from jose import JWTError, jwt
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core.cache import TTLCache
+
+
+class ReplicaRouter:
+    """
+    読み取り専用セッションの接続先を選択するクラス
+
+    - レプリカが指定されていない場合は常にプライマリを使う
+    - レプリカはラウンドロビン（round_robin）または処理中のセッション数が最も少ないもの（least_load）を選ぶ
+    - 書き込みを行ったユーザーと、管理者の書き込みで変更されたユーザーは一定時間プライマリから読み取り、
+      レプリカの遅延による古いデータを返さない（書き込みの記録はプロセスごとに保持する）
+    """
+
+    def __init__(
+        self,
+        primary: AsyncEngine,
+        replicas: List[AsyncEngine],
+        strategy: str = "round_robin",
+        read_your_writes_window: float = 0.0,
+        max_clients: int = 10000,
+    ):
+        self.primary = primary
+        self.replicas = replicas
+        self.strategy = strategy
+        self.read_your_writes_window = read_your_writes_window
+        self._cycle = itertools.cycle(range(len(replicas)))
+        self.in_flight = [0] * len(replicas)
+        self.selected = [0] * len(replicas)
+        self.primary_reads = 0
+        # 書き込みを行った・書き込みで変更されたユーザーのキー（期限は書き込みからの経過時間）
+        self._recent_writers = TTLCache(maxsize=max_clients, ttl=read_your_writes_window)
+
+    @staticmethod
+    def subject_key(subject: Any) -> Optional[str]:
+        """ユーザー（トークンのsub、auth-serviceのユーザーID）を識別するキーを作成"""
+        return str(subject).lower() if subject else None
+
+    @classmethod
+    def client_key(cls, authorization: Optional[str]) -> Optional[str]:
+        """
+        Authorizationヘッダーからリクエスト元のユーザーを識別するキーを作成
+
+        - アクセストークンのsubクレームを使うため、同じユーザーであれば
+          再ログイン・別の端末・リフレッシュ後のトークンでも同じキーとなる
+        - 接続先の選択にのみ使うため署名は検証しない（偽のsubを指定しても、そのユーザーの読み取りが
+          プライマリに向くだけで認可には影響しない）
+        - JWTとして読めない場合はヘッダー全体のハッシュを使う
+        """
+        if not authorization:
+            return None
+        scheme, _, token = authorization.partition(" ")
+        if scheme.lower() != "bearer":
+            token = authorization
+        try:
+            subject = jwt.get_unverified_claims(token.strip()).get("sub")
+        except JWTError:
+            subject = None
+        if subject:
+            return cls.subject_key(subject)
+        return "credentials:" + hashlib.sha256(authorization.encode()).hexdigest()
+
+    def mark_write(self, key: Optional[str]):
+        """
+        ユーザーが書き込みを行った、または書き込みで変更されたことを記録
+
+        管理者が他のユーザーを変更した場合は、subject_key()で変更されたユーザーのキーも記録する
+        """
+        if key is None or not self.replicas or self.read_your_writes_window <= 0:
+            return
+        self._recent_writers.set(key, time.monotonic())
+
+    def _select_replica(self) -> int:
+        if self.strategy == "least_load":
+            # 処理中のセッション数が同じ場合はラウンドロビンの順で選ぶ
+            start = next(self._cycle)
+            order = [(start + i) % len(self.replicas) for i in range(len(self.replicas))]
+            return min(order, key=lambda index: self.in_flight[index])
+        return next(self._cycle)
+
+    @asynccontextmanager
+    async def read_engine(self, key: Optional[str] = None) -> AsyncIterator[AsyncEngine]:
+        """読み取りに使うエンジンを選択し、使用中の間は処理中として数える"""
+        if not self.replicas or (key is not None and self._recent_writers.get(key) is not None):
+            self.primary_reads += 1
+            yield self.primary
+            return
+
+        index = self._select_replica()
+        self.selected[index] += 1
+        self.in_flight[index] += 1
+        try:
+            yield self.replicas[index]
+        finally:
+            self.in_flight[index] -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        """接続先の選択状況を返す"""
+        return {
+            "strategy": self.strategy,
+            "primary_reads": self.primary_reads,
+            "replicas": [
+                {
+                    "url": engine.url.render_as_string(hide_password=True),
+                    "selected": self.selected[index],
+                    "in_flight": self.in_flight[index],
+                }
+                for index, engine in enumerate(self.replicas)
+            ],
+            "sticky_clients": len(self._recent_writers),
+        }
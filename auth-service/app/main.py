@@ -1,20 +1,32 @@
+import asyncio
+import hashlib
+import json
+import signal
 import time
 import uuid
 import os
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from fastapi.exceptions import RequestValidationError
 from sqlalchemy.exc import IntegrityError
 from app.api.v1.api import api_router
 from app.core.config import settings
 from app.core.logging import app_logger, get_request_logger
 from app.db.init import Database
-from app.db.session import AsyncSessionLocal
+from app.db.session import AsyncSessionLocal, pool_stats, replica_router
 from app.crud.auth_user import crud_auth_user
 from app.schemas.auth_user import AdminUserCreate
 from app.messaging.rabbitmq import rabbitmq_client
+from app.messaging.outbox import outbox_relay
+from app.messaging.publisher import publisher
+from app.db.redis import redis_client
+from app.core.keys import key_manager
+from app.core.blacklist import revocation_filter
+from app.core.token_cache import verified_token_cache
+from app.core.hashing import password_hasher, PasswordHasherBusyError
+from app.clients.user_service import user_service_client
 
 # ログディレクトリの作成（ファイルログが有効な場合）
 if settings.LOG_TO_FILE:
@@ -33,15 +45,52 @@ async def lifespan(app: FastAPI):
         await db.init()
         app_logger.info("Database initialized successfully")
         
+        # JWT署名鍵の読み込み（以降はメモリ上の鍵オブジェクトを使用）
+        if key_manager.reload():
+            app_logger.info("JWT keys loaded successfully")
+        
+        # SIGHUPで鍵を再読み込みする
+        try:
+            asyncio.get_running_loop().add_signal_handler(signal.SIGHUP, key_manager.reload)
+        except (NotImplementedError, AttributeError):
+            # SIGHUPをサポートしないプラットフォームでは管理者エンドポイントのみで再読み込みする
+            app_logger.warning("SIGHUP handler is not supported on this platform")
+        
+        # パスワードハッシュ用ワーカープールの作成（初期管理者ユーザーの作成より前に行う）
+        password_hasher.initialize()
+        
+        # Redisコネクションプールの初期化
+        try:
+            await redis_client.initialize()
+            app_logger.info("Redis connection pool initialized successfully")
+        except Exception as e:
+            app_logger.error(f"Error initializing Redis connection pool: {e}")
+            # 疎通確認に失敗してもプールは作成済みのため、Redis復旧後はそのまま利用できる
+        
+        # トークン失効フィルターの同期開始（同期完了まではRedisに問い合わせる）
+        # 失効通知を受けたトークンは検証済みキャッシュからも破棄する
+        revocation_filter.add_revoke_listener(verified_token_cache.evict_jti)
+        await revocation_filter.start()
+        
+        # User Service用HTTPクライアントの初期化
+        await user_service_client.initialize()
+        
         # RabbitMQクライアントの初期化
         try:
             await rabbitmq_client.initialize()
             app_logger.info("RabbitMQ connection initialized successfully")
+            
+            # ユーザーイベントによるプロファイルキャッシュの無効化
+            await rabbitmq_client.subscribe_user_events(user_service_client.handle_user_event)
+            app_logger.info("Subscribed to user events for profile cache invalidation")
         except Exception as e:
             app_logger.error(f"Error initializing RabbitMQ connection: {e}")
             # RabbitMQ接続エラーはアプリ起動を妨げるべきではない
             # サービスは引き続き機能し、メッセージングは無効化される
         
+        # アウトボックスの送信開始（RabbitMQに接続できない間は未送信のまま保持される）
+        await outbox_relay.start()
+        
         # 初期管理者ユーザーの作成
         admin_username = settings.INITIAL_ADMIN_USERNAME
         admin_password = settings.INITIAL_ADMIN_PASSWORD
@@ -76,12 +125,35 @@ async def lifespan(app: FastAPI):
     # 終了時の処理
     app_logger.info("Shutting down application")
     
+    # アウトボックスの送信停止（未送信のイベントは次回起動時に送信される）
+    await outbox_relay.stop()
+    
     # RabbitMQ接続のクローズ
     try:
         await rabbitmq_client.close()
         app_logger.info("RabbitMQ connection closed")
     except Exception as e:
         app_logger.error(f"Error closing RabbitMQ connection: {e}")
+    
+    # User Service用HTTPクライアントのクローズ
+    try:
+        await user_service_client.close()
+        app_logger.info("User Service HTTP client closed")
+    except Exception as e:
+        app_logger.error(f"Error closing User Service HTTP client: {e}")
+    
+    # パスワードハッシュ用ワーカープールのシャットダウン
+    password_hasher.close()
+    
+    # トークン失効フィルターの同期停止
+    await revocation_filter.stop()
+    
+    # Redisコネクションプールのクローズ
+    try:
+        await redis_client.close()
+        app_logger.info("Redis connection pool closed")
+    except Exception as e:
+        app_logger.error(f"Error closing Redis connection pool: {e}")
 
 
 # FastAPIアプリケーションの作成
@@ -190,6 +262,21 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
         content={"detail": errors, "body": exc.body},
     )
 
+# パスワードハッシュ処理の混雑時は待たせずに503を返す
+@app.exception_handler(PasswordHasherBusyError)
+async def password_hasher_busy_handler(request: Request, exc: PasswordHasherBusyError):
+    logger = get_request_logger(request)
+    logger.warning(
+        f"Password hasher saturated: {request.method} {request.url.path} "
+        f"Stats: {password_hasher.stats()}"
+    )
+    
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "サーバーが混雑しています。しばらく経ってからお試しください。"},
+        headers={"Retry-After": "1"},
+    )
+
 # APIルーターの登録
 app.include_router(api_router, prefix="/api/v1")
 
@@ -207,6 +294,37 @@ async def root():
 async def health_check():
     return {"status": "healthy"}
 
+# JWKSエンドポイント（各サービスはここから公開鍵を取得してローカルで検証する）
+@app.get("/.well-known/jwks.json")
+async def jwks(request: Request):
+    body = json.dumps(key_manager.get_jwks(), separators=(",", ":"))
+    etag = f'"{hashlib.sha256(body.encode()).hexdigest()[:32]}"'
+    headers = {
+        "Cache-Control": f"public, max-age={settings.JWKS_CACHE_MAX_AGE}",
+        "ETag": etag,
+    }
+    
+    # 鍵が変わっていなければ本文を返さない
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    
+    return Response(content=body, media_type="application/json", headers=headers)
+
+# メトリクスエンドポイント
+@app.get("/metrics")
+async def metrics():
+    return {
+        "password_hasher": password_hasher.stats(),
+        "redis": redis_client.stats(),
+        "token_blacklist_filter": revocation_filter.stats(),
+        "verified_token_cache": verified_token_cache.stats(),
+        "user_service": user_service_client.stats(),
+        "outbox_relay": outbox_relay.stats(),
+        "rabbitmq_publisher": publisher.stats(),
+        "database_pool": pool_stats(),
+        "database_replicas": replica_router.stats(),
+    }
+
 if __name__ == "__main__":
     import uvicorn
     
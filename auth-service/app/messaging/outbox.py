@@ -0,0 +1,161 @@
+import asyncio
+from datetime import timedelta
+from typing import Any, Dict, Optional
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.sql import func
+
+from app.core.config import settings
+from app.core.logging import app_logger
+from app.db.session import AsyncSessionLocal
+from app.messaging.partitioning import routing_key_for
+from app.messaging.rabbitmq import rabbitmq_client
+from app.models.outbox_event import OutboxEvent
+
+
+class OutboxRelay:
+    """
+    アウトボックステーブルの未送信イベントをRabbitMQに送信するバックグラウンドタスク
+
+    - 未送信イベントをID順にバッチで取り出し、ブローカーの確認応答を受けたものだけを送信済みにする
+    - FOR UPDATE SKIP LOCKEDで行をロックするため、複数ワーカーで動かしても同じイベントを同時に送信しない
+    - 送信後・送信済みの記録前に停止した場合は再送されるため、配信はat-least-onceとなる
+    """
+
+    def __init__(self):
+        self.logger = app_logger
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+        self._last_cleanup = 0.0
+        self.published = 0
+        self.failed = 0
+        self.last_error: Optional[str] = None
+
+    async def start(self):
+        """リレーを開始"""
+        if self._task is None and settings.OUTBOX_RELAY_ENABLED:
+            self._task = asyncio.create_task(self._run())
+            self.logger.info("アウトボックスリレーを開始しました")
+
+    async def stop(self):
+        """リレーを停止"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            self.logger.info("アウトボックスリレーを停止しました")
+
+    def notify(self):
+        """イベントを登録したトランザクションのコミット後に呼び出し、ポーリングを待たずに送信させる"""
+        self._wakeup.set()
+
+    async def drain_once(self) -> int:
+        """
+        未送信イベントを1バッチ分送信する
+
+        Returns:
+            int: 送信に成功したイベント数
+        """
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(OutboxEvent)
+                .where(OutboxEvent.published_at.is_(None))
+                .order_by(OutboxEvent.id)
+                .limit(settings.OUTBOX_BATCH_SIZE)
+                .with_for_update(skip_locked=True)
+            )
+            events = result.scalars().all()
+            if not events:
+                return 0
+
+            # 確認応答はまとめて待つ（1件ずつ往復しない）
+            # イベントIDは単一のシーケンスから採番されるため、同じユーザーのイベントでは単調増加する。
+            # 受信側が重複・順序の逆転したイベントを破棄できるよう、メッセージIDとバージョンに使う
+            # ルーティングキーは送信時にユーザーIDのパーティションへ振り分ける
+            results = await rabbitmq_client.publish_many([
+                (
+                    routing_key_for(event.payload.get("user_data", {}).get("id"), event.routing_key),
+                    {**event.payload, "version": event.id},
+                    str(event.id),
+                )
+                for event in events
+            ])
+
+            published_ids = []
+            for event, outcome in zip(events, results):
+                if outcome is not None:
+                    event.attempts += 1
+                    event.last_error = str(outcome)[:1000]
+                    self.last_error = event.last_error
+                else:
+                    published_ids.append(event.id)
+
+            if published_ids:
+                await db.execute(
+                    update(OutboxEvent)
+                    .where(OutboxEvent.id.in_(published_ids))
+                    .values(published_at=func.now())
+                    .execution_options(synchronize_session=False)
+                )
+            await db.commit()
+
+        failed = len(events) - len(published_ids)
+        self.published += len(published_ids)
+        self.failed += failed
+        if failed:
+            self.logger.warning(f"アウトボックスのイベント送信に失敗しました: {failed}件（次回再送）")
+        return len(published_ids)
+
+    async def _cleanup(self):
+        """保持期間を過ぎた送信済みイベントを削除"""
+        loop_time = asyncio.get_running_loop().time()
+        if loop_time - self._last_cleanup < settings.OUTBOX_CLEANUP_INTERVAL:
+            return
+        self._last_cleanup = loop_time
+
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                delete(OutboxEvent).where(
+                    OutboxEvent.published_at < func.now() - timedelta(seconds=settings.OUTBOX_RETENTION_SECONDS)
+                )
+            )
+            await db.commit()
+        if result.rowcount:
+            self.logger.info(f"送信済みのアウトボックスイベントを削除しました: {result.rowcount}件")
+
+    async def _run(self):
+        """未送信イベントがなくなるまで送信し、なくなったら通知またはポーリング間隔まで待機する"""
+        while True:
+            try:
+                published = await self.drain_once()
+                # バッチが埋まっていた場合は続けて送信する
+                if published >= settings.OUTBOX_BATCH_SIZE:
+                    continue
+                await self._cleanup()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.last_error = str(e)
+                self.logger.error(f"アウトボックスリレーのエラー: {str(e)}", exc_info=True)
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=settings.OUTBOX_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """リレーの状態を返す"""
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "published": self.published,
+            "failed": self.failed,
+            "last_error": self.last_error,
+        }
+
+
+# シングルトンインスタンス
+outbox_relay = OutboxRelay()
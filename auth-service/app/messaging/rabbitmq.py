@@ -1,13 +1,15 @@
 import json
 import logging
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Callable, Awaitable, Sequence
 from uuid import UUID
 
 import aio_pika
-from aio_pika import ExchangeType
+from aio_pika import ExchangeType, IncomingMessage
 
 from app.core.config import settings
 from app.core.logging import app_logger
+from app.messaging.partitioning import routing_key_for
+from app.messaging.publisher import OutgoingMessage, publisher
 
 
 class RabbitMQClient:
@@ -17,6 +19,8 @@ class RabbitMQClient:
         self.connection = None
         self.channel = None
         self.exchange = None
+        self.event_queue = None
+        self.event_handlers = []
         self.logger = app_logger
         self.is_initialized = False
     
@@ -42,6 +46,9 @@ class RabbitMQClient:
                 durable=True
             )
             
+            # 発行用チャネルプールの作成（publisher confirms有効）
+            await publisher.initialize(self.connection)
+            
             self.is_initialized = True
             self.logger.info("RabbitMQ接続が確立されました")
         except Exception as e:
@@ -51,15 +58,40 @@ class RabbitMQClient:
     async def close(self):
         """接続のクローズ"""
         if self.connection and not self.connection.is_closed:
+            await publisher.close()
             await self.connection.close()
+            self.event_queue = None
             self.is_initialized = False
             self.logger.info("RabbitMQ接続がクローズされました")
     
-    async def publish_user_event(self, event_type: str, user_data: Dict[str, Any]):
-        """ユーザーイベントの発行"""
+    async def publish_message(self, message_body: Dict[str, Any], routing_key: str, message_id: Optional[str] = None):
+        """
+        JSONメッセージを発行する（ブローカーの確認応答を待ち、失敗時は例外を送出する）
+        """
+        if not self.is_initialized:
+            await self.initialize()
+        
+        await publisher.publish(routing_key, message_body, message_id)
+    
+    async def publish_many(self, messages: Sequence[OutgoingMessage]) -> List[Optional[Exception]]:
+        """
+        複数のJSONメッセージを続けて発行し、確認応答をまとめて待つ
+        
+        Returns:
+            List[Optional[Exception]]: 入力と同じ順序の結果（成功した場合はNone、失敗した場合は例外）
+        """
         if not self.is_initialized:
             await self.initialize()
         
+        return await publisher.publish_many(messages)
+    
+    async def publish_user_event(self, event_type: str, user_data: Dict[str, Any]) -> bool:
+        """
+        ユーザーイベントの発行
+        
+        Returns:
+            bool: 発行に成功した場合はTrue、失敗した場合はFalse
+        """
         try:
             # メッセージのJSONシリアライズ
             message_body = {
@@ -68,20 +100,55 @@ class RabbitMQClient:
             }
             
             # メッセージの発行
-            await self.exchange.publish(
-                aio_pika.Message(
-                    body=json.dumps(message_body).encode(),
-                    content_type="application/json",
-                    delivery_mode=aio_pika.DeliveryMode.PERSISTENT
-                ),
-                routing_key=settings.USER_SYNC_ROUTING_KEY
-            )
+            await self.publish_message(message_body, routing_key_for(message_body["user_data"].get("id")))
             
             self.logger.info(f"ユーザーイベントを発行しました: {event_type}, ユーザーID={user_data.get('id', 'unknown')}")
+            return True
         except Exception as e:
             self.logger.error(f"メッセージ発行エラー: {str(e)}", exc_info=True)
             # エラーはログに記録するが例外は再送出しない
             # メッセージングがサービスの主要機能を妨げるべきではない
+            # 確実に配信する必要があるイベントはアウトボックス（app.crud.outbox）経由で発行すること
+            return False
+    
+    async def subscribe_user_events(self, handler: Callable[[str, Dict[str, Any]], Awaitable[None]]):
+        """
+        ユーザーイベントの購読を開始
+        
+        プロセス内キャッシュの無効化に使用するため、ワーカープロセスごとに
+        排他的な一時キューを作成し、全イベントを各プロセスに配信する
+        """
+        if not self.is_initialized:
+            await self.initialize()
+        
+        self.event_handlers.append(handler)
+        if self.event_queue is not None:
+            return
+        
+        # サーバー側で命名される排他・自動削除キュー
+        self.event_queue = await self.channel.declare_queue(exclusive=True, auto_delete=True)
+        # パーティション分割されたルーティングキー（<ルーティングキー>.<番号>）も含めて受け取る
+        await self.event_queue.bind(self.exchange, routing_key=f"{settings.USER_SYNC_ROUTING_KEY}.#")
+        # User Serviceでのプロファイル更新・削除（User Serviceの同期キューには届かないルーティングキー）
+        await self.event_queue.bind(self.exchange, routing_key=f"{settings.USER_PROFILE_ROUTING_KEY}.#")
+        await self.event_queue.consume(self._dispatch_user_event, no_ack=True)
+        self.logger.info(f"ユーザーイベントの購読を開始しました: queue={self.event_queue.name}")
+    
+    async def _dispatch_user_event(self, message: IncomingMessage):
+        """受信したユーザーイベントを登録済みのハンドラーに渡す"""
+        try:
+            message_body = json.loads(message.body.decode())
+            event_type = message_body.get("event_type")
+            user_data = message_body.get("user_data", {})
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            self.logger.error("ユーザーイベントのデコードエラー", exc_info=True)
+            return
+        
+        for handler in self.event_handlers:
+            try:
+                await handler(event_type, user_data)
+            except Exception as e:
+                self.logger.error(f"ユーザーイベント処理エラー: {str(e)}", exc_info=True)
     
     def _serialize_user_data(self, user_data: Dict[str, Any]) -> Dict[str, Any]:
         """ユーザーデータのシリアライズ"""
@@ -1,4 +1,4 @@
-from sqlalchemy import String
+from sqlalchemy import Index, String
 from sqlalchemy.orm import Mapped, mapped_column
 from sqlalchemy.dialects.postgresql import UUID
 from app.db.base import Base
@@ -6,6 +6,8 @@ from app.db.base import Base
 
 class AuthUser(Base):
     __tablename__ = "auth_users"
+    # ユーザー一覧のキーセットページネーション用
+    __table_args__ = (Index("ix_auth_users_created_at_id", "created_at", "id"),)
     username: Mapped[str] = mapped_column(String, unique=True, index=True, nullable=False)
     hashed_password: Mapped[str] = mapped_column(String, nullable=False)
     is_active: Mapped[bool] = mapped_column(default=True, nullable=False)
@@ -0,0 +1,28 @@
+from datetime import datetime
+from typing import Any, Dict, Optional
+from sqlalchemy import BigInteger, DateTime, Index, Integer, String, text
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.dialects.postgresql import JSONB
+from app.db.base import Base
+
+
+class OutboxEvent(Base):
+    """
+    ユーザーイベントの送信待ちテーブル（トランザクショナルアウトボックス）
+
+    AuthUserの変更と同じトランザクションで書き込み、バックグラウンドのリレーがRabbitMQに送信する
+    """
+    __tablename__ = "outbox_events"
+    # 送信順を保つため連番をIDとする
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    event_type: Mapped[str] = mapped_column(String, nullable=False)
+    routing_key: Mapped[str] = mapped_column(String, nullable=False)
+    payload: Mapped[Dict[str, Any]] = mapped_column(JSONB, nullable=False)
+    published_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    attempts: Mapped[int] = mapped_column(Integer, default=0, server_default=text("0"), nullable=False)
+    last_error: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+
+    __table_args__ = (
+        # 未送信のイベントのみを対象にした部分インデックス
+        Index("ix_outbox_events_unpublished", "id", postgresql_where=text("published_at IS NULL")),
+    )
@@ -86,6 +86,15 @@ class TokenPayload(BaseModel):
     sub: Optional[str] = None
 
 
+# 検証済みトークンのクレームから組み立てる軽量な認証主体（DBアクセスなし）
+class TokenPrincipal(BaseModel):
+    id: UUID
+    user_id: Optional[UUID] = None
+    username: Optional[str] = None
+    is_admin: bool = False
+    is_active: bool = True
+
+
 # リフレッシュトークンリクエスト用のスキーマ（access_tokenを必須とする）
 class RefreshTokenRequest(BaseModel):
     refresh_token: str
@@ -112,4 +121,12 @@ class TokenVerifyResponse(BaseModel):
     user_id: Optional[str] = None
     username: Optional[str] = None
     roles: List[str] = []
-    error: Optional[str] = None
\ No newline at end of file
+    error: Optional[str] = None
+
+
+class TokenBatchVerifyRequest(BaseModel):
+    tokens: List[str]
+
+
+class TokenBatchVerifyResponse(BaseModel):
+    results: List[TokenVerifyResponse]
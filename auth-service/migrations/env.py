@@ -10,6 +10,7 @@ from alembic import context
 # モデルのインポート
 from app.db.base import Base
 from app.models.auth_user import AuthUser  # 他のモデルも必要に応じてインポート
+from app.models.outbox_event import OutboxEvent
 from app.core.config import settings
 
 # alembic.iniからの設定
@@ -0,0 +1,26 @@
+"""add created_at id index
+
+Revision ID: c3d9e1f0a7b2
+Revises: a5ff953e928b
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3d9e1f0a7b2'
+down_revision: Union[str, None] = 'a5ff953e928b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # ユーザー一覧のキーセットページネーション用
+    op.create_index('ix_auth_users_created_at_id', 'auth_users', ['created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_auth_users_created_at_id', table_name='auth_users')
@@ -0,0 +1,43 @@
+import os
+import types
+
+import pytest
+
+# app.core.configの必須項目（単体テストではデータベースに接続しない）
+os.environ.setdefault("POSTGRES_USER", "test")
+os.environ.setdefault("POSTGRES_PASSWORD", "test")
+os.environ.setdefault("POSTGRES_HOST", "localhost")
+os.environ.setdefault("POSTGRES_PORT", "5432")
+os.environ.setdefault("POSTGRES_DB", "auth_test")
+
+
+class FakeClock:
+    """time.time / time.monotonic の代わりに使う手動で進める時計"""
+
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock() -> FakeClock:
+    return FakeClock()
+
+
+@pytest.fixture(autouse=True)
+def fake_time(request, monkeypatch, clock):
+    """
+    fake_timeマーカーを付けたテストで、対象モジュールが参照するtimeを手動の時計に差し替える
+
+    例: pytestmark = pytest.mark.fake_time(cache, "monotonic")
+    """
+    marker = request.node.get_closest_marker("fake_time")
+    if marker is None:
+        return
+    module, attribute = marker.args
+    monkeypatch.setattr(module, "time", types.SimpleNamespace(**{attribute: clock}))
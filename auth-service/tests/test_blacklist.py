@@ -0,0 +1,72 @@
+import uuid
+
+import pytest
+
+from app.core import blacklist
+from app.core.blacklist import BloomFilter, RevocationFilter
+from app.core.config import settings
+
+
+pytestmark = pytest.mark.fake_time(blacklist, "time")
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    items = [str(uuid.uuid4()) for _ in range(1000)]
+    for item in items:
+        bloom.add(item)
+
+    assert all(item in bloom for item in items)
+    assert bloom.count == len(items)
+
+
+def test_bloom_filter_false_positive_rate_is_bounded():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    for _ in range(1000):
+        bloom.add(str(uuid.uuid4()))
+
+    false_positives = sum(str(uuid.uuid4()) in bloom for _ in range(10000))
+    # 想定誤検知率1%に対して十分な余裕を持たせる
+    assert false_positives < 300
+
+
+def test_revocation_filter_skips_redis_only_when_ready(clock):
+    revocation = RevocationFilter()
+    exp = clock.now + 60
+    revocation.add("revoked", exp)
+
+    # 同期が取れていない間は常にRedisで確認する
+    assert revocation.might_be_revoked("other", exp) is True
+
+    revocation.is_ready = True
+    assert revocation.might_be_revoked("revoked", exp) is True
+    assert revocation.might_be_revoked("revoked", None) is True
+    assert revocation.might_be_revoked("other", exp) is False
+    assert revocation.skipped_checks == 1
+
+
+def test_revocation_filter_ignores_expired_tokens(clock):
+    revocation = RevocationFilter()
+    revocation.add("expired", clock.now - 1)
+
+    assert revocation.buckets == {}
+
+
+def test_revocation_filter_drops_expired_buckets(clock):
+    bucket_seconds = settings.TOKEN_BLACKLIST_FILTER_BUCKET_SECONDS
+    revocation = RevocationFilter()
+    revocation.is_ready = True
+    short_exp = clock.now + 10
+    long_exp = clock.now + bucket_seconds * 3
+    revocation.add("short", short_exp)
+    revocation.add("long", long_exp)
+    assert len(revocation.buckets) == 2
+
+    # shortのバケットが期限切れになった後の追加で破棄される
+    clock.advance(bucket_seconds * 2)
+    revocation.add("later", long_exp)
+
+    assert len(revocation.buckets) == 1
+    assert revocation.might_be_revoked("short", short_exp) is False
+    assert revocation.might_be_revoked("long", long_exp) is True
+    assert revocation.might_be_revoked("later", long_exp) is True
@@ -0,0 +1,71 @@
+from typing import AsyncIterator, List
+
+import pytest
+
+from app.core.bulk import BulkFormatError, detect_format, iter_batches, iter_records, parse_bool
+
+
+async def chunks(*parts: bytes) -> AsyncIterator[bytes]:
+    for part in parts:
+        yield part
+
+
+async def collect(iterator) -> List:
+    return [item async for item in iterator]
+
+
+def test_detect_format():
+    assert detect_format("text/csv; charset=utf-8") == "csv"
+    assert detect_format("application/x-ndjson") == "ndjson"
+    assert detect_format("application/json", "ndjson") == "ndjson"
+
+    with pytest.raises(BulkFormatError):
+        detect_format("application/json")
+    with pytest.raises(BulkFormatError):
+        detect_format("text/csv", "xml")
+
+
+def test_parse_bool():
+    assert parse_bool("", True) is True
+    assert parse_bool(None, False) is False
+    assert parse_bool(" Yes ", False) is True
+    assert parse_bool("0", True) is False
+
+
+async def test_csv_records_across_chunk_boundaries():
+    records = await collect(iter_records(chunks(b"username,is_admin\r\nali", b"ce,true\r\n\r\nbob,\n"), "csv"))
+
+    assert records == [
+        {"username": "alice", "is_admin": "true"},
+        {"username": "bob", "is_admin": ""},
+    ]
+
+
+async def test_csv_column_count_mismatch():
+    with pytest.raises(BulkFormatError, match="3行目"):
+        await collect(iter_records(chunks(b"username,is_admin\nalice,true\nbob\n"), "csv"))
+
+
+async def test_ndjson_records():
+    records = await collect(iter_records(chunks(b'{"username": "alice"}\n{"username": "bob"}'), "ndjson"))
+
+    assert records == [{"username": "alice"}, {"username": "bob"}]
+
+
+@pytest.mark.parametrize("body, message", [
+    (b'{"username": "alice"}\n{"username": \n', "2行目: JSONとして解析できません"),
+    (b'["alice"]\n', "1行目: JSONオブジェクトではありません"),
+])
+async def test_ndjson_parse_errors(body, message):
+    with pytest.raises(BulkFormatError, match=message):
+        await collect(iter_records(chunks(body), "ndjson"))
+
+
+async def test_iter_batches():
+    async def records():
+        for i in range(5):
+            yield {"i": i}
+
+    batches = await collect(iter_batches(records(), 2))
+
+    assert [len(batch) for batch in batches] == [2, 2, 1]
@@ -0,0 +1,65 @@
+import pytest
+
+from app.core import cache
+from app.core.cache import TTLCache
+
+
+pytestmark = pytest.mark.fake_time(cache, "monotonic")
+
+
+def test_get_returns_value_until_ttl_expires(clock):
+    ttl_cache = TTLCache(maxsize=10, ttl=30)
+    ttl_cache.set("key", "value")
+
+    clock.advance(29)
+    assert ttl_cache.get("key") == "value"
+
+    clock.advance(1)
+    assert ttl_cache.get("key") is None
+    assert len(ttl_cache) == 0
+    assert ttl_cache.stats()["hits"] == 1
+    assert ttl_cache.stats()["misses"] == 1
+
+
+def test_set_with_explicit_ttl(clock):
+    ttl_cache = TTLCache(maxsize=10, ttl=30)
+    ttl_cache.set("short", 1, ttl=5)
+    ttl_cache.set("skipped", 2, ttl=0)
+
+    clock.advance(5)
+    assert ttl_cache.get("short") is None
+    assert ttl_cache.get("skipped") is None
+
+
+def test_evicts_least_recently_used_entry(clock):
+    ttl_cache = TTLCache(maxsize=2, ttl=30)
+    ttl_cache.set("a", 1)
+    ttl_cache.set("b", 2)
+
+    # aを参照したので、容量超過時にはbが削除される
+    assert ttl_cache.get("a") == 1
+    ttl_cache.set("c", 3)
+
+    assert ttl_cache.get("b") is None
+    assert ttl_cache.get("a") == 1
+    assert ttl_cache.get("c") == 3
+    assert ttl_cache.stats()["evictions"] == 1
+
+
+def test_zero_maxsize_disables_cache(clock):
+    ttl_cache = TTLCache(maxsize=0, ttl=30)
+    ttl_cache.set("key", "value")
+
+    assert ttl_cache.get("key") is None
+    assert len(ttl_cache) == 0
+
+
+def test_delete_and_clear(clock):
+    ttl_cache = TTLCache(maxsize=10, ttl=30)
+    ttl_cache.set("a", 1)
+    ttl_cache.set("b", 2)
+
+    assert ttl_cache.delete("a") is True
+    assert ttl_cache.delete("a") is False
+    ttl_cache.clear()
+    assert len(ttl_cache) == 0
@@ -0,0 +1,80 @@
+import pytest
+
+from app.clients import circuit_breaker
+from app.clients.circuit_breaker import CircuitBreaker
+
+
+pytestmark = pytest.mark.fake_time(circuit_breaker, "monotonic")
+
+
+@pytest.fixture
+def breaker(clock):
+    return CircuitBreaker("test", failure_threshold=3, reset_timeout=10)
+
+
+def test_opens_after_consecutive_failures(breaker):
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow_request() is True
+
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.allow_request() is False
+    assert breaker.stats()["rejected"] == 1
+
+
+def test_success_resets_failure_count(breaker):
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.failure_count == 1
+
+
+def test_half_open_allows_single_trial_request(breaker, clock):
+    for _ in range(3):
+        breaker.record_failure()
+
+    clock.advance(10)
+    assert breaker.allow_request() is True
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    # 試行中は他のリクエストを拒否する
+    assert breaker.allow_request() is False
+
+
+def test_half_open_success_closes(breaker, clock):
+    for _ in range(3):
+        breaker.record_failure()
+    clock.advance(10)
+    breaker.allow_request()
+
+    breaker.record_success()
+
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow_request() is True
+
+
+def test_half_open_failure_reopens(breaker, clock):
+    for _ in range(3):
+        breaker.record_failure()
+    clock.advance(10)
+    breaker.allow_request()
+
+    breaker.record_failure()
+
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.allow_request() is False
+
+
+def test_half_open_trial_is_released_after_reset_timeout(breaker, clock):
+    for _ in range(3):
+        breaker.record_failure()
+    clock.advance(10)
+    assert breaker.allow_request() is True
+
+    # 試行の結果が記録されないままreset_timeoutが経過した場合は再試行を許可する
+    clock.advance(10)
+    assert breaker.allow_request() is True
@@ -0,0 +1,36 @@
+import pytest
+
+from app.core.hashing import PasswordHasher
+
+
+def broken_worker(*args):
+    raise ValueError("bcrypt failure")
+
+
+@pytest.fixture
+def hasher():
+    hasher = PasswordHasher()
+    yield hasher
+    hasher.close()
+
+
+async def test_hash_and_verify(hasher):
+    hashed = await hasher.hash("password123")
+
+    assert await hasher.verify("password123", hashed) is True
+    assert await hasher.verify("wrong-password", hashed) is False
+    stats = hasher.stats()
+    assert stats["completed"] == 3
+    assert stats["failed"] == 0
+    assert stats["avg_seconds"] > 0
+
+
+async def test_failures_are_not_counted_as_completed(hasher):
+    with pytest.raises(ValueError):
+        await hasher._run(broken_worker)
+
+    stats = hasher.stats()
+    assert stats["completed"] == 0
+    assert stats["failed"] == 1
+    assert stats["avg_seconds"] == 0.0
+    assert hasher.pending == 0
@@ -0,0 +1,37 @@
+import base64
+import uuid
+from datetime import datetime, timezone
+
+import pytest
+
+from app.crud.pagination import InvalidCursorError, decode_cursor, encode_cursor
+
+
+def test_cursor_round_trip():
+    created_at = datetime(2025, 1, 2, 3, 4, 5, 678901, tzinfo=timezone.utc)
+    id = uuid.uuid4()
+
+    cursor = encode_cursor(created_at, id)
+
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == (created_at, id)
+
+
+@pytest.mark.parametrize("cursor", [
+    "",
+    "not a cursor",
+    base64.urlsafe_b64encode(b"2025-01-02T03:04:05|not-a-uuid").decode(),
+    base64.urlsafe_b64encode(f"yesterday|{uuid.uuid4()}".encode()).decode(),
+    base64.urlsafe_b64encode(b"\xff\xfe").decode(),
+])
+def test_invalid_cursor_is_rejected(cursor):
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(cursor)
+
+
+def test_tampered_cursor_is_rejected():
+    cursor = encode_cursor(datetime(2025, 1, 2, tzinfo=timezone.utc), uuid.uuid4())
+    tampered = cursor[:-4] + ("AAAA" if not cursor.endswith("AAAA") else "BBBB")
+
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(tampered)
@@ -0,0 +1,34 @@
+import uuid
+
+import pytest
+
+from app.clients.user_service import UserServiceClient
+from app.messaging.rabbitmq import UserEventTypes
+
+
+@pytest.fixture
+def client():
+    client = UserServiceClient()
+    client.profile_cache.set("auth-id", {"username": "alice"})
+    client.profile_cache.set("profile-id", {"username": "alice"})
+    return client
+
+
+@pytest.mark.parametrize("event_type", [
+    UserEventTypes.USER_UPDATED,
+    UserEventTypes.USER_DELETED,
+    UserEventTypes.USER_DEACTIVATED,
+])
+async def test_invalidating_events_drop_both_ids(client, event_type):
+    await client.handle_user_event(event_type, {"id": "profile-id", "user_id": "auth-id"})
+
+    assert client.profile_cache.get("auth-id") is None
+    assert client.profile_cache.get("profile-id") is None
+
+
+async def test_other_events_keep_cached_profiles(client):
+    await client.handle_user_event(UserEventTypes.USER_CREATED, {"id": "profile-id", "user_id": "auth-id"})
+    await client.handle_user_event(UserEventTypes.USER_UPDATED, {"id": str(uuid.uuid4())})
+
+    assert client.profile_cache.get("auth-id") == {"username": "alice"}
+    assert client.profile_cache.get("profile-id") == {"username": "alice"}
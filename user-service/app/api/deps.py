@@ -1,3 +1,4 @@
+from typing import Optional
 from uuid import UUID
 
 from fastapi import Depends, HTTPException, status, Header
@@ -7,9 +8,11 @@ from pydantic import ValidationError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import settings
+from app.core.jwks import jwks_client
 from app.db.session import get_db
 from app.crud.user import user
 from app.models.user import User
+from app.schemas.user import TokenPrincipal
 
 from app.core.config import settings
 
@@ -21,10 +24,15 @@ async def validate_token(token: str) -> dict:
     トークンを検証し、ペイロードを返す
     """
     try:
+        # ヘッダーのkidに対応する公開鍵をJWKSキャッシュから取得
+        key = await jwks_client.get_key(jwt.get_unverified_header(token).get("kid"))
+        if key is None:
+            raise JWTError("検証用の公開鍵がありません")
+        
         # JWTの署名検証
         payload = jwt.decode(
             token, 
-            settings.PUBLIC_KEY, 
+            key, 
             algorithms=[settings.ALGORITHM],
             options={"verify_aud": False}
         )
@@ -83,4 +91,70 @@ async def get_current_admin_user(current_user: User = Depends(get_current_user))
             detail="この操作には管理者権限が必要です"
         )
     
-    return current_user
\ No newline at end of file
+    return current_user
+
+
+def _parse_uuid(value: Optional[str]) -> Optional[UUID]:
+    """クレームの文字列をUUIDに変換（不正な値の場合はNone）"""
+    try:
+        return UUID(value) if value else None
+    except (ValueError, TypeError):
+        return None
+
+
+def _parse_bool(value) -> bool:
+    """クレームの真偽値を変換（"True"/"False"の文字列形式にも対応）"""
+    if isinstance(value, bool):
+        return value
+    return str(value).lower() == "true"
+
+
+async def get_current_principal(
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_db)
+) -> TokenPrincipal | User:
+    """
+    現在の認証主体を取得する
+    - STATELESS_AUTH_ENABLEDが有効な場合はトークンのクレームから組み立て、DBを参照しない
+    - 無効な場合、またはクレームが不足している場合はget_current_userと同じくDBから取得する
+    - ORMオブジェクトが必要なエンドポイントではget_current_userを使用すること
+    - DBから取得する場合はプライマリを使う（レプリカの遅延で無効化・削除直後のユーザーを認証しないため）
+    """
+    if not settings.STATELESS_AUTH_ENABLED:
+        return await get_current_user(token, db)
+
+    payload = await validate_token(token)
+    sub = _parse_uuid(payload.get("sub"))
+    if sub is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="無効なトークンです",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    # User Service側のIDを含まない古い形式のトークンはDBから取得する
+    profile_id = _parse_uuid(payload.get("user_id"))
+    if profile_id is None:
+        return await get_current_user(token, db)
+
+    return TokenPrincipal(
+        id=profile_id,
+        user_id=sub,
+        username=payload.get("username"),
+        is_admin=_parse_bool(payload.get("is_admin", False)),
+    )
+
+
+async def get_current_admin_principal(
+    current_principal: TokenPrincipal | User = Depends(get_current_principal)
+) -> TokenPrincipal | User:
+    """
+    現在の認証主体が管理者であることを確認
+    """
+    if not current_principal.is_admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="この操作には管理者権限が必要です"
+        )
+    
+    return current_principal
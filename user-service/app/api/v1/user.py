@@ -4,26 +4,44 @@ from datetime import timedelta
 from uuid import UUID
 
 from fastapi import APIRouter, Depends, HTTPException, status, Request, Response, Body, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError
 
 from app.crud.user import user
-from app.db.session import get_db
+from app.crud.pagination import InvalidCursorError, decode_cursor, encode_cursor
+from app.core.bulk import CONTENT_TYPES, BulkFormatError, detect_format, iter_batches, iter_records
+from app.db.bulk import stream_copy_csv
+from app.db.routing import ReplicaRouter
+from app.db.session import ReadOnlySessionLocal, get_db, get_read_db, replica_router
 from app.schemas.user import (
     User as UserResponse,
     UserCreate,
     UserUpdate,
     UserProfile,
     UserSearchParams,
-    AdminUserCreate
+    AdminUserCreate,
+    TokenPrincipal
 )
 from app.core.config import settings
-from app.api.deps import get_current_user, get_current_admin_user
+from app.api.deps import get_current_user, get_current_admin_principal
 from app.core.logging import get_request_logger, app_logger
+from app.messaging.rabbitmq import rabbitmq_client
 from app.models.user import User
 
 router = APIRouter()
 
+
+def _event_user_data(db_user: User) -> dict:
+    """ユーザーイベントに載せるユーザー情報（idはUser Service、user_idはauth-serviceのID）"""
+    return {
+        "id": db_user.id,
+        "user_id": db_user.user_id,
+        "username": db_user.username,
+        "is_active": db_user.is_active,
+        "is_admin": db_user.is_admin,
+    }
+
 # ユーザープロファイル関連エンドポイント
 @router.get("/profile/me", response_model=UserProfile)
 async def get_profile_me(
@@ -43,7 +61,7 @@ async def get_profile_me(
 async def get_profile(
     user_id: UUID,
     request: Request,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ) -> Any:
     """
     特定ユーザーのプロファイル情報を取得するエンドポイント
@@ -113,28 +131,130 @@ async def update_profile(
 
 
 # 管理者向けユーザー管理エンドポイント
+async def _stream_users_ndjson():
+    """全ユーザーを1行1件のJSONとして順に出力"""
+    async with replica_router.read_engine() as engine, ReadOnlySessionLocal(bind=engine) as db:
+        async for db_user in user.stream_all_users(db):
+            yield UserResponse.model_validate(db_user).model_dump_json() + "\n"
+
+
 @router.get("/users", response_model=List[UserResponse])
 async def get_all_users(
     request: Request,
-    current_user: User = Depends(get_current_admin_user),
-    db: AsyncSession = Depends(get_db)
+    response: Response,
+    cursor: Optional[str] = Query(None, description="前ページのレスポンスヘッダーX-Next-Cursorの値"),
+    limit: int = Query(settings.USERS_PAGE_SIZE, ge=1, le=settings.USERS_PAGE_SIZE_MAX),
+    stream: bool = Query(False, description="trueの場合は全ユーザーをNDJSONでストリーミングする"),
+    current_user: TokenPrincipal | User = Depends(get_current_admin_principal),
+    db: AsyncSession = Depends(get_read_db)
 ) -> Any:
     """
     全ユーザー一覧を取得するエンドポイント（管理者のみ）
+    - (created_at, id)順のキーセットページネーション。次ページのカーソルはX-Next-Cursorヘッダーで返す
+    - stream=trueの場合は全ユーザーをNDJSONでストリーミングする
     """
     logger = get_request_logger(request)
     logger.info(f"全ユーザー取得リクエスト: 要求元={current_user.id}")
     
-    users = await user.get_all_users(db)
+    # NDJSONストリーミング（DBセッションはレスポンス送信中も保持するためジェネレーター内で作成）
+    if stream:
+        return StreamingResponse(_stream_users_ndjson(), media_type="application/x-ndjson")
+    
+    after = None
+    if cursor:
+        try:
+            after = decode_cursor(cursor)
+        except InvalidCursorError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="不正なカーソルです"
+            )
+    
+    users, last = await user.get_users_page(db, limit=limit, after=after)
+    
+    # 次ページがある場合はカーソルをヘッダーで返す
+    if last is not None:
+        response.headers["X-Next-Cursor"] = encode_cursor(*last)
+    
     return users
 
 
+# /users/{user_id}より前に定義する（"export"がuser_idとして解釈されないようにする）
+@router.get("/users/export")
+async def export_users(
+    request: Request,
+    format: str = Query("csv", description="csvまたはndjson"),
+    current_user: TokenPrincipal | User = Depends(get_current_admin_principal)
+) -> Any:
+    """
+    全ユーザーをストリーミングでエクスポートするエンドポイント（管理者のみ）
+    - csvはCOPY TO STDOUTの結果をそのまま返す
+    """
+    logger = get_request_logger(request)
+    logger.info(f"ユーザー一括エクスポートリクエスト: 形式={format}, 要求元={current_user.id}")
+    
+    if format == "ndjson":
+        return StreamingResponse(_stream_users_ndjson(), media_type=CONTENT_TYPES["ndjson"])
+    if format != "csv":
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"未対応の形式です: {format}"
+        )
+    
+    return StreamingResponse(
+        stream_copy_csv(user.export_query()),
+        media_type=CONTENT_TYPES["csv"],
+        headers={"Content-Disposition": 'attachment; filename="users.csv"'}
+    )
+
+
+@router.post("/users/import")
+async def import_users(
+    request: Request,
+    format: Optional[str] = Query(None, description="csvまたはndjson（省略時はContent-Typeから判定）"),
+    current_user: TokenPrincipal | User = Depends(get_current_admin_principal),
+    db: AsyncSession = Depends(get_db)
+) -> Any:
+    """
+    ユーザーを一括でインポートするエンドポイント（管理者のみ）
+    - リクエストボディにCSV（ヘッダー行あり）またはNDJSONを指定する
+    - 列: username（必須）, user_id（必須、auth-serviceのユーザーID）, fullname, is_admin, is_active
+    - 既に存在するユーザー名・user_idの行はスキップする
+    """
+    logger = get_request_logger(request)
+    
+    try:
+        data_format = detect_format(request.headers.get("content-type"), format)
+        logger.info(f"ユーザー一括インポートリクエスト: 形式={data_format}, 要求元={current_user.id}")
+        
+        records = iter_records(request.stream(), data_format)
+        result = await user.bulk_import(db, iter_batches(records, settings.BULK_IMPORT_BATCH_SIZE))
+        await db.commit()
+    except BulkFormatError as e:
+        await db.rollback()
+        logger.warning(f"ユーザー一括インポート失敗: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except UnicodeDecodeError:
+        await db.rollback()
+        logger.warning("ユーザー一括インポート失敗: UTF-8として読み込めません")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="UTF-8でエンコードされたデータを指定してください"
+        )
+    
+    logger.info(f"ユーザー一括インポート成功: {result}")
+    return result
+
+
 @router.get("/users/{user_id}", response_model=UserResponse)
 async def get_user_by_id(
     user_id: UUID,
     request: Request,
-    current_user: User = Depends(get_current_admin_user),
-    db: AsyncSession = Depends(get_db)
+    current_user: TokenPrincipal | User = Depends(get_current_admin_principal),
+    db: AsyncSession = Depends(get_read_db)
 ) -> Any:
     """
     特定ユーザーの詳細情報を取得するエンドポイント（管理者のみ）
@@ -158,7 +278,7 @@ async def get_user_by_id(
 async def create_user(
     user_in: AdminUserCreate,
     request: Request,
-    current_user: User = Depends(get_current_admin_user),
+    current_user: TokenPrincipal | User = Depends(get_current_admin_principal),
     db: AsyncSession = Depends(get_db)
 ) -> Any:
     """
@@ -203,7 +323,7 @@ async def update_user(
     user_id: UUID,
     user_in: UserUpdate,
     request: Request,
-    current_user: User = Depends(get_current_admin_user),
+    current_user: TokenPrincipal | User = Depends(get_current_admin_principal),
     db: AsyncSession = Depends(get_db)
 ) -> Any:
     """
@@ -227,6 +347,9 @@ async def update_user(
         updated_user = await user.update(db, db_user, user_in)
         await db.commit()
         logger.info(f"ユーザー更新成功: ID={updated_user.id}, ユーザー名={updated_user.username}, フルネーム={updated_user.fullname}")
+        # 更新されたユーザー自身の読み取りも一定時間プライマリに向ける
+        replica_router.mark_write(ReplicaRouter.subject_key(updated_user.user_id))
+        await rabbitmq_client.publish_user_event("user.updated", _event_user_data(updated_user))
         return updated_user
     except IntegrityError:
         await db.rollback()
@@ -248,7 +371,7 @@ async def update_user(
 async def delete_user(
     user_id: UUID,
     request: Request,
-    current_user: User = Depends(get_current_admin_user),
+    current_user: TokenPrincipal | User = Depends(get_current_admin_principal),
     db: AsyncSession = Depends(get_db)
 ) -> Any:
     """
@@ -276,9 +399,12 @@ async def delete_user(
     
     try:
         # ユーザー削除
+        user_data = _event_user_data(db_user)
         await user.delete(db, db_user)
         await db.commit()
         logger.info(f"ユーザー削除成功: ID={user_id}, ユーザー名={db_user.username}, フルネーム={db_user.fullname}")
+        replica_router.mark_write(ReplicaRouter.subject_key(user_data["user_id"]))
+        await rabbitmq_client.publish_user_event("user.deleted", user_data)
         return Response(status_code=status.HTTP_204_NO_CONTENT)
     except Exception as e:
         await db.rollback()
@@ -297,21 +423,26 @@ async def search_users(
     fullname: Optional[str] = None,
     is_active: Optional[bool] = None,
     is_admin: Optional[bool] = None,
-    current_user: User = Depends(get_current_admin_user),
-    db: AsyncSession = Depends(get_db)
+    limit: int = Query(settings.USER_SEARCH_DEFAULT_LIMIT, ge=1, le=settings.USER_SEARCH_MAX_LIMIT),
+    offset: int = Query(0, ge=0),
+    current_user: TokenPrincipal | User = Depends(get_current_admin_principal),
+    db: AsyncSession = Depends(get_read_db)
 ) -> Any:
     """
     条件に基づいてユーザーを検索するエンドポイント（管理者のみ）
+    - 結果は検索語との類似度の高い順に返す
     """
     logger = get_request_logger(request)
-    logger.info(f"ユーザー検索リクエスト: 条件=[username={username}, fullname={fullname}, is_active={is_active}, is_admin={is_admin}], 要求元={current_user.id}")
+    logger.info(f"ユーザー検索リクエスト: 条件=[username={username}, fullname={fullname}, is_active={is_active}, is_admin={is_admin}, limit={limit}, offset={offset}], 要求元={current_user.id}")
     
     # 検索条件の構築
     search_params = UserSearchParams(
         username=username,
         fullname=fullname,
         is_active=is_active,
-        is_admin=is_admin
+        is_admin=is_admin,
+        limit=limit,
+        offset=offset
     )
     
     # ユーザー検索
@@ -352,8 +483,7 @@ async def sync_user(
         )
         await db.commit()
         
-        action = "更新" if await user.get_by_user_id(db, user_id) else "作成"
-        logger.info(f"ユーザー同期成功: ID={synced_user.id}, ユーザー名={synced_user.username}, フルネーム={synced_user.fullname}, アクション={action}")
+        logger.info(f"ユーザー同期成功: ID={synced_user.id}, ユーザー名={synced_user.username}, フルネーム={synced_user.fullname}")
         return synced_user
     except IntegrityError:
         await db.rollback()
@@ -368,4 +498,46 @@ async def sync_user(
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="ユーザー同期中にエラーが発生しました"
-        )
\ No newline at end of file
+        )
+
+@router.get("/sync/dead-letters")
+async def get_dead_letters(
+    request: Request,
+    limit: int = Query(100, ge=1, le=settings.USER_SYNC_DEAD_LETTER_BATCH_MAX, description="参照する最大件数"),
+    current_user: TokenPrincipal | User = Depends(get_current_admin_principal)
+) -> Any:
+    """
+    同期イベントのデッドレターキューを参照するエンドポイント（管理者のみ）
+    - 参照したメッセージはキューに残る
+    """
+    logger = get_request_logger(request)
+    logger.info(f"デッドレター参照リクエスト: 件数={limit}, 要求元={current_user.id}")
+    
+    messages = await rabbitmq_client.inspect_dead_letters(limit)
+    return {"count": len(messages), "messages": messages}
+
+
+@router.post("/sync/dead-letters/replay")
+async def replay_dead_letters(
+    request: Request,
+    limit: int = Query(100, ge=1, le=settings.USER_SYNC_DEAD_LETTER_BATCH_MAX, description="再投入する最大件数"),
+    current_user: TokenPrincipal | User = Depends(get_current_admin_principal)
+) -> Any:
+    """
+    デッドレターキューのメッセージを同期キューに再投入するエンドポイント（管理者のみ）
+    - 試行回数はリセットされる
+    """
+    logger = get_request_logger(request)
+    logger.info(f"デッドレター再投入リクエスト: 件数={limit}, 要求元={current_user.id}")
+    
+    try:
+        replayed = await rabbitmq_client.replay_dead_letters(limit)
+    except Exception as e:
+        logger.error(f"デッドレター再投入失敗: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="デッドレターの再投入中にエラーが発生しました"
+        )
+    
+    logger.info(f"デッドレター再投入成功: {replayed}件")
+    return {"replayed": replayed}
@@ -0,0 +1,97 @@
+import csv
+import json
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+
+# 一括インポート・エクスポートで扱う形式
+SUPPORTED_FORMATS = ("csv", "ndjson")
+
+CONTENT_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+
+class BulkFormatError(ValueError):
+    """アップロードされたデータの形式が不正な場合の例外"""
+
+
+def detect_format(content_type: Optional[str], format: Optional[str] = None) -> str:
+    """クエリパラメータまたはContent-Typeからデータ形式を判定"""
+    if format:
+        if format not in SUPPORTED_FORMATS:
+            raise BulkFormatError(f"未対応の形式です: {format}")
+        return format
+
+    content_type = (content_type or "").split(";")[0].strip().lower()
+    if content_type in ("text/csv", "application/csv"):
+        return "csv"
+    if content_type in ("application/x-ndjson", "application/ndjson", "application/jsonl"):
+        return "ndjson"
+    raise BulkFormatError("Content-Typeにはtext/csvまたはapplication/x-ndjsonを指定してください")
+
+
+def parse_bool(value: Any, default: bool) -> bool:
+    """CSV/NDJSONの真偽値を変換（空の場合はデフォルト値）"""
+    if value is None or value == "":
+        return default
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ("true", "1", "yes")
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """受信したバイト列のチャンクを行単位に分割（全体をメモリに読み込まない）"""
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        lines = buffer.split(b"\n")
+        buffer = lines.pop()
+        for line in lines:
+            yield line.rstrip(b"\r").decode("utf-8")
+    if buffer:
+        yield buffer.rstrip(b"\r").decode("utf-8")
+
+
+async def iter_records(chunks: AsyncIterator[bytes], format: str) -> AsyncIterator[Dict[str, Any]]:
+    """
+    アップロードされたデータを1行ずつ辞書に変換
+
+    - csv: 1行目をヘッダーとして扱う（値に改行を含むフィールドには対応しない）
+    - ndjson: 1行に1つのJSONオブジェクト
+    """
+    header: Optional[List[str]] = None
+    line_number = 0
+    async for line in iter_lines(chunks):
+        line_number += 1
+        if not line.strip():
+            continue
+
+        if format == "csv":
+            values = next(csv.reader([line]))
+            if header is None:
+                header = [name.strip() for name in values]
+                continue
+            if len(values) != len(header):
+                raise BulkFormatError(f"{line_number}行目: 列数がヘッダーと一致しません")
+            yield dict(zip(header, values))
+        else:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                raise BulkFormatError(f"{line_number}行目: JSONとして解析できません")
+            if not isinstance(record, dict):
+                raise BulkFormatError(f"{line_number}行目: JSONオブジェクトではありません")
+            yield record
+
+
+async def iter_batches(records: AsyncIterator[Dict[str, Any]], size: int) -> AsyncIterator[List[Dict[str, Any]]]:
+    """レコードを指定件数ごとのリストにまとめる"""
+    batch: List[Dict[str, Any]] = []
+    async for record in records:
+        batch.append(record)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
@@ -20,7 +20,26 @@ class Settings(BaseSettings):
     RABBITMQ_VHOST: str = "/"
     USER_SYNC_EXCHANGE: str = "user_events"
     USER_SYNC_ROUTING_KEY: str = "user.sync"
+    USER_PROFILE_ROUTING_KEY: str = "user.profile"  # User Serviceでのプロファイル変更イベント（auth-serviceのキャッシュ無効化用）
+    USER_SYNC_PARTITIONS: int = 1  # ユーザーIDで振り分けるパーティション数（1の場合は単一のキューを使う）
+    RABBITMQ_PUBLISH_CHANNELS: int = 4  # 発行用チャネル数
+    RABBITMQ_PUBLISH_MAX_IN_FLIGHT: int = 256  # 確認応答待ちのメッセージ数の上限
+    RABBITMQ_PUBLISH_TIMEOUT: float = 10.0  # 確認応答を待つ最大時間（秒）
     USER_SYNC_QUEUE: str = "user_service_sync"
+    USER_SYNC_CONSUMER_INDEX: int = 0  # このレプリカの番号（0始まり）
+    USER_SYNC_CONSUMER_COUNT: int = 1  # パーティションを分担するレプリカ数（担当外のパーティションも待機中の購読者として購読する）
+    USER_SYNC_PREFETCH_COUNT: int = 200  # 未ACKのまま受け取るメッセージ数の上限
+    USER_SYNC_BATCH_ENABLED: bool = True  # 複数メッセージを1トランザクションでまとめて反映する
+    USER_SYNC_BATCH_SIZE: int = 100  # 1バッチの最大メッセージ数
+    USER_SYNC_BATCH_WINDOW: float = 0.2  # バッチを締め切るまでの最大待機時間（秒）
+    USER_SYNC_DEDUP_CACHE_SIZE: int = 100000  # 処理済みメッセージIDをローカルに保持する件数
+    USER_SYNC_DEDUP_TTL: float = 3600.0  # 処理済みメッセージIDを保持する期間（秒）
+    USER_SYNC_MAX_ATTEMPTS: int = 6  # 処理に失敗したメッセージを試行する最大回数（超えるとデッドレターキューへ）
+    USER_SYNC_RETRY_BASE_DELAY: float = 1.0  # 1回目の再試行までの待機時間（秒、以降は倍々に増やす）
+    USER_SYNC_RETRY_MAX_DELAY: float = 300.0  # 再試行までの待機時間の上限（秒）
+    USER_SYNC_RETRY_EXCHANGE: str = "user_events.retry"
+    USER_SYNC_DEAD_LETTER_QUEUE: str = "user_service_sync.dead_letter"
+    USER_SYNC_DEAD_LETTER_BATCH_MAX: int = 1000  # デッドレターの参照・再投入で一度に扱う最大件数
     
     # データベース設定
     POSTGRES_USER: str
@@ -28,6 +47,16 @@ class Settings(BaseSettings):
     POSTGRES_HOST: str
     POSTGRES_PORT: str
     POSTGRES_DB: str
+    DATABASE_READ_REPLICA_URLS: str = ""  # 読み取り専用セッションの接続先（カンマ区切り、未指定の場合はプライマリ）
+    DATABASE_READ_REPLICA_STRATEGY: Literal["round_robin", "least_load"] = "round_robin"  # レプリカの選択方法
+    DATABASE_READ_YOUR_WRITES_WINDOW: float = 5.0  # 書き込み後にプライマリから読み取る時間（秒）
+    DB_POOL_SIZE: int = 5  # ワーカープロセスごと・接続先ごとに保持する接続数
+    DB_MAX_OVERFLOW: int = 10  # プールサイズを超えて一時的に作成できる接続数
+    DB_POOL_TIMEOUT: float = 10.0  # 空き接続を待つ最大時間（秒）
+    DB_POOL_RECYCLE: int = 1800  # 接続を再作成するまでの時間（秒、-1で無効）
+    DB_POOL_PRE_PING: bool = True  # 取得時に接続の生存を確認する
+    DB_PREPARED_STATEMENT_CACHE_SIZE: int = 500  # 接続ごとにキャッシュするasyncpgのプリペアドステートメント数（0で無効）
+    DB_QUERY_CACHE_SIZE: int = 500  # SQLAlchemyのコンパイル済みSQLのキャッシュ数
 
     # auth-service設定
     AUTH_SERVICE_INTERNAL_PORT: int = 8080
@@ -38,6 +67,25 @@ class Settings(BaseSettings):
     ALGORITHM: str = "RS256"
     PUBLIC_KEY_PATH: str = "keys/public.pem"   # 公開鍵のパス
     
+    # JWKS設定（auth-serviceの公開鍵を取得してローカルで検証する）
+    AUTH_SERVICE_JWKS_URL: str = "http://auth-service:8080/.well-known/jwks.json"
+    JWKS_REFRESH_INTERVAL: float = 300.0  # 定期再取得の間隔（秒）
+    JWKS_MIN_REFRESH_INTERVAL: float = 10.0  # 未知のkid受信時に再取得する最小間隔（秒）
+    JWKS_FETCH_TIMEOUT: float = 2.0
+    
+    # ステートレス認証（有効時はトークンのクレームから認証主体を組み立て、DBを参照しない）
+    STATELESS_AUTH_ENABLED: bool = False
+    
+    # ユーザー一覧のページネーション設定
+    USERS_PAGE_SIZE: int = 100  # 1ページあたりのデフォルト件数
+    USERS_PAGE_SIZE_MAX: int = 1000
+    USERS_STREAM_BATCH_SIZE: int = 500  # NDJSONストリーミング時にカーソルから一度に取得する件数
+    BULK_IMPORT_BATCH_SIZE: int = 5000  # 一括インポートでCOPYする1回あたりの件数
+    
+    # ユーザー検索の件数設定
+    USER_SEARCH_DEFAULT_LIMIT: int = 50
+    USER_SEARCH_MAX_LIMIT: int = 500
+    
     @property
     def DATABASE_URL(self) -> str:
         return f"postgresql+asyncpg://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@{self.POSTGRES_HOST}:{self.POSTGRES_PORT}/{self.POSTGRES_DB}"
@@ -0,0 +1,156 @@
+import asyncio
+import time
+from typing import Any, Dict, Optional
+
+import httpx
+from jose import jwk
+from jose.backends.base import Key
+
+from app.core.config import settings
+from app.core.logging import app_logger
+
+
+class JWKSClient:
+    """
+    auth-serviceが公開するJWKSをキャッシュし、トークン検証用の公開鍵を提供するクラス
+
+    - バックグラウンドで定期的にJWKSを再取得する（ETagで未変更時の転送を省略）
+    - 未知のkidを持つトークンを受け取った場合は、最小間隔を空けて即時に再取得する
+    - JWKSを取得できない場合やkidを持たないトークンはローカルのPUBLIC_KEYで検証する
+    """
+
+    def __init__(self):
+        self.client: Optional[httpx.AsyncClient] = None
+        self.keys: Dict[str, Key] = {}
+        self.etag: Optional[str] = None
+        self.logger = app_logger
+        self.is_initialized = False
+        self.last_attempt = 0.0
+        self.last_success = 0.0
+        self.refresh_count = 0
+        self.refresh_errors = 0
+        self._local_key: Optional[Key] = None
+        self._task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+
+    async def initialize(self):
+        """HTTPクライアントを作成し、JWKSの初回取得とバックグラウンド更新を開始"""
+        if self.is_initialized:
+            return
+
+        self.client = httpx.AsyncClient(timeout=settings.JWKS_FETCH_TIMEOUT)
+        self.is_initialized = True
+
+        # 初回取得に失敗してもローカルの公開鍵で検証できるため起動は継続する
+        await self.refresh()
+        self._task = asyncio.create_task(self._run())
+        self.logger.info(f"JWKSクライアントを初期化しました: 鍵={len(self.keys)}件")
+
+    async def close(self):
+        """バックグラウンド更新を停止し、HTTPクライアントをクローズ"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self.client is not None:
+            await self.client.aclose()
+        self.client = None
+        self.is_initialized = False
+        self.logger.info("JWKSクライアントがクローズされました")
+
+    async def refresh(self) -> bool:
+        """
+        JWKSを再取得する
+
+        Returns:
+            bool: 取得に成功した場合（未変更を含む）はTrue、失敗した場合はFalse
+        """
+        if self.client is None:
+            return False
+
+        async with self._lock:
+            self.last_attempt = time.monotonic()
+            headers = {"If-None-Match": self.etag} if self.etag else {}
+            try:
+                response = await self.client.get(settings.AUTH_SERVICE_JWKS_URL, headers=headers)
+                if response.status_code == httpx.codes.NOT_MODIFIED:
+                    self.last_success = time.monotonic()
+                    return True
+                response.raise_for_status()
+
+                keys: Dict[str, Key] = {}
+                for jwk_dict in response.json().get("keys", []):
+                    kid = jwk_dict.get("kid")
+                    if not kid:
+                        continue
+                    try:
+                        keys[kid] = jwk.construct(jwk_dict, jwk_dict.get("alg", settings.ALGORITHM))
+                    except Exception as e:
+                        self.logger.warning(f"JWKSの鍵を読み込めませんでした: kid={kid}, {str(e)}")
+            except Exception as e:
+                self.refresh_errors += 1
+                self.logger.warning(f"JWKSの取得に失敗しました: {str(e)}")
+                return False
+
+            if set(keys) != set(self.keys):
+                self.logger.info(f"JWKSを更新しました: kid={sorted(keys)}")
+            self.keys = keys
+            self.etag = response.headers.get("ETag")
+            self.last_success = time.monotonic()
+            self.refresh_count += 1
+            return True
+
+    async def _run(self):
+        """一定間隔でJWKSを再取得し続ける"""
+        while True:
+            await asyncio.sleep(settings.JWKS_REFRESH_INTERVAL)
+            await self.refresh()
+
+    def _get_local_key(self) -> Optional[Key]:
+        """ローカルに配置された公開鍵を取得"""
+        if self._local_key is None and settings.PUBLIC_KEY:
+            self._local_key = jwk.construct(settings.PUBLIC_KEY, settings.ALGORITHM)
+        return self._local_key
+
+    async def get_key(self, kid: Optional[str]) -> Optional[Key]:
+        """
+        kidに対応する検証用の公開鍵を取得
+
+        Args:
+            kid: トークンヘッダーの鍵ID
+
+        Returns:
+            Optional[Key]: 公開鍵（見つからない場合はローカルの公開鍵、それもなければNone）
+        """
+        if kid is None:
+            return self._get_local_key()
+
+        key = self.keys.get(kid)
+        if key is not None:
+            return key
+
+        # ローテーション直後の新しい鍵の可能性があるため、間隔を空けて再取得する
+        if time.monotonic() - self.last_attempt >= settings.JWKS_MIN_REFRESH_INTERVAL:
+            await self.refresh()
+            key = self.keys.get(kid)
+            if key is not None:
+                return key
+
+        return self._get_local_key()
+
+    def stats(self) -> Dict[str, Any]:
+        """JWKSキャッシュの状態を返す"""
+        return {
+            "initialized": self.is_initialized,
+            "keys": sorted(self.keys),
+            "refresh_count": self.refresh_count,
+            "refresh_errors": self.refresh_errors,
+            "seconds_since_success": round(time.monotonic() - self.last_success, 1) if self.last_success else None,
+        }
+
+
+# シングルトンインスタンス
+jwks_client = JWKSClient()
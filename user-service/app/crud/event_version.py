@@ -0,0 +1,27 @@
+from typing import Optional
+from uuid import UUID
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+class CRUDEventVersion:
+    async def claim(self, db: AsyncSession, user_id: UUID, version: int, message_id: Optional[str] = None) -> bool:
+        """
+        ユーザーごとに反映済みのイベントバージョンを進める
+        - 反映済みより新しいバージョンの場合のみ更新してTrueを返す
+        - 同じバージョン（重複）や古いバージョン（順序の逆転）の場合はFalseを返す
+        - 呼び出し元のトランザクションで実行し、イベントの反映と一緒にコミットする
+        """
+        result = await db.execute(text(
+            "INSERT INTO user_event_versions (user_id, version, message_id, updated_at) "
+            "VALUES (:user_id, :version, :message_id, now()) "
+            "ON CONFLICT (user_id) DO UPDATE SET "
+            "version = EXCLUDED.version, message_id = EXCLUDED.message_id, updated_at = now() "
+            "WHERE user_event_versions.version < EXCLUDED.version "
+            "RETURNING user_id"
+        ), {"user_id": user_id, "version": version, "message_id": message_id})
+        return result.first() is not None
+
+
+event_version = CRUDEventVersion()
@@ -0,0 +1,24 @@
+import base64
+from datetime import datetime
+from typing import Tuple
+from uuid import UUID
+
+
+class InvalidCursorError(ValueError):
+    """ページネーションカーソルが不正な場合の例外"""
+
+
+def encode_cursor(created_at: datetime, id: UUID) -> str:
+    """最後に返した行の(created_at, id)から次ページのカーソルを作成"""
+    raw = f"{created_at.isoformat()}|{id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, UUID]:
+    """カーソルを(created_at, id)に変換"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, _, id = base64.urlsafe_b64decode(padded.encode()).decode().partition("|")
+        return datetime.fromisoformat(created_at), UUID(id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise InvalidCursorError("不正なカーソルです") from e
@@ -1,8 +1,13 @@
-from typing import Optional, List
+import uuid
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, Optional, List, Tuple
 from uuid import UUID
-from sqlalchemy.dialects.postgresql import UUID as PgUUID
+from sqlalchemy.dialects.postgresql import UUID as PgUUID, insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, or_
+from sqlalchemy import lambda_stmt, select, or_, tuple_, func, text
+from app.core.config import settings
+from app.core.bulk import BulkFormatError, parse_bool
+from app.db.bulk import copy_records
 from sqlalchemy.exc import IntegrityError
 from app.models.user import User
 from app.schemas.user import UserCreate, AdminUserCreate, UserUpdate, UserSearchParams
@@ -28,20 +33,57 @@ class CRUDUser:
         """全ユーザーを取得"""
         result = await db.execute(select(User))
         return result.scalars().all()
+
+    async def get_users_page(
+        self,
+        db: AsyncSession,
+        limit: int,
+        after: Optional[Tuple[datetime, UUID]] = None
+    ) -> Tuple[List[User], Optional[Tuple[datetime, UUID]]]:
+        """
+        (created_at, id)のキーセットでユーザーを1ページ分取得
+        - afterには前ページ最後の(created_at, id)を指定する
+        - 次ページがある場合は最後の行の(created_at, id)を返す
+        """
+        query = select(User).order_by(User.created_at, User.id)
+        if after is not None:
+            query = query.filter(tuple_(User.created_at, User.id) > tuple_(*after))
+        
+        # 1件多く取得して次ページの有無を判定する
+        result = await db.execute(query.limit(limit + 1))
+        users = list(result.scalars().all())
+        if len(users) <= limit:
+            return users, None
+        
+        users = users[:limit]
+        return users, (users[-1].created_at, users[-1].id)
+
+    async def stream_all_users(self, db: AsyncSession) -> AsyncIterator[User]:
+        """サーバーサイドカーソルで全ユーザーを順に取得（メモリ使用量は一定）"""
+        query = (
+            select(User)
+            .order_by(User.created_at, User.id)
+            .execution_options(yield_per=settings.USERS_STREAM_BATCH_SIZE)
+        )
+        result = await db.stream_scalars(query)
+        async for db_user in result:
+            yield db_user
     
+    # 認証のたびに呼ばれる検索はlambda_stmtで組み立て、文の構築とキャッシュキーの計算を省く
+    # （ラムダ内で参照する変数はバインドパラメーターになる）
     async def get_by_id(self, db: AsyncSession, id: UUID) -> Optional[User]:
         """IDによるユーザー取得"""
-        result = await db.execute(select(User).filter(User.id == id))
+        result = await db.execute(lambda_stmt(lambda: select(User).filter(User.id == id)))
         return result.scalar_one_or_none()
 
     async def get_by_user_id(self, db: AsyncSession, user_id: UUID) -> Optional[User]:
         """Auth ServiceのユーザーIDでユーザーを取得"""
-        result = await db.execute(select(User).filter(User.user_id == user_id))
+        result = await db.execute(lambda_stmt(lambda: select(User).filter(User.user_id == user_id)))
         return result.scalar_one_or_none()
 
     async def get_by_username(self, db: AsyncSession, username: str) -> Optional[User]:
         """ユーザー名でユーザーを取得"""
-        result = await db.execute(select(User).filter(User.username == username))
+        result = await db.execute(lambda_stmt(lambda: select(User).filter(User.username == username)))
         return result.scalar_one_or_none()
         
     async def get_by_fullname(self, db: AsyncSession, fullname: str) -> Optional[User]:
@@ -50,17 +92,33 @@ class CRUDUser:
         return result.scalar_one_or_none()
 
     async def search_users(self, db: AsyncSession, params: UserSearchParams) -> List[User]:
-        """条件によるユーザー検索"""
+        """
+        条件によるユーザー検索
+        - username/fullnameの部分一致はpg_trgmのGINインデックスで処理される
+        - 検索語との類似度（word_similarity）の高い順に並べ、limit/offsetで件数を制限する
+        """
         query = select(User)
+        scores = []
         
         if params.username:
             query = query.filter(User.username.ilike(f"%{params.username}%"))
+            scores.append(func.word_similarity(params.username, User.username))
         if params.fullname:
             query = query.filter(User.fullname.ilike(f"%{params.fullname}%"))
+            scores.append(func.word_similarity(params.fullname, User.fullname))
         if params.is_active is not None:
             query = query.filter(User.is_active == params.is_active)
         if params.is_admin is not None:
             query = query.filter(User.is_admin == params.is_admin)
+        
+        # 類似度順（同点の場合は作成順）で並べ、ページ間で順序が揺れないようにする
+        order_by = [sum(scores[1:], scores[0]).desc()] if scores else []
+        limit = params.limit if params.limit is not None else settings.USER_SEARCH_DEFAULT_LIMIT
+        query = (
+            query.order_by(*order_by, User.created_at, User.id)
+            .limit(min(limit, settings.USER_SEARCH_MAX_LIMIT))
+            .offset(params.offset)
+        )
             
         result = await db.execute(query)
         return result.scalars().all()
@@ -88,36 +146,129 @@ class CRUDUser:
         await db.delete(db_obj)
         await db.flush()
 
+    def _upsert_statement(self, rows: List[dict]):
+        """user_idをキーにしたINSERT ... ON CONFLICT DO UPDATE ... RETURNING文を作成"""
+        stmt = pg_insert(User).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[User.user_id],
+            set_={
+                "username": stmt.excluded.username,
+                # fullnameが指定されていない場合は既存の値を保持する
+                "fullname": func.coalesce(stmt.excluded.fullname, User.fullname),
+                "is_admin": stmt.excluded.is_admin,
+                "is_active": stmt.excluded.is_active,
+                "updated_at": func.now(),
+            },
+        )
+        return stmt.returning(User)
+
     async def sync_user(self, db: AsyncSession, user_id: UUID, username: str, fullname: Optional[str] = None, is_admin: bool = False, is_active: bool = True) -> User:
         """
         Auth Serviceからのユーザー同期
-        - user_idが存在すれば更新、なければ作成
+        - user_idが存在すれば更新、なければ作成（1回のUPSERTで行う）
         """
-        # ユーザーの検索
-        db_user = await self.get_by_user_id(db, user_id)
-        
-        if db_user:
-            # 既存ユーザーの更新
-            db_user.username = username
-            if fullname is not None:
-                db_user.fullname = fullname
-            db_user.is_admin = is_admin
-            db_user.is_active = is_active
-            await db.flush()
-            await db.refresh(db_user)
-            return db_user
-        else:
-            # 新規ユーザーの作成
-            db_obj = User(
-                user_id=user_id,
-                username=username,
-                fullname=fullname,
-                is_admin=is_admin,
-                is_active=is_active
-            )
-            db.add(db_obj)
-            await db.flush()
-            await db.refresh(db_obj)
-            return db_obj
+        stmt = self._upsert_statement([{
+            "user_id": user_id,
+            "username": username,
+            "fullname": fullname,
+            "is_admin": is_admin,
+            "is_active": is_active,
+        }])
+        # セッション内に同じユーザーが読み込まれている場合もRETURNINGの値で上書きする
+        result = await db.execute(stmt, execution_options={"populate_existing": True})
+        return result.scalar_one()
+
+    async def sync_users(self, db: AsyncSession, users: List[dict]) -> List[User]:
+        """
+        Auth Serviceからのユーザー同期（複数件を1回のUPSERTで行う）
+
+        Args:
+            users: user_id, username, fullname, is_admin, is_activeを持つ辞書のリスト
+        """
+        # 同じ文で同一行を2回更新できないため、user_idごとに最後の値のみを残す
+        rows = {}
+        for row in users:
+            rows[row["user_id"]] = {
+                "user_id": row["user_id"],
+                "username": row["username"],
+                "fullname": row.get("fullname"),
+                "is_admin": row.get("is_admin", False),
+                "is_active": row.get("is_active", True),
+            }
+        if not rows:
+            return []
+
+        stmt = self._upsert_statement(list(rows.values()))
+        result = await db.execute(stmt, execution_options={"populate_existing": True})
+        return list(result.scalars().all())
+
+    # 一括インポート用のステージングテーブル（トランザクション終了時に削除）
+    IMPORT_STAGING_TABLE = "users_import"
+    IMPORT_COLUMNS = ("username", "fullname", "is_admin", "is_active", "user_id")
+
+    def _prepare_import_rows(self, batch: List[Dict[str, Any]], offset: int = 0) -> List[tuple]:
+        """
+        アップロードされたレコードをステージングテーブルの行に変換
+
+        Args:
+            offset: バッチより前に受け取ったレコード数（エラーメッセージのレコード番号に使う）
+        """
+        rows = []
+        for number, record in enumerate(batch, start=offset + 1):
+            if not record.get("username"):
+                raise BulkFormatError(f"{number}件目: usernameが指定されていません")
+            # usersテーブルのuser_idはNOT NULLのため、auth-serviceのIDを必須とする
+            if not record.get("user_id"):
+                raise BulkFormatError(f"{number}件目: ユーザー '{record['username']}' のuser_idが指定されていません")
+            try:
+                user_id = uuid.UUID(str(record["user_id"]))
+            except ValueError:
+                raise BulkFormatError(f"{number}件目: ユーザー '{record['username']}' のuser_idが不正です")
+            rows.append((
+                record["username"],
+                record.get("fullname") or None,
+                parse_bool(record.get("is_admin"), False),
+                parse_bool(record.get("is_active"), True),
+                user_id,
+            ))
+        return rows
+
+    async def bulk_import(self, db: AsyncSession, batches: AsyncIterator[List[Dict[str, Any]]]) -> Dict[str, int]:
+        """
+        ユーザーを一括でインポートする
+        - COPYでステージングテーブルに投入した後、1回のINSERT ... SELECTで本テーブルに反映する
+        - user_id（auth-serviceのユーザーID）は必須で、ないレコードがあればBulkFormatErrorを送出する
+        - 既存ユーザーと重複するユーザー名・user_idの行はスキップする
+        - コミットは呼び出し元に任せる
+        """
+        await db.execute(text(
+            f"CREATE TEMP TABLE {self.IMPORT_STAGING_TABLE} ("
+            "username text NOT NULL, fullname text, "
+            "is_admin boolean NOT NULL, is_active boolean NOT NULL, user_id uuid NOT NULL"
+            ") ON COMMIT DROP"
+        ))
+
+        received = 0
+        async for batch in batches:
+            rows = self._prepare_import_rows(batch, received)
+            await copy_records(db, self.IMPORT_STAGING_TABLE, self.IMPORT_COLUMNS, rows)
+            received += len(rows)
+
+        result = await db.execute(text(
+            "INSERT INTO users (id, username, fullname, is_admin, is_active, user_id, created_at, updated_at) "
+            "SELECT DISTINCT ON (username) gen_random_uuid(), username, fullname, is_admin, is_active, user_id, now(), now() "
+            f"FROM {self.IMPORT_STAGING_TABLE} ORDER BY username "
+            "ON CONFLICT DO NOTHING"
+        ))
+        inserted = result.rowcount
+        return {"received": received, "inserted": inserted, "skipped": received - inserted}
+
+    def export_query(self) -> str:
+        """一括エクスポート用のCOPYクエリ（インポートと同じ列名で出力する）"""
+        return (
+            "SELECT id, username, fullname, is_admin, is_active, user_id, created_at "
+            "FROM users ORDER BY created_at, id"
+        )
+
 
 user = CRUDUser()
\ No newline at end of file
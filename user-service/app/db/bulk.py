@@ -0,0 +1,58 @@
+import asyncio
+from typing import Any, AsyncIterator, Iterable, Sequence
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.session import replica_router
+
+
+async def copy_records(db: AsyncSession, table_name: str, columns: Sequence[str], records: Iterable[Sequence[Any]]):
+    """
+    セッションのトランザクション上でasyncpgのCOPYを使ってレコードを投入する
+
+    INSERTを1行ずつ発行するよりも大幅に高速なため、一括インポートのステージングテーブルへの投入に使用する
+    """
+    connection = await db.connection()
+    raw_connection = await connection.get_raw_connection()
+    await raw_connection.driver_connection.copy_records_to_table(
+        table_name,
+        records=records,
+        columns=list(columns),
+    )
+
+
+async def stream_copy_csv(query: str) -> AsyncIterator[bytes]:
+    """
+    COPY (query) TO STDOUTの結果をCSVのチャンクとして順に返す
+
+    - レスポンス送信中も接続を保持するため、専用の接続を使用する
+    - 送信が追いつかない場合はキューが埋まった時点でCOPYの読み出しを止める
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=16)
+    done = object()
+
+    async def produce():
+        try:
+            async with replica_router.read_engine() as engine, engine.connect() as connection:
+                raw_connection = await connection.get_raw_connection()
+                await raw_connection.driver_connection.copy_from_query(
+                    query,
+                    output=queue.put,
+                    format="csv",
+                    header=True,
+                )
+        finally:
+            await queue.put(done)
+
+    task = asyncio.create_task(produce())
+    try:
+        while True:
+            chunk = await queue.get()
+            if chunk is done:
+                break
+            yield chunk
+        # COPY中のエラーを呼び出し元に伝える
+        await task
+    finally:
+        if not task.done():
+            task.cancel()
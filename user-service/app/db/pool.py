@@ -0,0 +1,78 @@
+import time
+from typing import Any, Dict
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app.core.config import settings
+from app.core.logging import app_logger
+
+
+class InstrumentedAsyncPool(AsyncAdaptedQueuePool):
+    """
+    接続の取得状況を記録するコネクションプール
+
+    - 取得にかかった時間（空きを待った時間と接続確認を含む）の合計・最大
+    - プールサイズを超えて接続を作成した回数（overflow）と、取得がタイムアウトした回数
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.overflow_events = 0
+        self.timeouts = 0
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            self.timeouts += 1
+            app_logger.warning(
+                f"DB接続の取得がタイムアウトしました: pool_size={self.size()}, "
+                f"checked_out={self.checkedout()}, overflow={self.overflow()}, timeout={self._timeout}"
+            )
+            raise
+        elapsed = time.perf_counter() - start
+        self.checkouts += 1
+        self.wait_seconds_total += elapsed
+        self.wait_seconds_max = max(self.wait_seconds_max, elapsed)
+        return connection
+
+    def _inc_overflow(self) -> bool:
+        created = super()._inc_overflow()
+        if created and self._overflow > 0:
+            self.overflow_events += 1
+        return created
+
+    def stats(self) -> Dict[str, Any]:
+        """プールの利用状況を返す"""
+        return {
+            "size": self.size(),
+            "checked_out": self.checkedout(),
+            "checked_in": self.checkedin(),
+            "overflow": max(self.overflow(), 0),
+            "max_overflow": self._max_overflow,
+            "checkouts": self.checkouts,
+            "wait_seconds_avg": self.wait_seconds_total / self.checkouts if self.checkouts else 0.0,
+            "wait_seconds_max": self.wait_seconds_max,
+            "overflow_events": self.overflow_events,
+            "timeouts": self.timeouts,
+        }
+
+
+def engine_options() -> Dict[str, Any]:
+    """create_async_engineに渡すコネクションプール・キャッシュの設定（ワーカープロセスごとに適用される）"""
+    return {
+        "poolclass": InstrumentedAsyncPool,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "query_cache_size": settings.DB_QUERY_CACHE_SIZE,
+        # 同じSQLを実行する際にサーバー側のPrepareを省略する（PgBouncerのtransactionモード経由では0にする）
+        "connect_args": {"prepared_statement_cache_size": settings.DB_PREPARED_STATEMENT_CACHE_SIZE},
+    }
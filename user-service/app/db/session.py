@@ -1,32 +1,105 @@
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_scoped_session
-from sqlalchemy.orm import sessionmaker
+from typing import Any, Dict
+
+from fastapi import Request
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine, AsyncSession, async_scoped_session
+from sqlalchemy.orm import Session, sessionmaker
 from sqlalchemy.pool import NullPool
 import asyncio
 
 from app.core.config import settings
+from app.db.pool import engine_options
+from app.db.routing import ReplicaRouter
 
 
 # 非同期エンジンの作成
 async_engine = create_async_engine(
     settings.DATABASE_URL,
     echo=settings.SQLALCHEMY_ECHO,
-    future=True
+    future=True,
+    **engine_options()
 )
 
+# 読み書き用セッションの書き込みを記録するSessionクラス（read-your-writesの判定に使う）
+class WriteTrackingSession(Session):
+    pass
+
+
+@event.listens_for(WriteTrackingSession, "after_flush")
+def _track_flush(session, flush_context):
+    session.info["has_writes"] = True
+
+
+@event.listens_for(WriteTrackingSession, "do_orm_execute")
+def _track_dml(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info["has_writes"] = True
+
+
 # 非同期セッションファクトリーの作成
 AsyncSessionLocal = sessionmaker(
     async_engine,
     class_=AsyncSession,
+    sync_session_class=WriteTrackingSession,
+    autocommit=False,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
+
+def _read_only(engine: AsyncEngine) -> AsyncEngine:
+    """接続ごとにREAD ONLY DEFERRABLEのトランザクションを開始するエンジン（接続プールは共有する）"""
+    return engine.execution_options(postgresql_readonly=True, postgresql_deferrable=True)
+
+
+# 読み取り専用セッションの接続先（レプリカが指定されていない場合はプライマリ）
+replica_router = ReplicaRouter(
+    primary=_read_only(async_engine),
+    replicas=[
+        _read_only(create_async_engine(url.strip(), echo=settings.SQLALCHEMY_ECHO, future=True, **engine_options()))
+        for url in settings.DATABASE_READ_REPLICA_URLS.split(",")
+        if url.strip()
+    ],
+    strategy=settings.DATABASE_READ_REPLICA_STRATEGY,
+    read_your_writes_window=settings.DATABASE_READ_YOUR_WRITES_WINDOW,
+)
+
+# 読み取り専用セッションファクトリーの作成（接続先はセッション作成時にbindで指定する）
+ReadOnlySessionLocal = sessionmaker(
+    replica_router.primary,
+    class_=AsyncSession,
     autocommit=False,
     autoflush=False,
     expire_on_commit=False,
 )
 
-# 非同期DBセッションを取得するための依存関係
-async def get_db() -> AsyncSession:
+def pool_stats() -> Dict[str, Any]:
+    """プライマリ・レプリカのコネクションプールの利用状況を返す"""
+    return {
+        "primary": async_engine.sync_engine.pool.stats(),
+        "replicas": [engine.sync_engine.pool.stats() for engine in replica_router.replicas],
+    }
+
+# 非同期DBセッションを取得するための依存関係（読み書き用）
+async def get_db(request: Request) -> AsyncSession:
     async with AsyncSessionLocal() as session:
         try:
             yield session
         finally:
             await session.commit()
-            await session.close()
\ No newline at end of file
+            await session.close()
+            # 書き込みを行ったクライアントは一定時間プライマリから読み取る
+            if session.info.get("has_writes"):
+                replica_router.mark_write(ReplicaRouter.client_key(request.headers.get("Authorization")))
+
+# 読み取り専用のDBセッションを取得するための依存関係
+# 参照のみのエンドポイントで使用し、終了時はコミットせずにロールバックする
+async def get_read_db(request: Request) -> AsyncSession:
+    key = ReplicaRouter.client_key(request.headers.get("Authorization"))
+    async with replica_router.read_engine(key) as engine:
+        async with ReadOnlySessionLocal(bind=engine) as session:
+            try:
+                yield session
+            finally:
+                await session.rollback()
+                await session.close()
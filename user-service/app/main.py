@@ -11,10 +11,12 @@ from app.api.v1.api import api_router
 from app.core.config import settings
 from app.core.logging import app_logger, get_request_logger
 from app.db.init import Database
-from app.db.session import AsyncSessionLocal
+from app.db.session import AsyncSessionLocal, pool_stats, replica_router
 from app.crud.user import user
 from app.schemas.user import AdminUserCreate, UserSearchParams
 from app.messaging.rabbitmq import rabbitmq_client
+from app.messaging.publisher import publisher
+from app.core.jwks import jwks_client
 
 # ログディレクトリの作成（ファイルログが有効な場合）
 if settings.LOG_TO_FILE:
@@ -33,6 +35,9 @@ async def lifespan(app: FastAPI):
         await db.init()
         app_logger.info("Database initialized successfully")
         
+        # JWKSの取得（取得できない場合はローカルの公開鍵で検証する）
+        await jwks_client.initialize()
+        
         # RabbitMQ接続の初期化
         await rabbitmq_client.initialize()
         app_logger.info("RabbitMQ connection initialized")
@@ -96,6 +101,7 @@ async def lifespan(app: FastAPI):
     # 終了時の処理
     app_logger.info("Shutting down application")
     await rabbitmq_client.close()
+    await jwks_client.close()
 
 
 # FastAPIアプリケーションの作成
@@ -207,6 +213,17 @@ async def root():
 async def health_check():
     return {"status": "healthy"}
 
+
+@app.get("/metrics")
+async def metrics():
+    return {
+        "database_pool": pool_stats(),
+        "database_replicas": replica_router.stats(),
+        "rabbitmq_consumer": rabbitmq_client.stats(),
+        "rabbitmq_publisher": publisher.stats(),
+        "jwks": jwks_client.stats(),
+    }
+
 if __name__ == "__main__":
     import uvicorn
     
@@ -0,0 +1,40 @@
+from typing import Any, Dict, Optional
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+
+
+class ProcessedMessageCache:
+    """
+    処理済みメッセージIDのローカルキャッシュ
+
+    - 再配信されたメッセージをデータベースに触れる前に破棄するために使う
+    - 容量・有効期限の管理はTTLCacheに任せる
+    - 確実な重複排除はuser_event_versionsテーブル側で行い、ここは高速化のためのもの
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def contains(self, message_id: Optional[str]) -> bool:
+        """処理済みのメッセージIDかを判定"""
+        if not message_id:
+            return False
+        return self._cache.get(message_id) is not None
+
+    def add(self, message_id: Optional[str]):
+        """コミット済みのメッセージIDを記録"""
+        if not message_id:
+            return
+        self._cache.set(message_id, True)
+
+    def stats(self) -> Dict[str, Any]:
+        """キャッシュの利用状況を返す"""
+        return self._cache.stats()
+
+
+# シングルトンインスタンス
+processed_messages = ProcessedMessageCache(
+    maxsize=settings.USER_SYNC_DEDUP_CACHE_SIZE,
+    ttl=settings.USER_SYNC_DEDUP_TTL,
+)
@@ -0,0 +1,25 @@
+import zlib
+from typing import Any, Optional
+
+from app.core.config import settings
+
+
+def partition_for(user_id: Any, count: Optional[int] = None) -> int:
+    """
+    ユーザーIDからパーティション番号を求める（発行側・受信側で同じ計算を行う）
+    - countを省略した場合はUSER_SYNC_PARTITIONSで分割する
+    """
+    return zlib.crc32(str(user_id).lower().encode()) % (count or settings.USER_SYNC_PARTITIONS)
+
+
+def routing_key_for(user_id: Optional[Any], routing_key: Optional[str] = None) -> str:
+    """
+    ユーザーイベントのルーティングキーを求める
+    - パーティション数が2以上の場合は「<ルーティングキー>.<パーティション番号>」とし、
+      同じユーザーのイベントが常に同じキューに届くようにする
+    - ユーザーIDがない場合やパーティション分割しない場合は元のルーティングキーを使う
+    """
+    routing_key = routing_key or settings.USER_SYNC_ROUTING_KEY
+    if settings.USER_SYNC_PARTITIONS <= 1 or not user_id:
+        return routing_key
+    return f"{routing_key}.{partition_for(user_id)}"
@@ -0,0 +1,185 @@
+import asyncio
+import itertools
+import json
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import aio_pika
+from aio_pika import ExchangeType
+from aio_pika.abc import AbstractChannel, AbstractConnection, AbstractExchange
+
+from app.core.config import settings
+from app.core.logging import app_logger
+from app.messaging.partitioning import partition_for
+
+
+# publish_manyに渡すメッセージ: (ルーティングキー, 本文, メッセージID)
+OutgoingMessage = Tuple[str, Dict[str, Any], Optional[str]]
+
+
+class ConfirmingPublisher:
+    """
+    publisher confirmsを有効にしたチャネルプールでメッセージを発行するクラス
+
+    - 発行はブローカーが確認応答（ack）を返すまで完了とせず、nack・タイムアウト時は例外を送出する
+    - 複数のチャネルに振り分け、1つのチャネル上でも確認応答を待たずに続けて発行する
+    - ユーザーイベントはユーザーIDから求めたチャネルで発行し、同じユーザーのメッセージの順序を保つ
+    - 確認応答待ちのメッセージ数はRABBITMQ_PUBLISH_MAX_IN_FLIGHTまでに制限する
+    """
+
+    def __init__(self):
+        self.channels: List[Tuple[AbstractChannel, AbstractExchange]] = []
+        self.logger = app_logger
+        self.is_initialized = False
+        self._cycle = None
+        self._window: Optional[asyncio.Semaphore] = None
+        self.in_flight = 0
+        self.published = 0
+        self.failed = 0
+
+    async def initialize(self, connection: AbstractConnection):
+        """接続上に発行用のチャネルを作成"""
+        if self.is_initialized:
+            return
+
+        for _ in range(settings.RABBITMQ_PUBLISH_CHANNELS):
+            channel = await connection.channel(publisher_confirms=True)
+            exchange = await channel.declare_exchange(
+                settings.USER_SYNC_EXCHANGE,
+                ExchangeType.TOPIC,
+                durable=True
+            )
+            self.channels.append((channel, exchange))
+
+        self._cycle = itertools.cycle(self.channels)
+        self._window = asyncio.Semaphore(settings.RABBITMQ_PUBLISH_MAX_IN_FLIGHT)
+        self.is_initialized = True
+        self.logger.info(
+            f"発行用チャネルを作成しました: channels={settings.RABBITMQ_PUBLISH_CHANNELS}, "
+            f"max_in_flight={settings.RABBITMQ_PUBLISH_MAX_IN_FLIGHT}"
+        )
+
+    async def close(self):
+        """発行用チャネルのクローズ"""
+        for channel, _ in self.channels:
+            if not channel.is_closed:
+                await channel.close()
+        self.channels = []
+        self._cycle = None
+        self.is_initialized = False
+
+    def _next_channel(self) -> Tuple[AbstractChannel, AbstractExchange]:
+        """チャネルを順に選択（接続の自動再接続中に閉じているチャネルは避ける）"""
+        for _ in range(len(self.channels)):
+            channel, exchange = next(self._cycle)
+            if not channel.is_closed:
+                return channel, exchange
+        raise ConnectionError("利用可能な発行用チャネルがありません")
+
+    def _channel_for(self, user_id: Optional[Any]) -> Tuple[AbstractChannel, AbstractExchange]:
+        """
+        ユーザーIDに対応するチャネルを選択する
+        - ユーザーIDがない場合と、対応するチャネルが再接続中で閉じている場合は順に選択する
+        """
+        if user_id:
+            channel, exchange = self.channels[partition_for(user_id, len(self.channels))]
+            if not channel.is_closed:
+                return channel, exchange
+        return self._next_channel()
+
+    def _user_id(self, body: Dict[str, Any]) -> Optional[Any]:
+        """ユーザーイベントの本文からユーザーIDを取り出す"""
+        user_data = body.get("user_data")
+        return user_data.get("id") if isinstance(user_data, dict) else None
+
+    def _build_message(self, body: Dict[str, Any], message_id: Optional[str]) -> aio_pika.Message:
+        return aio_pika.Message(
+            body=json.dumps(body, separators=(",", ":")).encode(),
+            content_type="application/json",
+            message_id=message_id,
+            delivery_mode=aio_pika.DeliveryMode.PERSISTENT
+        )
+
+    async def _send(self, message: aio_pika.Message, routing_key: str, exchange_name: Optional[str] = None, user_id: Optional[Any] = None):
+        if not self.is_initialized:
+            raise ConnectionError("発行用チャネルが初期化されていません")
+
+        async with self._window:
+            self.in_flight += 1
+            try:
+                channel, exchange = self._channel_for(user_id)
+                if exchange_name == "":
+                    exchange = channel.default_exchange
+                elif exchange_name is not None:
+                    exchange = await channel.get_exchange(exchange_name, ensure=False)
+                await exchange.publish(
+                    message,
+                    routing_key=routing_key,
+                    timeout=settings.RABBITMQ_PUBLISH_TIMEOUT
+                )
+                self.published += 1
+            except Exception:
+                self.failed += 1
+                raise
+            finally:
+                self.in_flight -= 1
+
+    async def publish(self, routing_key: str, body: Dict[str, Any], message_id: Optional[str] = None):
+        """
+        メッセージを1件発行し、ブローカーの確認応答を待つ
+
+        Raises:
+            Exception: 未初期化、nack、タイムアウトなどで発行できなかった場合
+        """
+        message = self._build_message(body, message_id)
+        await self._send(message, routing_key, user_id=self._user_id(body))
+
+    async def publish_raw(self, message: aio_pika.Message, routing_key: str, exchange_name: Optional[str] = None):
+        """
+        組み立て済みのメッセージを発行し、確認応答を待つ（再試行・デッドレターの転送に使う）
+        - exchange_nameを省略した場合はイベント用のexchange、空文字列の場合はデフォルトexchangeに発行する
+        """
+        await self._send(message, routing_key, exchange_name)
+
+    async def publish_many(self, messages: Sequence[OutgoingMessage]) -> List[Optional[Exception]]:
+        """
+        複数のメッセージを確認応答を待たずに続けて発行し、まとめて結果を返す
+        - 異なるユーザーのメッセージは並行して発行する
+        - 同じユーザーのメッセージは入力の順に1件ずつ発行し、失敗した場合は
+          順序が逆転しないよう残りも発行せずに同じ例外を結果とする
+
+        Returns:
+            List[Optional[Exception]]: 入力と同じ順序の結果（成功した場合はNone、失敗した場合は例外）
+        """
+        results: List[Optional[Exception]] = [None] * len(messages)
+
+        # ユーザーごとのメッセージ（入力内の位置）の並び
+        sequences: Dict[Any, List[int]] = {}
+        for index, (_, body, _) in enumerate(messages):
+            user_id = self._user_id(body)
+            sequences.setdefault(str(user_id) if user_id else ("message", index), []).append(index)
+
+        async def publish_sequence(indexes: List[int]):
+            for position, index in enumerate(indexes):
+                routing_key, body, message_id = messages[index]
+                try:
+                    await self.publish(routing_key, body, message_id)
+                except Exception as e:
+                    for rest in indexes[position:]:
+                        results[rest] = e
+                    return
+
+        await asyncio.gather(*(publish_sequence(indexes) for indexes in sequences.values()))
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        """発行状況を返す"""
+        return {
+            "channels": len(self.channels),
+            "in_flight": self.in_flight,
+            "published": self.published,
+            "failed": self.failed,
+        }
+
+
+# シングルトンインスタンス
+publisher = ConfirmingPublisher()
@@ -1,16 +1,23 @@
+import asyncio
 import json
 import logging
-from typing import Dict, Any, Optional, Callable
+import time
+from typing import Dict, Any, List, Optional, Callable, Sequence, Set, Tuple
 from uuid import UUID
 
 import aio_pika
 import uuid
 from aio_pika import ExchangeType, IncomingMessage
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import settings
 from app.core.logging import app_logger
+from app.crud.event_version import event_version
 from app.crud.user import user
 from app.db.session import AsyncSessionLocal
+from app.messaging.idempotency import processed_messages
+from app.messaging.partitioning import routing_key_for
+from app.messaging.publisher import OutgoingMessage, publisher
 
 class RabbitMQClient:
     """RabbitMQのクライアントクラス"""
@@ -19,9 +26,22 @@ class RabbitMQClient:
         self.connection = None
         self.channel = None
         self.exchange = None
-        self.queue = None
+        # 受信するキュー（パーティション分割時はパーティションごとに1つ）
+        self.queues = []
+        # 優先して受信するキュー（このレプリカが担当するパーティション）の名前
+        self.preferred_queues: Set[str] = set()
         self.logger = app_logger
         self.is_initialized = False
+        # バッチ処理用の受信バッファと処理タスク
+        self.batch_buffer: Optional[asyncio.Queue] = None
+        self.batch_task: Optional[asyncio.Task] = None
+        # 重複・古いバージョンとして破棄したメッセージ数
+        self.skipped_duplicates = 0
+        self.skipped_stale = 0
+        # 再試行・デッドレターキュー
+        self.dead_letter_queue = None
+        self.retried = 0
+        self.dead_lettered = 0
     
     async def initialize(self):
         """RabbitMQへの接続を初期化"""
@@ -45,17 +65,14 @@ class RabbitMQClient:
                 durable=True
             )
             
-            # キューの宣言
-            self.queue = await self.channel.declare_queue(
-                settings.USER_SYNC_QUEUE,
-                durable=True
-            )
+            # 担当するキューの宣言とexchangeへのバインド
+            await self._declare_queues()
             
-            # キューをexchangeにバインド
-            await self.queue.bind(
-                self.exchange,
-                routing_key=settings.USER_SYNC_ROUTING_KEY
-            )
+            # 再試行用の遅延キュー（TTL経過後に元のキューへ戻す）とデッドレターキューの宣言
+            await self._declare_retry_topology()
+            
+            # 発行用チャネルプールの作成（publisher confirms有効）
+            await publisher.initialize(self.connection)
             
             self.is_initialized = True
             self.logger.info("RabbitMQ接続が確立されました")
@@ -63,9 +80,97 @@ class RabbitMQClient:
             self.logger.error(f"RabbitMQ接続エラー: {str(e)}", exc_info=True)
             raise
     
+    def assigned_partitions(self) -> List[int]:
+        """このレプリカが優先して受信を担当するパーティション番号"""
+        return [
+            partition for partition in range(settings.USER_SYNC_PARTITIONS)
+            if partition % settings.USER_SYNC_CONSUMER_COUNT == settings.USER_SYNC_CONSUMER_INDEX
+        ]
+    
+    async def _declare_queues(self):
+        """
+        受信するキューを宣言してexchangeにバインドする
+        - パーティション分割しない場合は従来どおり単一のキューを使う
+        - パーティション分割時は「<キュー名>.<番号>」を「<ルーティングキー>.<番号>」にバインドする。
+          x-single-active-consumerにより複数のレプリカが同じパーティションを購読しても
+          配信先は常に1つとなり、同じユーザーのイベントの順序が保たれる
+        - 各レプリカは全パーティションのキューを購読する。担当のレプリカが停止した場合は
+          ブローカーが待機中の購読者（他のレプリカ）に配信先を切り替える
+        """
+        if settings.USER_SYNC_PARTITIONS <= 1:
+            queue = await self.channel.declare_queue(settings.USER_SYNC_QUEUE, durable=True)
+            await queue.bind(self.exchange, routing_key=settings.USER_SYNC_ROUTING_KEY)
+            self.queues = [queue]
+            return
+        
+        self.queues = []
+        self.preferred_queues = set()
+        assigned = set(self.assigned_partitions())
+        for partition in range(settings.USER_SYNC_PARTITIONS):
+            queue = await self.channel.declare_queue(
+                f"{settings.USER_SYNC_QUEUE}.{partition}",
+                durable=True,
+                arguments={"x-single-active-consumer": True}
+            )
+            await queue.bind(self.exchange, routing_key=f"{settings.USER_SYNC_ROUTING_KEY}.{partition}")
+            self.queues.append(queue)
+            if partition in assigned:
+                self.preferred_queues.add(queue.name)
+    
+    def _retry_delays(self) -> List[float]:
+        """再試行回数ごとの待機時間（秒）"""
+        return [
+            min(settings.USER_SYNC_RETRY_BASE_DELAY * (2 ** i), settings.USER_SYNC_RETRY_MAX_DELAY)
+            for i in range(max(settings.USER_SYNC_MAX_ATTEMPTS - 1, 0))
+        ]
+    
+    def _retry_delay_header(self, delay: float) -> str:
+        return f"{int(delay * 1000)}ms"
+    
+    async def _declare_retry_topology(self):
+        """
+        再試行用の遅延キューとデッドレターキューを宣言する
+        - 遅延キューはheaders exchangeにretry-delayヘッダーでバインドし、消費者は付けない
+        - メッセージTTLの経過後はイベント用exchangeに元のルーティングキーのまま戻るため、
+          パーティション分割時も元のパーティションのキューに届く
+        - 待機時間ごとにキューを分けることで、先頭のメッセージが後続の期限切れを塞がないようにする
+        - キュー名は再試行用exchangeの名前から作る（以前の直接発行方式の遅延キューとは引数が異なるため名前を分ける）
+        """
+        retry_exchange = await self.channel.declare_exchange(
+            settings.USER_SYNC_RETRY_EXCHANGE,
+            ExchangeType.HEADERS,
+            durable=True
+        )
+        
+        for delay in sorted(set(self._retry_delays())):
+            delay_header = self._retry_delay_header(delay)
+            queue = await self.channel.declare_queue(
+                f"{settings.USER_SYNC_RETRY_EXCHANGE}.{delay_header}",
+                durable=True,
+                arguments={
+                    "x-message-ttl": int(delay * 1000),
+                    "x-dead-letter-exchange": settings.USER_SYNC_EXCHANGE,
+                }
+            )
+            # x-で始まるヘッダーは照合に使われないためretry-delayとする
+            await queue.bind(retry_exchange, arguments={"x-match": "all", "retry-delay": delay_header})
+        
+        self.dead_letter_queue = await self.channel.declare_queue(
+            settings.USER_SYNC_DEAD_LETTER_QUEUE,
+            durable=True
+        )
+    
     async def close(self):
         """接続のクローズ"""
+        if self.batch_task is not None:
+            self.batch_task.cancel()
+            try:
+                await self.batch_task
+            except asyncio.CancelledError:
+                pass
+            self.batch_task = None
         if self.connection and not self.connection.is_closed:
+            await publisher.close()
             await self.connection.close()
             self.is_initialized = False
             self.logger.info("RabbitMQ接続がクローズされました")
@@ -75,112 +180,284 @@ class RabbitMQClient:
         if not self.is_initialized:
             await self.initialize()
         
+        # 未ACKのメッセージ数を制限する（バッチサイズ以上にしないとバッチが埋まらない）
+        await self.channel.set_qos(prefetch_count=settings.USER_SYNC_PREFETCH_COUNT)
+        
         # メッセージハンドラの設定
-        await self.queue.consume(self._process_message)
-        self.logger.info(f"キュー '{settings.USER_SYNC_QUEUE}' からのメッセージ受信を開始しました")
+        if settings.USER_SYNC_BATCH_ENABLED:
+            self.batch_buffer = asyncio.Queue()
+            self.batch_task = asyncio.create_task(self._run_batches())
+            callback = self.batch_buffer.put
+        else:
+            callback = self._process_message
+        for queue in self.queues:
+            # 担当パーティションのキューでは優先度を上げ、購読者の優先度を考慮するブローカーでは
+            # 担当のレプリカが稼働している間はそちらが配信先に選ばれるようにする
+            priority = 10 if queue.name in self.preferred_queues else 0
+            await queue.consume(callback, arguments={"x-priority": priority})
+        self.logger.info(
+            f"キュー {[queue.name for queue in self.queues]} からのメッセージ受信を開始しました "
+            f"(prefetch={settings.USER_SYNC_PREFETCH_COUNT}, batch={settings.USER_SYNC_BATCH_ENABLED})"
+        )
     
-    async def _process_message(self, message: IncomingMessage):
+    def _decode_message(self, message: IncomingMessage) -> Tuple[Optional[str], Dict[str, Any], Optional[int]]:
+        """メッセージ本文からイベントタイプ、ユーザーデータ、バージョンを取り出す"""
+        message_body = json.loads(message.body.decode())
+        return message_body.get("event_type"), message_body.get("user_data", {}), message_body.get("version")
+    
+    def _is_processed(self, message: IncomingMessage) -> bool:
+        """処理済みのメッセージID（再配信）であればTrue"""
+        if processed_messages.contains(message.message_id):
+            self.skipped_duplicates += 1
+            self.logger.debug(f"処理済みのメッセージを破棄します: message_id={message.message_id}")
+            return True
+        return False
+    
+    async def _claim_version(self, db: AsyncSession, message: IncomingMessage, user_data: Dict[str, Any], version: Optional[int]) -> bool:
         """
-        受信したメッセージを処理する
+        イベントのバージョンを反映済みとして記録する
+        - 反映済みと同じか古いバージョンの場合はFalse（イベントを反映しない）
+        - バージョンを持たないイベントは常に反映する
         """
-        async with message.process():
-            try:
-                # メッセージのデコード
-                message_body = json.loads(message.body.decode())
-                event_type = message_body.get("event_type")
-                user_data = message_body.get("user_data", {})
-                
-                self.logger.info(f"メッセージを受信しました: {event_type}")
-                
-                # イベントタイプに応じた処理
-                if event_type == "user.created":
-                    await self._handle_user_created(user_data)
-                elif event_type == "user.updated":
-                    await self._handle_user_updated(user_data)
-                elif event_type == "user.deleted":
-                    await self._handle_user_deleted(user_data)
-                else:
-                    self.logger.warning(f"未知のイベントタイプ: {event_type}")
-            except json.JSONDecodeError:
-                self.logger.error("JSONデコードエラー", exc_info=True)
-            except Exception as e:
-                self.logger.error(f"メッセージ処理エラー: {str(e)}", exc_info=True)
+        if version is None or not user_data.get("id"):
+            return True
+        
+        if await event_version.claim(db, UUID(user_data["id"]), int(version), message.message_id):
+            return True
+        
+        self.skipped_stale += 1
+        self.logger.info(f"重複または古いイベントを破棄します: user_id={user_data['id']}, version={version}")
+        return False
     
-    async def _handle_user_created(self, user_data: Dict[str, Any]):
-        """ユーザー作成イベントの処理"""
+    async def _apply_event(self, db: AsyncSession, event_type: Optional[str], user_data: Dict[str, Any]):
+        """イベントタイプに応じた処理をセッションに反映する（コミットは呼び出し元で行う）"""
+        if event_type == "user.created":
+            await self._handle_user_created(db, user_data)
+        elif event_type == "user.updated":
+            await self._handle_user_updated(db, user_data)
+        elif event_type == "user.deleted":
+            await self._handle_user_deleted(db, user_data)
+        else:
+            self.logger.warning(f"未知のイベントタイプ: {event_type}")
+    
+    async def _retry_or_dead_letter(self, message: IncomingMessage, error: Exception, permanent: bool = False):
+        """
+        処理に失敗したメッセージを遅延キューまたはデッドレターキューに転送してACKする
+        - 試行回数はx-attemptsヘッダーで引き継ぐ
+        - 再試行しても成功しないもの（デコードエラー）と、試行回数の上限に達したものはデッドレターキューへ
+        """
+        headers = dict(message.headers or {})
+        attempts = int(headers.get("x-attempts", 0)) + 1
+        headers["x-attempts"] = attempts
+        headers["x-last-error"] = str(error)[:500]
+        
+        retry_delays = self._retry_delays()
+        dead_letter = permanent or attempts > len(retry_delays)
+        if dead_letter:
+            # 再投入時に元のパーティションへ戻せるようルーティングキーを残す
+            headers["x-original-routing-key"] = message.routing_key
+        else:
+            headers["retry-delay"] = self._retry_delay_header(retry_delays[attempts - 1])
+        
+        retry_message = aio_pika.Message(
+            body=message.body,
+            content_type=message.content_type,
+            message_id=message.message_id,
+            headers=headers,
+            delivery_mode=aio_pika.DeliveryMode.PERSISTENT
+        )
         try:
-            # 必要なデータの取得
-            user_id = UUID(user_data.get("id"))
-            username = user_data.get("username")
-            is_admin = user_data.get("is_admin", False)
-            is_active = user_data.get("is_active", True)
-            
-            self.logger.info(f"ユーザー作成イベント処理: ID={user_id}, ユーザー名={username}")
-            
-            # データベースセッションの作成
-            async with AsyncSessionLocal() as db:
-                # ユーザーの同期
-                synced_user = await user.sync_user(
-                    db=db,
-                    user_id=user_id,
-                    username=username,
-                    is_admin=is_admin,
-                    is_active=is_active
+            if dead_letter:
+                await publisher.publish_raw(retry_message, settings.USER_SYNC_DEAD_LETTER_QUEUE, exchange_name="")
+            else:
+                # 遅延キューのTTL経過後に元のキューへ戻るよう、元のルーティングキーのまま発行する
+                await publisher.publish_raw(
+                    retry_message, message.routing_key, exchange_name=settings.USER_SYNC_RETRY_EXCHANGE
                 )
-                await db.commit()
-                
-                self.logger.info(f"ユーザー同期成功: ID={synced_user.id}, ユーザー名={username}")
         except Exception as e:
-            self.logger.error(f"ユーザー作成イベント処理エラー: {str(e)}", exc_info=True)
+            # 転送できない場合はメッセージを失わないようにキューへ戻す
+            self.logger.error(f"失敗したメッセージの転送エラー: {str(e)}", exc_info=True)
+            await message.nack(requeue=True)
+            return
+        
+        await message.ack()
+        if dead_letter:
+            self.dead_lettered += 1
+            self.logger.error(f"メッセージをデッドレターキューに移動しました: message_id={message.message_id}, 試行回数={attempts}")
+        else:
+            self.retried += 1
+            self.logger.warning(f"メッセージを再試行します: message_id={message.message_id}, 試行回数={attempts}, 待機時間={headers['retry-delay']}")
     
-    async def _handle_user_updated(self, user_data: Dict[str, Any]):
-        """ユーザー更新イベントの処理"""
+    async def _process_message(self, message: IncomingMessage):
+        """
+        受信したメッセージを処理する
+        - 反映に成功した場合のみACKし、失敗した場合は遅延キュー経由で再試行する
+        """
+        if self._is_processed(message):
+            await message.ack()
+            return
+        
+        try:
+            # メッセージのデコード
+            event_type, user_data, version = self._decode_message(message)
+        except (json.JSONDecodeError, UnicodeDecodeError) as e:
+            self.logger.error("JSONデコードエラー", exc_info=True)
+            await self._retry_or_dead_letter(message, e, permanent=True)
+            return
+        
+        self.logger.info(f"メッセージを受信しました: {event_type}")
+        
         try:
-            # 必要なデータの取得
-            user_id = UUID(user_data.get("id"))
-            username = user_data.get("username")
-            is_admin = user_data.get("is_admin", False)
-            is_active = user_data.get("is_active", True)
-            
-            self.logger.info(f"ユーザー更新イベント処理: ID={user_id}, ユーザー名={username}")
-            
             # データベースセッションの作成
             async with AsyncSessionLocal() as db:
-                # ユーザーの同期
-                synced_user = await user.sync_user(
-                    db=db,
-                    user_id=user_id,
-                    username=username,
-                    is_admin=is_admin,
-                    is_active=is_active
-                )
+                if await self._claim_version(db, message, user_data, version):
+                    await self._apply_event(db, event_type, user_data)
                 await db.commit()
-                
-                self.logger.info(f"ユーザー同期成功: ID={synced_user.id}, フルネーム={synced_user.fullname}")
         except Exception as e:
-            self.logger.error(f"ユーザー更新イベント処理エラー: {str(e)}", exc_info=True)
+            self.logger.error(f"メッセージ処理エラー: {str(e)}", exc_info=True)
+            await self._retry_or_dead_letter(message, e)
+            return
+        
+        processed_messages.add(message.message_id)
+        await message.ack()
     
-    async def _handle_user_deleted(self, user_data: Dict[str, Any]):
-        """ユーザー削除イベントの処理"""
-        try:
-            # 必要なデータの取得
-            user_id = UUID(user_data.get("id"))
+    async def _run_batches(self):
+        """受信バッファからサイズまたは時間で区切ったバッチを取り出して処理し続ける"""
+        while True:
+            batch = [await self.batch_buffer.get()]
+            deadline = time.monotonic() + settings.USER_SYNC_BATCH_WINDOW
             
-            self.logger.info(f"ユーザー削除イベント処理: ID={user_id}")
+            while len(batch) < settings.USER_SYNC_BATCH_SIZE:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.batch_buffer.get(), timeout=remaining))
+                except asyncio.TimeoutError:
+                    break
             
-            # データベースセッションの作成
+            try:
+                await self._process_batch(batch)
+            except Exception as e:
+                # ACKされなかったメッセージはチャネル切断時に再配信される
+                self.logger.error(f"メッセージバッチ処理エラー: {str(e)}", exc_info=True)
+    
+    async def _process_batch(self, messages: List[IncomingMessage]):
+        """
+        複数のメッセージを1トランザクションで反映し、コミット後にまとめてACKする
+        - メッセージごとにセーブポイントを使い、処理に失敗したメッセージのみを取り消す
+        - 作成・更新イベントはバッチの最後にまとめて1回のUPSERT（sync_users）で反映する
+        - UPSERTまたはコミットに失敗した場合は1件ずつの処理に切り替える
+        """
+        applied: List[IncomingMessage] = []
+        # (メッセージ, エラー, 再試行しても成功しないか)
+        failed: List[Tuple[IncomingMessage, Exception, bool]] = []
+        skipped: List[IncomingMessage] = []
+        # user_idごとの同期内容（同じユーザーの作成・更新は最後のものだけを反映する）
+        upserts: Dict[UUID, Dict[str, Any]] = {}
+        
+        # 処理済みのメッセージ（再配信）はデータベースに触れずにACKする
+        pending: List[IncomingMessage] = []
+        for message in messages:
+            (skipped if self._is_processed(message) else pending).append(message)
+        
+        try:
             async with AsyncSessionLocal() as db:
-                # ユーザーの取得
-                db_user = await user.get_by_user_id(db, user_id)
-                if db_user:
-                    # ユーザーの削除
-                    await user.delete(db, db_user)
-                    await db.commit()
-                    self.logger.info(f"ユーザー削除成功: ID={user_id}")
-                else:
-                    self.logger.warning(f"ユーザー削除失敗: ユーザーID '{user_id}' が存在しません")
+                for message in pending:
+                    try:
+                        event_type, user_data, version = self._decode_message(message)
+                    except (json.JSONDecodeError, UnicodeDecodeError) as e:
+                        self.logger.error("JSONデコードエラー", exc_info=True)
+                        failed.append((message, e, True))
+                        continue
+                    
+                    try:
+                        async with db.begin_nested():
+                            if await self._claim_version(db, message, user_data, version):
+                                if event_type in ("user.created", "user.updated"):
+                                    row = self._sync_row(user_data)
+                                    upserts[row["user_id"]] = row
+                                else:
+                                    if event_type == "user.deleted":
+                                        # 削除より前の作成・更新は反映しない
+                                        upserts.pop(UUID(user_data.get("id")), None)
+                                    await self._apply_event(db, event_type, user_data)
+                        applied.append(message)
+                    except Exception as e:
+                        self.logger.error(f"メッセージ処理エラー: {event_type}, {str(e)}", exc_info=True)
+                        failed.append((message, e, False))
+                
+                if upserts:
+                    synced_users = await user.sync_users(db, list(upserts.values()))
+                    self.logger.info(f"ユーザー同期成功: {len(synced_users)}件")
+                await db.commit()
         except Exception as e:
-            self.logger.error(f"ユーザー削除イベント処理エラー: {str(e)}", exc_info=True)
+            self.logger.error(f"メッセージバッチのコミットエラー、1件ずつ処理します: {str(e)}", exc_info=True)
+            for message in pending:
+                await self._process_message(message)
+            for message in skipped:
+                await message.ack()
+            return
+        
+        # 処理できなかったメッセージは遅延キュー経由で再試行する
+        for message, error, permanent in failed:
+            await self._retry_or_dead_letter(message, error, permanent)
+        for message in applied:
+            processed_messages.add(message.message_id)
+            await message.ack()
+        for message in skipped:
+            await message.ack()
+        
+        self.logger.info(
+            f"メッセージバッチを処理しました: 成功={len(applied)}件, 失敗={len(failed)}件, 重複={len(skipped)}件"
+        )
+    
+    def _sync_row(self, user_data: Dict[str, Any]) -> Dict[str, Any]:
+        """作成・更新イベントのユーザーデータを同期内容（sync_user / sync_usersの引数）に変換する"""
+        return {
+            "user_id": UUID(user_data.get("id")),
+            "username": user_data.get("username"),
+            "is_admin": user_data.get("is_admin", False),
+            "is_active": user_data.get("is_active", True),
+        }
+    
+    async def _handle_user_created(self, db: AsyncSession, user_data: Dict[str, Any]):
+        """ユーザー作成イベントの処理"""
+        row = self._sync_row(user_data)
+        
+        self.logger.info(f"ユーザー作成イベント処理: ID={row['user_id']}, ユーザー名={row['username']}")
+        
+        # ユーザーの同期
+        synced_user = await user.sync_user(db=db, **row)
+        
+        self.logger.info(f"ユーザー同期成功: ID={synced_user.id}, ユーザー名={row['username']}")
+    
+    async def _handle_user_updated(self, db: AsyncSession, user_data: Dict[str, Any]):
+        """ユーザー更新イベントの処理"""
+        row = self._sync_row(user_data)
+        
+        self.logger.info(f"ユーザー更新イベント処理: ID={row['user_id']}, ユーザー名={row['username']}")
+        
+        # ユーザーの同期
+        synced_user = await user.sync_user(db=db, **row)
+        
+        self.logger.info(f"ユーザー同期成功: ID={synced_user.id}, フルネーム={synced_user.fullname}")
+    
+    async def _handle_user_deleted(self, db: AsyncSession, user_data: Dict[str, Any]):
+        """ユーザー削除イベントの処理"""
+        # 必要なデータの取得
+        user_id = UUID(user_data.get("id"))
+        
+        self.logger.info(f"ユーザー削除イベント処理: ID={user_id}")
+        
+        # ユーザーの取得
+        db_user = await user.get_by_user_id(db, user_id)
+        if db_user:
+            # ユーザーの削除
+            await user.delete(db, db_user)
+            self.logger.info(f"ユーザー削除成功: ID={user_id}")
+        else:
+            self.logger.warning(f"ユーザー削除失敗: ユーザーID '{user_id}' が存在しません")
             
     async def publish_user_created_event(self, user_data: Dict[str, Any]):
         """ユーザー作成イベントを発行する"""
@@ -201,21 +478,11 @@ class RabbitMQClient:
             
             # ログにメッセージ内容を出力
             self.logger.debug(f"送信メッセージ: {json.dumps(message_body)}")
-            self.logger.debug(f"ルーティングキー: {settings.USER_SYNC_ROUTING_KEY}")
-            
-            # メッセージの作成と送信
-            message = aio_pika.Message(
-                body=json.dumps(message_body).encode(),
-                content_type="application/json",
-                message_id=message_id,
-                delivery_mode=aio_pika.DeliveryMode.PERSISTENT
-            )
+            routing_key = routing_key_for(user_data.get("id"))
+            self.logger.debug(f"ルーティングキー: {routing_key}")
             
-            # メッセージの送信
-            await self.exchange.publish(
-                message,
-                routing_key=settings.USER_SYNC_ROUTING_KEY
-            )
+            # メッセージの送信（ブローカーの確認応答を待つ）
+            await publisher.publish(routing_key, message_body, message_id)
             
             self.logger.info(f"ユーザー作成イベントを発行しました: user_id={user_data.get('id')}, message_id={message_id}")
             return True
@@ -227,6 +494,129 @@ class RabbitMQClient:
             elif self.connection is None or self.connection.is_closed:
                 self.logger.error("エラー詳細: RabbitMQ接続が閉じられているか存在しません")
             return False
+    
+    async def publish_user_event(self, event_type: str, user_data: Dict[str, Any]) -> bool:
+        """
+        User Serviceでのプロファイル変更イベント（user.updated / user.deleted）を発行する
+
+        auth-serviceのプロファイルキャッシュ無効化に使う。自分自身の同期キューに届かないよう
+        USER_PROFILE_ROUTING_KEYで発行する。
+        
+        Returns:
+            bool: 発行に成功した場合はTrue、失敗した場合はFalse
+        """
+        try:
+            if not self.is_initialized:
+                await self.initialize()
+
+            message_body = {
+                "event_type": event_type,
+                "user_data": {key: str(value) if isinstance(value, UUID) else value for key, value in user_data.items()}
+            }
+            routing_key = routing_key_for(message_body["user_data"].get("user_id"), settings.USER_PROFILE_ROUTING_KEY)
+            await publisher.publish(routing_key, message_body, str(uuid.uuid4()))
+
+            self.logger.info(f"ユーザーイベントを発行しました: {event_type}, ユーザーID={user_data.get('id')}")
+            return True
+        except Exception as e:
+            # 発行できなかった場合もauth-service側のキャッシュはTTLで失効する
+            self.logger.error(f"ユーザーイベント発行エラー: {str(e)}", exc_info=True)
+            return False
+    
+    async def publish_many(self, messages: Sequence[OutgoingMessage]) -> List[Optional[Exception]]:
+        """
+        複数のJSONメッセージを続けて発行し、確認応答をまとめて待つ
+        
+        Returns:
+            List[Optional[Exception]]: 入力と同じ順序の結果（成功した場合はNone、失敗した場合は例外）
+        """
+        if not self.is_initialized:
+            await self.initialize()
+        
+        return await publisher.publish_many(messages)
+    
+    def _describe_dead_letter(self, message: IncomingMessage) -> Dict[str, Any]:
+        headers = message.headers or {}
+        try:
+            body = json.loads(message.body.decode())
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            body = message.body.decode(errors="replace")
+        return {
+            "message_id": message.message_id,
+            "attempts": headers.get("x-attempts"),
+            "last_error": headers.get("x-last-error"),
+            "body": body,
+        }
+    
+    async def inspect_dead_letters(self, limit: int) -> List[Dict[str, Any]]:
+        """
+        デッドレターキューの先頭からメッセージを参照する
+        - 取得したメッセージは参照後にすべてキューへ戻す（削除しない）
+        """
+        if not self.is_initialized:
+            await self.initialize()
+        
+        messages: List[IncomingMessage] = []
+        try:
+            while len(messages) < limit:
+                message = await self.dead_letter_queue.get(no_ack=False, fail=False)
+                if message is None:
+                    break
+                messages.append(message)
+            return [self._describe_dead_letter(message) for message in messages]
+        finally:
+            for message in messages:
+                await message.nack(requeue=True)
+    
+    async def replay_dead_letters(self, limit: int) -> int:
+        """
+        デッドレターキューのメッセージを元のルーティングキューに再投入する（試行回数はリセットする）
+        
+        Returns:
+            int: 再投入したメッセージ数
+        """
+        if not self.is_initialized:
+            await self.initialize()
+        
+        replayed = 0
+        while replayed < limit:
+            message = await self.dead_letter_queue.get(no_ack=False, fail=False)
+            if message is None:
+                break
+            
+            headers = {
+                key: value for key, value in (message.headers or {}).items()
+                if key not in ("x-attempts", "x-last-error", "x-original-routing-key", "retry-delay")
+            }
+            routing_key = (message.headers or {}).get("x-original-routing-key") or settings.USER_SYNC_ROUTING_KEY
+            if isinstance(routing_key, bytes):
+                routing_key = routing_key.decode()
+            try:
+                await publisher.publish_raw(aio_pika.Message(
+                    body=message.body,
+                    content_type=message.content_type,
+                    message_id=message.message_id,
+                    headers=headers,
+                    delivery_mode=aio_pika.DeliveryMode.PERSISTENT
+                ), routing_key)
+            except Exception:
+                await message.nack(requeue=True)
+                raise
+            await message.ack()
+            replayed += 1
+        
+        self.logger.info(f"デッドレターキューのメッセージを再投入しました: {replayed}件")
+        return replayed
+    
+    def stats(self) -> Dict[str, Any]:
+        """メッセージ受信の重複排除・再試行の状況を返す"""
+        return {
+            "skipped_duplicates": self.skipped_duplicates,
+            "skipped_stale": self.skipped_stale,
+            "retried": self.retried,
+            "dead_lettered": self.dead_lettered,
+            "processed_message_cache": processed_messages.stats(),
+        }
 
 
 # シングルトンインスタンス
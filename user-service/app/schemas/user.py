@@ -89,4 +89,15 @@ class UserSearchParams(BaseModel):
     username: Optional[str] = None
     fullname: Optional[str] = None
     is_active: Optional[bool] = None
-    is_admin: Optional[bool] = None
\ No newline at end of file
+    is_admin: Optional[bool] = None
+    limit: Optional[int] = None  # 省略時はUSER_SEARCH_DEFAULT_LIMIT
+    offset: int = 0
+
+
+# 検証済みトークンのクレームから組み立てる軽量な認証主体（DBアクセスなし）
+class TokenPrincipal(BaseModel):
+    id: UUID  # User ServiceのユーザーID（トークンのuser_idクレーム）
+    user_id: UUID  # Auth ServiceのユーザーID（トークンのsubクレーム）
+    username: Optional[str] = None
+    is_admin: bool = False
+    is_active: bool = True
\ No newline at end of file
@@ -30,6 +30,16 @@ if config.config_file_name is not None:
 # メタデータオブジェクトの設定
 target_metadata = Base.metadata
 
+# ORMモデルを持たず、マイグレーションを手書きで管理するテーブル
+# （autogenerateで削除対象として検出されないよう比較から除外する）
+UNMANAGED_TABLES = {"users", "user_event_versions"}
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    """autogenerateの比較対象を絞り込む"""
+    table_name = name if type_ == "table" else getattr(getattr(object, "table", None), "name", None)
+    return table_name not in UNMANAGED_TABLES
+
 # その他の設定
 def run_migrations_offline() -> None:
     """オフラインマイグレーションの実行"""
@@ -39,6 +49,7 @@ def run_migrations_offline() -> None:
         target_metadata=target_metadata,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
+        include_object=include_object,
     )
 
     with context.begin_transaction():
@@ -49,6 +60,7 @@ def do_run_migrations(connection: Connection) -> None:
         connection=connection,
         target_metadata=target_metadata,
         compare_type=True,
+        include_object=include_object,
     )
 
     with context.begin_transaction():
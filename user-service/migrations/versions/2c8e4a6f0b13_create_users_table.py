@@ -0,0 +1,43 @@
+"""create users table
+
+Revision ID: 2c8e4a6f0b13
+Revises: 
+Create Date: 2026-10-18 10:15:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2c8e4a6f0b13'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # usersテーブルはこれまでマイグレーション外で作成されていたため、既存の環境では何もしない
+    op.create_table('users',
+    sa.Column('id', sa.UUID(), server_default=sa.text('gen_random_uuid()'), nullable=False),
+    sa.Column('username', sa.String(), nullable=False),
+    sa.Column('fullname', sa.String(), nullable=True),
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('is_active', sa.Boolean(), server_default=sa.text('true'), nullable=False),
+    sa.Column('is_admin', sa.Boolean(), server_default=sa.text('false'), nullable=False),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    if_not_exists=True,
+    )
+    op.create_index(op.f('ix_users_username'), 'users', ['username'], unique=True, if_not_exists=True)
+    # auth-serviceからの同期（ON CONFLICT (user_id)）に使う一意索引
+    op.create_index(op.f('ix_users_user_id'), 'users', ['user_id'], unique=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_users_user_id'), table_name='users')
+    op.drop_index(op.f('ix_users_username'), table_name='users')
+    op.drop_table('users')
@@ -0,0 +1,49 @@
+"""add trigram search indexes
+
+Revision ID: 4e8a2c6b1d90
+Revises: 2c8e4a6f0b13
+Create Date: 2026-10-18 10:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4e8a2c6b1d90'
+down_revision: Union[str, None] = '2c8e4a6f0b13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # ユーザー名・フルネームの部分一致検索（ILIKE '%term%'）をインデックスで処理するためのトライグラム索引
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    # 既存テーブルへの書き込みをロックしないようCONCURRENTLYで作成する（トランザクション外で実行）
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_users_username_trgm',
+            'users',
+            ['username'],
+            postgresql_using='gin',
+            postgresql_ops={'username': 'gin_trgm_ops'},
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            'ix_users_fullname_trgm',
+            'users',
+            ['fullname'],
+            postgresql_using='gin',
+            postgresql_ops={'fullname': 'gin_trgm_ops'},
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_users_fullname_trgm', table_name='users', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_users_username_trgm', table_name='users', postgresql_concurrently=True, if_exists=True)
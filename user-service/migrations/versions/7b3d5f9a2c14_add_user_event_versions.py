@@ -0,0 +1,34 @@
+"""add user_event_versions
+
+Revision ID: 7b3d5f9a2c14
+Revises: 4e8a2c6b1d90
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7b3d5f9a2c14'
+down_revision: Union[str, None] = '4e8a2c6b1d90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # ユーザーごとに反映済みのイベントバージョン（重複・順序の逆転したイベントの破棄に使う）
+    op.create_table(
+        'user_event_versions',
+        sa.Column('user_id', postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column('version', sa.BigInteger(), nullable=False),
+        sa.Column('message_id', sa.String(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('user_event_versions')
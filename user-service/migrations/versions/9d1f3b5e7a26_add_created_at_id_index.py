@@ -0,0 +1,34 @@
+"""add created_at id index
+
+Revision ID: 9d1f3b5e7a26
+Revises: 7b3d5f9a2c14
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d1f3b5e7a26'
+down_revision: Union[str, None] = '7b3d5f9a2c14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # ユーザー一覧のキーセットページネーション用（既存テーブルへの書き込みをロックしないようCONCURRENTLYで作成する）
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_users_created_at_id',
+            'users',
+            ['created_at', 'id'],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_users_created_at_id', table_name='users', postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,67 @@
+import json
+import os
+import types
+from typing import Any, Dict, Optional, Union
+from unittest import mock
+
+import pytest
+
+# app.core.configの必須項目（単体テストではデータベース・RabbitMQに接続しない）
+os.environ.setdefault("POSTGRES_USER", "test")
+os.environ.setdefault("POSTGRES_PASSWORD", "test")
+os.environ.setdefault("POSTGRES_HOST", "localhost")
+os.environ.setdefault("POSTGRES_PORT", "5432")
+os.environ.setdefault("POSTGRES_DB", "user_test")
+
+
+class FakeClock:
+    """time.time / time.monotonic の代わりに使う手動で進める時計"""
+
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock() -> FakeClock:
+    return FakeClock()
+
+
+@pytest.fixture(autouse=True)
+def fake_time(request, monkeypatch, clock):
+    """
+    fake_timeマーカーを付けたテストで、対象モジュールが参照するtimeを手動の時計に差し替える
+
+    例: pytestmark = pytest.mark.fake_time(cache, "monotonic")
+    """
+    marker = request.node.get_closest_marker("fake_time")
+    if marker is None:
+        return
+    module, attribute = marker.args
+    monkeypatch.setattr(module, "time", types.SimpleNamespace(**{attribute: clock}))
+
+
+@pytest.fixture
+def make_message():
+    """受信メッセージ（IncomingMessage）の代わりになるモックを作成する"""
+    def make(
+        body: Union[Dict[str, Any], bytes],
+        message_id: Optional[str] = None,
+        headers: Optional[Dict[str, Any]] = None,
+        routing_key: str = "user.sync",
+    ) -> mock.MagicMock:
+        message = mock.MagicMock()
+        message.body = body if isinstance(body, bytes) else json.dumps(body).encode()
+        message.message_id = message_id
+        message.headers = headers or {}
+        message.routing_key = routing_key
+        message.content_type = "application/json"
+        message.ack = mock.AsyncMock()
+        message.nack = mock.AsyncMock()
+        return message
+    return make
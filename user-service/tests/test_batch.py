@@ -0,0 +1,166 @@
+import contextlib
+import uuid
+from unittest import mock
+
+import pytest
+
+from app.messaging import rabbitmq
+from app.messaging.idempotency import ProcessedMessageCache
+from app.messaging.rabbitmq import RabbitMQClient
+
+
+class FakeSession:
+    """_process_batchが使うAsyncSessionのメソッドだけを持つモック"""
+
+    def __init__(self):
+        self.commit = mock.AsyncMock()
+
+    @contextlib.asynccontextmanager
+    async def begin_nested(self):
+        yield
+
+
+@pytest.fixture
+def session():
+    return FakeSession()
+
+
+@pytest.fixture
+def crud(monkeypatch, session):
+    @contextlib.asynccontextmanager
+    async def session_factory():
+        yield session
+
+    monkeypatch.setattr(rabbitmq, "AsyncSessionLocal", session_factory)
+    monkeypatch.setattr(rabbitmq, "processed_messages", ProcessedMessageCache(maxsize=100, ttl=60))
+    monkeypatch.setattr(rabbitmq.event_version, "claim", mock.AsyncMock(return_value=True))
+    crud = mock.MagicMock()
+    crud.sync_users = mock.AsyncMock(side_effect=lambda db, rows: rows)
+    crud.get_by_user_id = mock.AsyncMock(return_value=None)
+    crud.delete = mock.AsyncMock()
+    monkeypatch.setattr(rabbitmq, "user", crud)
+    return crud
+
+
+@pytest.fixture
+def client(monkeypatch):
+    client = RabbitMQClient()
+    client.is_initialized = True
+    monkeypatch.setattr(client, "_retry_or_dead_letter", mock.AsyncMock())
+    return client
+
+
+def event(event_type, user_id, version, **user_data):
+    return {"event_type": event_type, "user_data": {"id": user_id, **user_data}, "version": version}
+
+
+async def test_creates_and_updates_are_upserted_in_one_statement(client, crud, make_message):
+    a, b = str(uuid.uuid4()), str(uuid.uuid4())
+    messages = [
+        make_message(event("user.created", a, 1, username="a1"), "1"),
+        make_message(event("user.created", b, 2, username="b"), "2"),
+        make_message(event("user.updated", a, 3, username="a2", is_admin=True), "3"),
+    ]
+
+    await client._process_batch(messages)
+
+    crud.sync_users.assert_awaited_once()
+    rows = crud.sync_users.call_args.args[1]
+    assert rows == [
+        {"user_id": uuid.UUID(a), "username": "a2", "is_admin": True, "is_active": True},
+        {"user_id": uuid.UUID(b), "username": "b", "is_admin": False, "is_active": True},
+    ]
+    for message in messages:
+        message.ack.assert_awaited_once()
+
+
+async def test_delete_overrides_pending_upsert(client, crud, make_message):
+    a, b = str(uuid.uuid4()), str(uuid.uuid4())
+    messages = [
+        make_message(event("user.created", a, 1, username="a"), "1"),
+        make_message(event("user.deleted", a, 2), "2"),
+        make_message(event("user.created", b, 3, username="b"), "3"),
+    ]
+
+    await client._process_batch(messages)
+
+    rows = crud.sync_users.call_args.args[1]
+    assert [row["user_id"] for row in rows] == [uuid.UUID(b)]
+    crud.get_by_user_id.assert_awaited_once()
+
+
+async def test_upsert_after_delete_is_kept(client, crud, make_message):
+    a = str(uuid.uuid4())
+    messages = [
+        make_message(event("user.deleted", a, 1), "1"),
+        make_message(event("user.created", a, 2, username="a"), "2"),
+    ]
+
+    await client._process_batch(messages)
+
+    rows = crud.sync_users.call_args.args[1]
+    assert [row["user_id"] for row in rows] == [uuid.UUID(a)]
+
+
+async def test_stale_versions_are_not_applied(client, crud, make_message):
+    rabbitmq.event_version.claim.return_value = False
+    message = make_message(event("user.updated", str(uuid.uuid4()), 1, username="a"), "1")
+
+    await client._process_batch([message])
+
+    crud.sync_users.assert_not_awaited()
+    message.ack.assert_awaited_once()
+    assert client.skipped_stale == 1
+
+
+async def test_undecodable_message_is_dead_lettered(client, crud, make_message):
+    good = make_message(event("user.created", str(uuid.uuid4()), 1, username="a"), "1")
+    broken = make_message(b"{broken", "2")
+
+    await client._process_batch([good, broken])
+
+    message, error, permanent = client._retry_or_dead_letter.call_args.args
+    assert message is broken and permanent is True
+    good.ack.assert_awaited_once()
+    broken.ack.assert_not_awaited()
+
+
+async def test_failed_message_is_rolled_back_to_its_savepoint(client, crud, make_message):
+    crud.get_by_user_id.side_effect = RuntimeError("lock timeout")
+    good = make_message(event("user.created", str(uuid.uuid4()), 1, username="a"), "1")
+    failing = make_message(event("user.deleted", str(uuid.uuid4()), 2), "2")
+
+    await client._process_batch([good, failing])
+
+    message, error, permanent = client._retry_or_dead_letter.call_args.args
+    assert message is failing and permanent is False
+    good.ack.assert_awaited_once()
+
+
+async def test_upsert_failure_falls_back_to_one_message_at_a_time(client, crud, session, make_message, monkeypatch):
+    crud.sync_users.side_effect = RuntimeError("deadlock detected")
+    process_message = mock.AsyncMock()
+    monkeypatch.setattr(client, "_process_message", process_message)
+    messages = [
+        make_message(event("user.created", str(uuid.uuid4()), 1, username="a"), "1"),
+        make_message(event("user.created", str(uuid.uuid4()), 2, username="b"), "2"),
+    ]
+
+    await client._process_batch(messages)
+
+    session.commit.assert_not_awaited()
+    assert [call.args[0] for call in process_message.call_args_list] == messages
+    for message in messages:
+        message.ack.assert_not_awaited()
+
+
+async def test_redelivered_messages_are_acked_without_touching_the_database(client, crud, make_message):
+    rabbitmq.processed_messages.add("1")
+    message = make_message(event("user.created", str(uuid.uuid4()), 1, username="a"), "1")
+
+    await client._process_batch([message])
+
+    rabbitmq.event_version.claim.assert_not_awaited()
+    crud.sync_users.assert_not_awaited()
+    message.ack.assert_awaited_once()
+    assert client.skipped_duplicates == 1
@@ -0,0 +1,38 @@
+import uuid
+
+import pytest
+
+from app.core.bulk import BulkFormatError
+from app.crud.user import user
+
+
+def test_import_rows_are_converted():
+    user_id = uuid.uuid4()
+
+    rows = user._prepare_import_rows([
+        {"username": "alice", "user_id": str(user_id), "fullname": "", "is_admin": "true"},
+    ])
+
+    assert rows == [("alice", None, True, True, user_id)]
+
+
+@pytest.mark.parametrize("user_id", [None, ""])
+def test_record_without_user_id_is_rejected(user_id):
+    batch = [
+        {"username": "alice", "user_id": str(uuid.uuid4())},
+        {"username": "bob", "user_id": user_id},
+    ]
+
+    # 2バッチ目以降のレコード番号は先行するレコード数から数える
+    with pytest.raises(BulkFormatError, match="12件目: ユーザー 'bob' のuser_idが指定されていません"):
+        user._prepare_import_rows(batch, offset=10)
+
+
+def test_invalid_user_id_is_rejected():
+    with pytest.raises(BulkFormatError, match="1件目: ユーザー 'alice' のuser_idが不正です"):
+        user._prepare_import_rows([{"username": "alice", "user_id": "not-a-uuid"}])
+
+
+def test_record_without_username_is_rejected():
+    with pytest.raises(BulkFormatError, match="1件目: usernameが指定されていません"):
+        user._prepare_import_rows([{"user_id": str(uuid.uuid4())}])
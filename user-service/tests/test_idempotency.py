@@ -0,0 +1,54 @@
+import pytest
+
+from app.core import cache
+from app.messaging.idempotency import ProcessedMessageCache
+
+
+pytestmark = pytest.mark.fake_time(cache, "monotonic")
+
+
+def test_remembers_processed_message_ids():
+    processed = ProcessedMessageCache(maxsize=10, ttl=60)
+    processed.add("m1")
+
+    assert processed.contains("m1") is True
+    assert processed.contains("m2") is False
+    assert processed.stats()["hits"] == 1
+
+
+def test_messages_without_id_are_never_deduplicated():
+    processed = ProcessedMessageCache(maxsize=10, ttl=60)
+    processed.add(None)
+    processed.add("")
+
+    assert processed.contains(None) is False
+    assert processed.contains("") is False
+    assert processed.stats()["size"] == 0
+
+
+def test_ids_expire_after_ttl(clock):
+    processed = ProcessedMessageCache(maxsize=10, ttl=60)
+    processed.add("m1")
+
+    clock.advance(59)
+    assert processed.contains("m1") is True
+    clock.advance(1)
+    assert processed.contains("m1") is False
+
+
+def test_oldest_ids_are_evicted_when_full():
+    processed = ProcessedMessageCache(maxsize=2, ttl=60)
+    for message_id in ("m1", "m2", "m3"):
+        processed.add(message_id)
+
+    assert processed.contains("m1") is False
+    assert processed.contains("m2") is True
+    assert processed.contains("m3") is True
+    assert processed.stats()["evictions"] == 1
+
+
+def test_zero_size_disables_the_cache():
+    processed = ProcessedMessageCache(maxsize=0, ttl=60)
+    processed.add("m1")
+
+    assert processed.contains("m1") is False
@@ -0,0 +1,111 @@
+import uuid
+from unittest import mock
+
+import pytest
+
+from app.core.config import settings
+from app.messaging.partitioning import partition_for, routing_key_for
+from app.messaging.rabbitmq import RabbitMQClient
+
+
+@pytest.fixture
+def partitions(monkeypatch):
+    monkeypatch.setattr(settings, "USER_SYNC_PARTITIONS", 4)
+    return 4
+
+
+def test_partition_is_stable_and_in_range(partitions):
+    user_ids = [uuid.uuid4() for _ in range(200)]
+
+    assignments = [partition_for(user_id) for user_id in user_ids]
+
+    assert assignments == [partition_for(str(user_id)) for user_id in user_ids]
+    assert set(assignments) == set(range(partitions))
+
+
+def test_partition_ignores_uuid_case(partitions):
+    user_id = str(uuid.uuid4())
+
+    assert partition_for(user_id.upper()) == partition_for(user_id)
+
+
+def test_partition_count_can_be_overridden(partitions):
+    user_id = uuid.uuid4()
+
+    assert 0 <= partition_for(user_id, 3) < 3
+    assert partition_for(user_id, 1) == 0
+
+
+def test_routing_key_without_partitioning():
+    assert settings.USER_SYNC_PARTITIONS == 1
+    assert routing_key_for(uuid.uuid4()) == settings.USER_SYNC_ROUTING_KEY
+    assert routing_key_for(uuid.uuid4(), "user.profile") == "user.profile"
+
+
+def test_routing_key_with_partitioning(partitions):
+    user_id = uuid.uuid4()
+
+    assert routing_key_for(user_id) == f"{settings.USER_SYNC_ROUTING_KEY}.{partition_for(user_id)}"
+    assert routing_key_for(user_id, "user.profile") == f"user.profile.{partition_for(user_id)}"
+    # ユーザーIDがない場合はパーティション番号を付けない
+    assert routing_key_for(None) == settings.USER_SYNC_ROUTING_KEY
+
+
+@pytest.fixture
+def client():
+    client = RabbitMQClient()
+    client.channel = mock.MagicMock()
+    client.exchange = mock.MagicMock()
+
+    async def declare_queue(name, **kwargs):
+        queue = mock.MagicMock()
+        queue.name = name
+        queue.arguments = kwargs.get("arguments")
+        queue.bind = mock.AsyncMock()
+        queue.consume = mock.AsyncMock()
+        return queue
+
+    client.channel.declare_queue = mock.AsyncMock(side_effect=declare_queue)
+    client.channel.declare_exchange = mock.AsyncMock()
+    client.channel.set_qos = mock.AsyncMock()
+    return client
+
+
+async def test_every_replica_consumes_every_partition(client, partitions, monkeypatch):
+    monkeypatch.setattr(settings, "USER_SYNC_CONSUMER_COUNT", 2)
+    monkeypatch.setattr(settings, "USER_SYNC_CONSUMER_INDEX", 1)
+    monkeypatch.setattr(settings, "USER_SYNC_BATCH_ENABLED", False)
+
+    await client._declare_queues()
+    client.is_initialized = True
+    await client.start_consuming()
+
+    assert [queue.name for queue in client.queues] == [f"{settings.USER_SYNC_QUEUE}.{p}" for p in range(4)]
+    assert all(queue.arguments == {"x-single-active-consumer": True} for queue in client.queues)
+    assert [queue.bind.call_args.kwargs["routing_key"] for queue in client.queues] == [
+        f"{settings.USER_SYNC_ROUTING_KEY}.{p}" for p in range(4)
+    ]
+    # 担当パーティション（1, 3）のみ優先度を上げる
+    assert [queue.consume.call_args.kwargs["arguments"]["x-priority"] for queue in client.queues] == [0, 10, 0, 10]
+
+
+async def test_single_queue_without_partitioning(client):
+    await client._declare_queues()
+
+    assert [queue.name for queue in client.queues] == [settings.USER_SYNC_QUEUE]
+    assert client.queues[0].arguments is None
+    assert client.preferred_queues == set()
+
+
+async def test_retry_queues_are_named_after_the_retry_exchange(client, monkeypatch):
+    monkeypatch.setattr(settings, "USER_SYNC_MAX_ATTEMPTS", 4)
+
+    await client._declare_retry_topology()
+
+    names = [call.args[0] for call in client.channel.declare_queue.call_args_list]
+    assert names == [
+        f"{settings.USER_SYNC_RETRY_EXCHANGE}.1000ms",
+        f"{settings.USER_SYNC_RETRY_EXCHANGE}.2000ms",
+        f"{settings.USER_SYNC_RETRY_EXCHANGE}.4000ms",
+        settings.USER_SYNC_DEAD_LETTER_QUEUE,
+    ]
@@ -0,0 +1,98 @@
+import asyncio
+import itertools
+import uuid
+from unittest import mock
+
+import pytest
+
+from app.messaging.partitioning import partition_for
+from app.messaging.publisher import ConfirmingPublisher
+
+
+@pytest.fixture
+def published():
+    """(チャネル番号, メッセージID)を発行した順に記録する"""
+    return []
+
+
+@pytest.fixture
+def publisher(published):
+    def make_channel(index):
+        channel = mock.MagicMock()
+        channel.is_closed = False
+        exchange = mock.MagicMock()
+
+        async def publish(message, routing_key, timeout):
+            # 先に発行したメッセージの確認応答が遅れても後続が追い越さないことを確かめる
+            if message.message_id.endswith("slow"):
+                await asyncio.sleep(0.01)
+            if message.message_id.endswith("fail"):
+                raise RuntimeError("nack")
+            published.append((index, message.message_id))
+
+        exchange.publish = publish
+        return channel, exchange
+
+    publisher = ConfirmingPublisher()
+    publisher.channels = [make_channel(index) for index in range(4)]
+    publisher._cycle = itertools.cycle(publisher.channels)
+    publisher._window = asyncio.Semaphore(256)
+    publisher.is_initialized = True
+    return publisher
+
+
+def body(user_id):
+    return {"event_type": "user.updated", "user_data": {"id": user_id}}
+
+
+async def test_user_messages_are_pinned_to_one_channel(publisher, published):
+    user_id = str(uuid.uuid4())
+
+    for i in range(5):
+        await publisher.publish("user.sync", body(user_id), f"m{i}")
+
+    assert {index for index, _ in published} == {partition_for(user_id, 4)}
+
+
+async def test_closed_channel_falls_back_to_another(publisher, published):
+    user_id = str(uuid.uuid4())
+    publisher.channels[partition_for(user_id, 4)][0].is_closed = True
+
+    await publisher.publish("user.sync", body(user_id), "m1")
+
+    assert published[0][0] != partition_for(user_id, 4)
+
+
+async def test_publish_many_keeps_per_user_order(publisher, published):
+    a, b = str(uuid.uuid4()), str(uuid.uuid4())
+    messages = [
+        ("user.sync", body(a), "a1-slow"),
+        ("user.sync", body(b), "b1"),
+        ("user.sync", body(a), "a2"),
+        ("user.sync", {"event_type": "other"}, "x1"),
+    ]
+
+    results = await publisher.publish_many(messages)
+
+    assert results == [None, None, None, None]
+    order = [message_id for _, message_id in published]
+    assert order.index("a1-slow") < order.index("a2")
+    # 別のユーザーのメッセージは遅いメッセージを待たない
+    assert order.index("b1") < order.index("a1-slow")
+
+
+async def test_publish_many_stops_a_user_sequence_after_a_failure(publisher, published):
+    a, b = str(uuid.uuid4()), str(uuid.uuid4())
+    messages = [
+        ("user.sync", body(a), "a1-fail"),
+        ("user.sync", body(b), "b1"),
+        ("user.sync", body(a), "a2"),
+    ]
+
+    results = await publisher.publish_many(messages)
+
+    assert isinstance(results[0], RuntimeError)
+    assert results[1] is None
+    assert results[2] is results[0]
+    assert [message_id for _, message_id in published] == ["b1"]
+    assert publisher.stats()["failed"] == 1
@@ -0,0 +1,126 @@
+from unittest import mock
+
+import pytest
+
+from app.core.config import settings
+from app.messaging import rabbitmq
+from app.messaging.rabbitmq import RabbitMQClient
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(settings, "USER_SYNC_MAX_ATTEMPTS", 6)
+    monkeypatch.setattr(settings, "USER_SYNC_RETRY_BASE_DELAY", 1.0)
+    monkeypatch.setattr(settings, "USER_SYNC_RETRY_MAX_DELAY", 300.0)
+    client = RabbitMQClient()
+    client.is_initialized = True
+    return client
+
+
+@pytest.fixture
+def publish_raw(monkeypatch):
+    publish_raw = mock.AsyncMock()
+    monkeypatch.setattr(rabbitmq.publisher, "publish_raw", publish_raw)
+    return publish_raw
+
+
+def test_retry_delays_double_up_to_the_cap(client, monkeypatch):
+    assert client._retry_delays() == [1.0, 2.0, 4.0, 8.0, 16.0]
+
+    monkeypatch.setattr(settings, "USER_SYNC_RETRY_MAX_DELAY", 5.0)
+    assert client._retry_delays() == [1.0, 2.0, 4.0, 5.0, 5.0]
+
+    monkeypatch.setattr(settings, "USER_SYNC_MAX_ATTEMPTS", 1)
+    assert client._retry_delays() == []
+
+
+async def test_first_failure_goes_to_the_first_retry_queue(client, publish_raw, make_message):
+    message = make_message({"event_type": "user.created"}, "m1", routing_key="user.sync.3")
+
+    await client._retry_or_dead_letter(message, RuntimeError("db down"))
+
+    retry_message, routing_key = publish_raw.call_args.args
+    assert routing_key == "user.sync.3"
+    assert publish_raw.call_args.kwargs == {"exchange_name": settings.USER_SYNC_RETRY_EXCHANGE}
+    assert retry_message.headers["x-attempts"] == 1
+    assert retry_message.headers["retry-delay"] == "1000ms"
+    assert retry_message.headers["x-last-error"] == "db down"
+    assert retry_message.message_id == "m1"
+    message.ack.assert_awaited_once()
+    assert client.retried == 1
+
+
+async def test_attempts_are_carried_over_between_retries(client, publish_raw, make_message):
+    message = make_message({}, "m1", headers={"x-attempts": 3})
+
+    await client._retry_or_dead_letter(message, RuntimeError("db down"))
+
+    retry_message, _ = publish_raw.call_args.args
+    assert retry_message.headers["x-attempts"] == 4
+    assert retry_message.headers["retry-delay"] == "8000ms"
+
+
+async def test_exhausted_attempts_go_to_the_dead_letter_queue(client, publish_raw, make_message):
+    message = make_message({}, "m1", headers={"x-attempts": 5}, routing_key="user.sync.2")
+
+    await client._retry_or_dead_letter(message, RuntimeError("db down"))
+
+    dead_letter, routing_key = publish_raw.call_args.args
+    assert routing_key == settings.USER_SYNC_DEAD_LETTER_QUEUE
+    assert publish_raw.call_args.kwargs == {"exchange_name": ""}
+    assert dead_letter.headers["x-attempts"] == 6
+    assert dead_letter.headers["x-original-routing-key"] == "user.sync.2"
+    assert "retry-delay" not in dead_letter.headers
+    message.ack.assert_awaited_once()
+    assert client.dead_lettered == 1
+
+
+async def test_permanent_errors_skip_retries(client, publish_raw, make_message):
+    message = make_message(b"{broken", "m1")
+
+    await client._retry_or_dead_letter(message, ValueError("bad json"), permanent=True)
+
+    dead_letter, routing_key = publish_raw.call_args.args
+    assert routing_key == settings.USER_SYNC_DEAD_LETTER_QUEUE
+    assert dead_letter.headers["x-attempts"] == 1
+    assert client.dead_lettered == 1
+
+
+async def test_message_is_requeued_when_forwarding_fails(client, publish_raw, make_message):
+    publish_raw.side_effect = ConnectionError("channel closed")
+    message = make_message({}, "m1")
+
+    await client._retry_or_dead_letter(message, RuntimeError("db down"))
+
+    message.nack.assert_awaited_once_with(requeue=True)
+    message.ack.assert_not_awaited()
+    assert client.retried == 0
+
+
+async def test_replay_resets_attempts_and_restores_routing_key(client, publish_raw, make_message):
+    dead_letters = [
+        make_message({}, "m1", headers={
+            "x-attempts": 6, "x-last-error": "db down", "x-original-routing-key": b"user.sync.1", "trace": "t1",
+        }),
+        make_message({}, "m2", headers={"x-attempts": 1}),
+    ]
+    client.dead_letter_queue = mock.MagicMock()
+    client.dead_letter_queue.get = mock.AsyncMock(side_effect=dead_letters + [None])
+
+    assert await client.replay_dead_letters(limit=10) == 2
+
+    (first, first_key), (second, second_key) = [call.args for call in publish_raw.call_args_list]
+    assert first_key == "user.sync.1"
+    assert first.headers == {"trace": "t1"}
+    assert second_key == settings.USER_SYNC_ROUTING_KEY
+    assert second.headers == {}
+    for message in dead_letters:
+        message.ack.assert_awaited_once()
+
+
+async def test_replay_stops_at_limit(client, publish_raw, make_message):
+    client.dead_letter_queue = mock.MagicMock()
+    client.dead_letter_queue.get = mock.AsyncMock(side_effect=[make_message({}, f"m{i}") for i in range(3)])
+
+    assert await client.replay_dead_letters(limit=2) == 2
+    assert publish_raw.await_count == 2
@@ -0,0 +1,120 @@
+import uuid
+from unittest import mock
+
+import pytest
+from jose import jwt
+
+from app.core import cache
+from app.db.routing import ReplicaRouter
+
+
+pytestmark = pytest.mark.fake_time(cache, "monotonic")
+
+
+def make_engine(name):
+    engine = mock.MagicMock(name=name)
+    engine.url.render_as_string.return_value = name
+    return engine
+
+
+@pytest.fixture
+def primary():
+    return make_engine("primary")
+
+
+@pytest.fixture
+def replicas():
+    return [make_engine(f"replica{index}") for index in range(3)]
+
+
+def bearer(sub, **claims):
+    # 署名は検証しないため任意の鍵で作成する
+    return "Bearer " + jwt.encode({"sub": sub, **claims}, "secret", algorithm="HS256")
+
+
+async def selected(router, key=None):
+    async with router.read_engine(key) as engine:
+        return engine
+
+
+def test_client_key_uses_the_subject_claim():
+    sub = str(uuid.uuid4())
+
+    key = ReplicaRouter.client_key(bearer(sub, jti="a"))
+
+    # 別のトークン（再ログイン・別端末）でも同じユーザーなら同じキーになる
+    assert key == ReplicaRouter.client_key(bearer(sub.upper(), jti="b"))
+    assert key == ReplicaRouter.subject_key(uuid.UUID(sub))
+    assert key != ReplicaRouter.client_key(bearer(str(uuid.uuid4())))
+
+
+def test_client_key_falls_back_to_the_header_hash():
+    assert ReplicaRouter.client_key(None) is None
+    assert ReplicaRouter.client_key("") is None
+
+    key = ReplicaRouter.client_key("Bearer not-a-jwt")
+    assert key == ReplicaRouter.client_key("Bearer not-a-jwt")
+    assert key != ReplicaRouter.client_key("Bearer another")
+    assert ReplicaRouter.subject_key(None) is None
+
+
+async def test_primary_only_without_replicas(primary):
+    router = ReplicaRouter(primary, [], read_your_writes_window=5)
+    router.mark_write("user")
+
+    assert await selected(router) is primary
+    assert await selected(router, "user") is primary
+    assert router.stats()["sticky_clients"] == 0
+
+
+async def test_round_robin(primary, replicas):
+    router = ReplicaRouter(primary, replicas, strategy="round_robin")
+
+    engines = [await selected(router) for _ in range(6)]
+
+    assert engines == replicas + replicas
+    assert [replica["selected"] for replica in router.stats()["replicas"]] == [2, 2, 2]
+    assert router.in_flight == [0, 0, 0]
+
+
+async def test_least_load_prefers_idle_replicas(primary, replicas):
+    router = ReplicaRouter(primary, replicas, strategy="least_load")
+
+    async with router.read_engine() as first, router.read_engine() as second:
+        assert {first, second} == {replicas[0], replicas[1]}
+        assert await selected(router) is replicas[2]
+        # replica2が空いたため、使用中の2つより優先される
+        assert await selected(router) is replicas[2]
+
+    assert router.in_flight == [0, 0, 0]
+
+
+async def test_writer_reads_from_primary_until_the_window_expires(primary, replicas, clock):
+    router = ReplicaRouter(primary, replicas, read_your_writes_window=5)
+    writer = ReplicaRouter.client_key(bearer("writer"))
+    router.mark_write(writer)
+
+    assert await selected(router, writer) is primary
+    assert await selected(router, ReplicaRouter.client_key(bearer("other"))) in replicas
+    assert router.stats()["primary_reads"] == 1
+
+    clock.advance(4.9)
+    assert await selected(router, writer) is primary
+    clock.advance(0.1)
+    assert await selected(router, writer) in replicas
+
+
+async def test_admin_write_makes_the_target_user_sticky(primary, replicas):
+    router = ReplicaRouter(primary, replicas, read_your_writes_window=5)
+    target = uuid.uuid4()
+
+    router.mark_write(ReplicaRouter.subject_key(target))
+
+    assert await selected(router, ReplicaRouter.client_key(bearer(str(target)))) is primary
+
+
+async def test_zero_window_disables_stickiness(primary, replicas):
+    router = ReplicaRouter(primary, replicas, read_your_writes_window=0)
+    router.mark_write("user")
+
+    assert await selected(router, "user") in replicas